@@ -1,2 +1,3 @@
 from a3c.train import train
 from a3c.test import test
+from a3c.evaluate import evaluate
@@ -0,0 +1,160 @@
+import time
+
+import torch
+import torch.distributed as dist
+
+from utils import FontColor, setup_logger
+
+
+def _nbytes(tensors):
+    return sum(t.numel() * t.element_size() for t in tensors)
+
+
+class Compressor(object):
+    """Encodes flat parameter deltas for the wire, with error feedback.
+
+    'none' sends float32, 'fp16' halves the bytes and 'topk' sends the
+    indices and values of the `ratio` largest entries. What a lossy
+    encoding drops is kept as a residual and added to the next delta.
+    """
+    MODES = ('none', 'fp16', 'topk')
+
+    def __init__(self, mode, numel, ratio=0.01):
+        assert mode in self.MODES, f"unknown compression: {mode}"
+        self.mode = mode
+        self.numel = numel
+        self.k = max(1, int(numel * ratio))
+        self.residual = torch.zeros(numel)
+
+    def compress(self, delta):
+        delta = delta + self.residual
+        if self.mode == 'none':
+            payload = [delta]
+        elif self.mode == 'fp16':
+            payload = [delta.half()]
+        else:
+            _, index = delta.abs().topk(self.k)
+            payload = [index, delta[index]]
+        self.residual = delta - self.decompress(payload)
+        return payload
+
+    def decompress(self, payload):
+        if self.mode == 'none':
+            return payload[0]
+        if self.mode == 'fp16':
+            return payload[0].float()
+        dense = torch.zeros(self.numel)
+        dense[payload[0]] = payload[1]
+        return dense
+
+
+class NodeSync(object):
+    """Keeps the shared models of several trainer nodes in step.
+
+    Every node sends its change since the last sync. 'allreduce' averages
+    the changes of all nodes; 'ps' gathers them on rank 0, which acts as
+    parameter server, applies their sum and broadcasts it. Either way all
+    nodes move to the same new base, plus whatever their local workers
+    changed during the exchange. With compression the server broadcasts
+    fp16 and keeps its own residual, so the rounding of one broadcast is
+    sent with the next.
+    """
+    MODES = ('allreduce', 'ps')
+
+    def __init__(self, flat, mode='allreduce', compression='none', topk_ratio=0.01):
+        assert mode in self.MODES, f"unknown sync mode: {mode}"
+        self.flat = flat
+        self.mode = mode
+        self.rank = dist.get_rank()
+        self.world_size = dist.get_world_size()
+
+        # every node starts from rank 0's model
+        base = flat.flat.detach().cpu().clone()
+        dist.broadcast(base, 0)
+        flat.flat.copy_(base)
+        flat.bump()
+        self.base = base
+        self.compressor = Compressor(compression, base.numel(), topk_ratio)
+        self.server_residual = torch.zeros_like(base) if self.rank == 0 else None
+
+    def _gather(self, payload, dst=None):
+        """Sum of every node's decompressed payload, on all nodes or `dst`"""
+        gathered = [[torch.empty_like(t) for t in payload] for _ in range(self.world_size)]
+        for i, t in enumerate(payload):
+            if dst is None:
+                dist.all_gather([g[i] for g in gathered], t)
+            else:
+                dist.gather(t, gather_list=[g[i] for g in gathered] if self.rank == dst else None, dst=dst)
+        if dst is not None and self.rank != dst:
+            return None
+        return sum(self.compressor.decompress(g) for g in gathered)
+
+    def sync(self):
+        """One exchange; returns the bytes this node sent"""
+        snapshot = self.flat.flat.detach().cpu().clone()
+        payload = self.compressor.compress(snapshot - self.base)
+        sent = _nbytes(payload)
+
+        if self.mode == 'allreduce':
+            if self.compressor.mode == 'none':
+                dist.all_reduce(payload[0])
+                update = payload[0]
+            else:
+                update = self._gather(payload)
+            update = update / self.world_size
+
+        else:
+            update = self._gather(payload, dst=0)
+            wire = torch.float32 if self.compressor.mode == 'none' else torch.float16
+            if self.rank == 0:
+                update = update + self.server_residual
+                buffer = update.to(wire)
+                self.server_residual = update - buffer.float()
+            else:
+                buffer = torch.zeros(self.base.numel(), dtype=wire)
+            dist.broadcast(buffer, 0)
+            update = buffer.float()
+            if self.rank == 0:
+                sent += _nbytes([buffer]) * (self.world_size - 1)
+
+        base = self.base + update
+        self.flat.flat.add_((base - snapshot).to(self.flat.flat.device))
+        self.base = base
+        self.flat.bump()
+        return sent
+
+
+def sync_nodes(args, services, counter):
+    """Node process: sync the shared model with the other nodes every interval"""
+    log_dir = f'logs/{args.env_name}/{args.model_id}/{args.uuid}/'
+    dist_logger = setup_logger('distributed', log_dir, f'distributed.log')
+
+    dist.init_process_group(
+        'gloo',
+        init_method=f'tcp://{args.master_addr}:{args.master_port}',
+        rank=args.node_rank,
+        world_size=args.world_size,
+    )
+    sync = NodeSync(services.flat, args.dist_mode, args.compression, args.topk_ratio)
+    print(FontColor.BLUE + f"Node: {args.node_rank} of {args.world_size} | {args.dist_mode} | compression {args.compression}", FontColor.END)
+
+    last, frames = time.perf_counter(), counter.value
+    while True:
+        time.sleep(args.dist_interval)
+
+        start = time.perf_counter()
+        sent = sync.sync()
+        sync_time = time.perf_counter() - start
+
+        now, total = time.perf_counter(), counter.value
+        fps = (total - frames) / (now - last)
+        global_fps = torch.tensor([fps])
+        dist.all_reduce(global_fps)
+        dist_logger.info({
+            'node': args.node_rank,
+            'bytes': sent,
+            'time': sync_time,
+            'fps': fps,
+            'global_fps': global_fps.item(),
+            })
+        last, frames = now, total
@@ -0,0 +1,147 @@
+import time
+
+import numpy as np
+import torch
+
+from models import ActorCritic, FlatParameters
+from mario_actions import ACTIONS
+from mario_vec_env import create_mario_vec_env
+from utils import FontColor, setup_logger
+
+
+def run_episodes(model, env, episodes, max_episode_length):
+    """Play `episodes` greedy episodes spread over the envs of `env`, with
+    one batched forward per step; returns a dict per finished episode"""
+    num_envs = env.num_envs
+    quotas = np.array([episodes // num_envs + (i < episodes % num_envs) for i in range(num_envs)])
+    finished = np.zeros(num_envs, dtype=np.int64)
+    reward_sum = np.zeros(num_envs)
+    hx = torch.zeros(num_envs, 512).to(model.device)
+    cx = torch.zeros(num_envs, 512).to(model.device)
+
+    results = []
+    state = env.reset()
+    while (finished < quotas).any():
+        with torch.no_grad():
+            _, logit, (hx, cx) = model((torch.from_numpy(state).to(model.device), (hx, cx)))
+        action = logit.max(-1)[1].cpu().numpy()
+
+        # envs past their quota keep stepping, the vec env steps them together
+        state, reward, done, info, mask = env.step_episodes(action, max_episode_length, reward_clip=None)
+        reward_sum += reward
+
+        for i in np.flatnonzero(done):
+            if finished[i] < quotas[i]:
+                results.append({
+                    'reward': float(reward_sum[i]),
+                    'length': int(env.episode_length[i]),
+                    'x_pos': int(info[i]['x_pos']),
+                    'flag_get': bool(info[i]['flag_get']),
+                    })
+            finished[i] += 1
+
+        reward_sum[done] = 0.
+        mask = mask.to(hx.device)
+        hx = hx * mask
+        cx = cx * mask
+
+    return results
+
+
+def summarize(results):
+    rewards = np.array([r['reward'] for r in results])
+    x_pos = np.array([r['x_pos'] for r in results])
+    return {
+        'episodes': len(results),
+        'reward': rewards.mean(),
+        'reward_median': np.median(rewards),
+        'reward_std': rewards.std(),
+        'completion_rate': np.mean([r['flag_get'] for r in results]),
+        'x_pos_mean': x_pos.mean(),
+        'x_pos_p10': np.percentile(x_pos, 10),
+        'x_pos_p50': np.percentile(x_pos, 50),
+        'x_pos_p90': np.percentile(x_pos, 90),
+        'episode_length': np.mean([r['length'] for r in results]),
+    }
+
+
+def evaluate(args, services, counter):
+    """Evaluates every new shared model version on `--eval-episodes`
+    episodes per level, without rendering or delays, and logs one
+    aggregated row per version and level to results.log. The rows keep
+    the `reward` and `x_position` columns the plots read, as means over
+    the episodes. One env pool is alive at a time; with several levels it
+    is rebuilt for each level."""
+    services.require('checkpoints')
+    time.sleep(2.)
+
+    # logging
+    log_dir = f'logs/{args.env_name}/{args.model_id}/{args.uuid}/'
+    result_logger = setup_logger('results', log_dir, f'results.log')
+
+    levels = args.eval_levels or [args.env_name]
+    num_envs = min(args.eval_episodes, args.eval_processes)
+    env, env_level = None, None
+
+    model = ActorCritic(args.buffer_depth, len(ACTIONS[args.move_set]), args.obs_norm if args.uint8_obs else None)
+    if torch.cuda.is_available():
+        model.cuda()
+    model.eval()
+    flat = FlatParameters(model)
+
+    print(FontColor.GREEN + f"Evaluation: {args.eval_episodes} episodes x {len(levels)} levels on {num_envs} envs" + FontColor.END)
+
+    last_start = -float('inf')
+    while True:
+        # wait for a new version, at most one round per --eval-interval
+        time.sleep(max(0., last_start + args.eval_interval - time.time()))
+        if flat.synced is not None and flat.staleness(services.flat) == 0:
+            time.sleep(1.)
+            continue
+        last_start = time.time()
+
+        flat.sync(services.flat)
+        version, frames = flat.synced, counter.value
+
+        rewards = []
+        for level in levels:
+            if level != env_level:
+                if env is not None:
+                    env.close()
+                env = create_mario_vec_env(
+                    level,
+                    num_envs,
+                    ACTIONS[args.move_set],
+                    args.buffer_depth,
+                    args.uint8_obs,
+                    args.reset_cache,
+                    args.frame_skip,
+                    args.max_pool,
+                )
+                env_level = level
+
+            start = time.time()
+            results = run_episodes(model, env, args.eval_episodes, args.max_episode_length)
+            summary = summarize(results)
+            rewards += [r['reward'] for r in results]
+
+            result_logger.info({
+                'id': args.model_id,
+                'algorithm': args.algorithm,
+                'greedy-eps': args.greedy_eps,
+                'version': version,
+                'episode': frames,
+                'level': level,
+                'time': time.time() - start,
+                'x_position': summary['x_pos_mean'],
+                **summary,
+                })
+            print(
+                f"Version {version: 7d} | {level} | " + \
+                f"Reward: mean {summary['reward']: 8.2f}, median {summary['reward_median']: 8.2f} | " + \
+                f"Complete: {summary['completion_rate']: 5.1%} | " + \
+                f"x_pos p50: {summary['x_pos_p50']: 6.0f}",
+                flush=True,
+            )
+
+        services.checkpoints.report(version, float(np.mean(rewards)))
@@ -0,0 +1,129 @@
+import torch
+
+from a3c.utils import ensure_shared_grads
+
+
+class SharedGradients(object):
+    """Hands worker gradients to the shared optimizer through flat buffers.
+
+    'hogwild' aliases the shared grads to the worker's and steps without
+    synchronization, as `ensure_shared_grads` always did. 'accumulate' adds
+    into one shared buffer under a lock; whichever worker gets the step lock
+    applies everything accumulated so far, and the others return at once.
+    'slots' gives every worker its own buffer; the stepping worker reduces
+    all filled slots. Counters are shared across workers: `pushed` worker
+    updates, optimizer `steps`, updates `merged` into another worker's step
+    and hogwild steps that `overlapped` another one.
+    """
+    MODES = ('hogwild', 'accumulate', 'slots')
+    COUNTERS = ('pushed', 'steps', 'merged', 'overlapped')
+
+    def __init__(self, shared_model, mode, num_workers, grad_lock, step_lock):
+        assert mode in self.MODES, f"unknown gradient mode: {mode}"
+        self.mode = mode
+        self.numel = sum(p.numel() for p in shared_model.parameters())
+        self.grad_lock = grad_lock
+        self.step_lock = step_lock
+
+        self.version = torch.zeros(1, dtype=torch.int64).share_memory_()
+        self.counters = torch.zeros(len(self.COUNTERS), dtype=torch.int64).share_memory_()
+        if mode == 'accumulate':
+            self.buffer = torch.zeros(self.numel).share_memory_()
+            self.pending = torch.zeros(1, dtype=torch.int64).share_memory_()
+        elif mode == 'slots':
+            self.slots = torch.zeros(num_workers, self.numel).share_memory_()
+            self.ready = torch.zeros(num_workers, dtype=torch.uint8).share_memory_()
+
+        self.grads = None
+        self.staging = None
+
+    def attach(self, model, shared_model):
+        """Point the grads of a worker's `model` and of its process's view of
+        `shared_model` at flat buffers. Call once per worker process."""
+        self.model, self.shared_model = model, shared_model
+        self.grads = self._flatten_grads(model)
+        if self.mode != 'hogwild':
+            self.staging = self._flatten_grads(shared_model)
+
+    def zero_grad(self):
+        """Zero the worker's grads in place, keeping them views of `grads`"""
+        self.grads.zero_()
+
+    @staticmethod
+    def _flatten_grads(model):
+        params = list(model.parameters())
+        flat = torch.zeros(sum(p.numel() for p in params), device=params[0].device)
+        offset = 0
+        for p in params:
+            n = p.numel()
+            p.grad = flat[offset:offset + n].view_as(p)
+            offset += n
+        return flat
+
+    def _count(self, **counts):
+        with self.grad_lock:
+            for name, n in counts.items():
+                self.counters[self.COUNTERS.index(name)] += n
+
+    def stats(self):
+        return dict(zip(self.COUNTERS, self.counters.tolist()))
+
+    def step(self, rank, optimizer):
+        """Hand over the worker's gradients; True if an optimizer step ran"""
+        return getattr(self, f'_step_{self.mode}')(rank, optimizer)
+
+    def _step_hogwild(self, rank, optimizer):
+        ensure_shared_grads(self.model, self.shared_model)
+        start = int(self.version)
+        optimizer.step()
+        with self.grad_lock:
+            self.version += 1
+            overlapped = int(self.version) - start > 1
+        self._count(pushed=1, steps=1, overlapped=int(overlapped))
+        return True
+
+    def _step_accumulate(self, rank, optimizer):
+        with self.grad_lock:
+            self.buffer.add_(self.grads.to(self.buffer.device))
+            self.pending += 1
+        self._count(pushed=1)
+
+        # a step in progress elsewhere picks this update up with the next one
+        if not self.step_lock.acquire(False):
+            return False
+        try:
+            with self.grad_lock:
+                n = int(self.pending)
+                self.staging.copy_(self.buffer)
+                self.buffer.zero_()
+                self.pending.zero_()
+            if n == 0:
+                return False
+            optimizer.step()
+            self.version += 1
+        finally:
+            self.step_lock.release()
+
+        self._count(steps=1, merged=n - 1)
+        return True
+
+    def _step_slots(self, rank, optimizer):
+        # the slot is free: its last update was reduced before this worker's
+        # previous step returned
+        self.slots[rank].copy_(self.grads)
+        self.ready[rank] = 1
+        self._count(pushed=1)
+
+        with self.step_lock:
+            ready = self.ready.nonzero().view(-1).tolist()
+            if not ready:
+                return False
+            self.staging.zero_()
+            for i in ready:
+                self.staging.add_(self.slots[i].to(self.staging.device))
+            self.ready[ready] = 0
+            optimizer.step()
+            self.version += 1
+
+        self._count(steps=1, merged=len(ready) - 1)
+        return True
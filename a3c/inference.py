@@ -0,0 +1,116 @@
+import time
+import queue
+
+import torch
+import torch.nn.functional as F
+
+from models import ActorCritic, FlatParameters
+from utils import FontColor, setup_logger
+
+
+class InferenceServer(object):
+    """Batches the acting forward pass of all workers in one process.
+
+    Every worker owns a slot of shared tensors: its stacked observations,
+    the recurrent state of its envs (kept between calls, so the slot index
+    is the worker's handle to it) and the returned actions, values and
+    log-probs. A worker writes its observations, queues its slot and waits;
+    `serve` collects slots until `max_batch` of them are queued or
+    `max_latency` seconds passed since the first one, runs one forward
+    pass and wakes the workers it served.
+    """
+    def __init__(self, ctx, num_workers, num_envs, obs_shape, obs_dtype, max_batch=None, max_latency=0.005):
+        self.max_batch = max_batch or num_workers
+        self.max_latency = max_latency
+
+        self.obs = torch.zeros(num_workers, num_envs, *obs_shape, dtype=obs_dtype).share_memory_()
+        self.hx = torch.zeros(num_workers, num_envs, 512).share_memory_()
+        self.cx = torch.zeros(num_workers, num_envs, 512).share_memory_()
+        self.greedy = torch.zeros(num_workers, dtype=torch.uint8).share_memory_()
+        self.actions = torch.zeros(num_workers, num_envs, 1, dtype=torch.int64).share_memory_()
+        self.values = torch.zeros(num_workers, num_envs, 1).share_memory_()
+        self.log_probs = torch.zeros(num_workers, num_envs, 1).share_memory_()
+
+        self.requests = ctx.Queue()
+        self.ready = [ctx.Event() for _ in range(num_workers)]
+
+    def act(self, slot, obs, greedy=False):
+        """Actions, values and log-probs for a worker's envs at `obs`"""
+        self.obs[slot].copy_(obs)
+        self.greedy[slot] = int(greedy)
+        self.ready[slot].clear()
+        self.requests.put(slot)
+        self.ready[slot].wait()
+        return self.actions[slot].clone(), self.values[slot].clone(), self.log_probs[slot].clone()
+
+    def state(self, slot):
+        """The recurrent state the next `act` of `slot` starts from"""
+        return self.hx[slot].clone(), self.cx[slot].clone()
+
+    def reset_state(self, slot, mask):
+        """Zero the recurrent state of the slot's envs where `mask` is 0"""
+        self.hx[slot].mul_(mask)
+        self.cx[slot].mul_(mask)
+
+    def collect(self):
+        """Block for the first request, then batch until full or the deadline"""
+        slots = [self.requests.get()]
+        deadline = time.perf_counter() + self.max_latency
+        while len(slots) < self.max_batch:
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                slots.append(self.requests.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return slots
+
+    def respond(self, model, slots):
+        """Run one batched forward over `slots` and wake their workers"""
+        index = torch.tensor(slots)
+        num_envs = self.obs.size(1)
+        obs = self.obs[index].view(-1, *self.obs.shape[2:])
+        hx = self.hx[index].view(-1, 512)
+        cx = self.cx[index].view(-1, 512)
+
+        with torch.no_grad():
+            value, logit, (hx, cx) = model((obs, (hx, cx)))
+        prob = F.softmax(logit, dim=-1)
+        log_prob = F.log_softmax(logit, dim=-1)
+
+        greedy = self.greedy[index].long().view(-1, 1).repeat(1, num_envs).view(-1, 1).to(prob.device)
+        action = greedy * prob.max(-1, keepdim=True)[1] + (1 - greedy) * prob.multinomial(1)
+
+        self.hx[index] = hx.cpu().view(len(slots), num_envs, -1)
+        self.cx[index] = cx.cpu().view(len(slots), num_envs, -1)
+        self.actions[index] = action.cpu().view(len(slots), num_envs, 1)
+        self.values[index] = value.cpu().view(len(slots), num_envs, 1)
+        self.log_probs[index] = log_prob.gather(-1, action).cpu().view(len(slots), num_envs, 1)
+
+        for slot in slots:
+            self.ready[slot].set()
+
+
+def serve(args, services, server, num_actions):
+    """Inference process: sync from the shared model and answer batched requests"""
+    log_dir = f'logs/{args.env_name}/{args.model_id}/{args.uuid}/'
+    inference_logger = setup_logger('inference', log_dir, f'inference.log')
+    print(FontColor.BLUE + f"Inference server | max batch {server.max_batch} | max latency {server.max_latency * 1e3:.1f} ms", FontColor.END)
+
+    model = ActorCritic(server.obs.size(2), num_actions, args.obs_norm if args.uint8_obs else None)
+    if torch.cuda.is_available():
+        model = model.cuda()
+    flat = FlatParameters(model)
+    model.eval()  # running normalization statistics are tracked by the learners
+
+    while True:
+        slots = server.collect()
+        start = time.perf_counter()
+        flat.sync(services.flat, args.sync_staleness)
+        server.respond(model, slots)
+        inference_logger.info({
+            'batch': len(slots),
+            'version': flat.synced,
+            'time': time.perf_counter() - start,
+            })
@@ -2,35 +2,52 @@ import torch
 import torch.nn.functional as F
 
 
-def gae(R, rewards, values, log_probs, entropies, args):
-    """Generalized Advantage Estimation"""
-    policy_loss = 0
-    value_loss = 0
-    loss = torch.zeros(1, 1)
-    for i in reversed(range(len(rewards))):
-        if torch.cuda.is_available():
-            loss = loss.cuda()
-
-        R = args.gamma * R.data + rewards[i]
-        if torch.cuda.is_available():
-            R = R.cuda()
-
-        advantage = R - values[i].data
-        value_loss = value_loss + 0.5 * advantage.pow(2)
-
-        delta_t = rewards[i] + args.gamma * values[i + 1].data.cpu() - values[i].data.cpu()
-        if torch.cuda.is_available():
-            delta_t = delta_t.cuda()
-
-        if torch.cuda.is_available():
-            loss = loss.cuda() * args.gamma * args.tau + delta_t.cuda()
-        else:
-            loss = loss.cpu() * args.gamma * args.tau + delta_t.cpu()
-
-        policy_loss = policy_loss - \
-                      log_probs[i] * loss - \
-                      args.entropy_coef * entropies[i]
+@torch.jit.script
+def discount(coefs, inputs, init):
+    # type: (Tensor, Tensor, Tensor) -> Tensor
+    """Reverse scan x[i] = inputs[i] + coefs[i] * x[i + 1], with x[T] = init"""
+    out = torch.empty_like(inputs)
+    x = init
+    steps = inputs.size(0)
+    for k in range(steps):
+        i = steps - 1 - k
+        x = inputs[i] + coefs[i] * x
+        out[i] = x
+    return out
+
+
+def _stack(tensors):
+    if isinstance(tensors, torch.Tensor):
+        return tensors
+    return torch.stack(list(tensors))
+
+
+def gae(R, rewards, values, log_probs, entropies, args, masks=None):
+    """Generalized Advantage Estimation
+
+    Takes per-step lists of (envs, 1) tensors or time-major (steps, envs, 1)
+    tensors; `values` has one more step than `rewards`. Returns and values
+    are treated as constants, as before, so the scans run outside autograd.
+    """
+    log_probs = _stack(log_probs)
+    entropies = _stack(entropies)
+    device = log_probs.device
+
+    rewards = _stack(rewards).to(device)
+    values = _stack(values).detach().to(device)
+    if masks is None:
+        masks = torch.ones_like(rewards)
+    else:
+        masks = _stack(masks).to(device)
+    R = R.detach().to(device)
+
+    returns = discount(args.gamma * masks, rewards, R)
+    value_loss = 0.5 * (returns - values[:-1]).pow(2).sum(0)
+
+    deltas = rewards + args.gamma * values[1:] * masks - values[:-1]
+    advantages = discount(args.gamma * args.tau * masks, deltas, torch.zeros_like(R))
+    policy_loss = -(log_probs * advantages).sum(0) - args.entropy_coef * entropies.sum(0)
 
     total_loss = policy_loss + args.value_loss_coef * value_loss
 
-    return total_loss
+    return total_loss.sum()
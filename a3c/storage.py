@@ -0,0 +1,86 @@
+import torch
+
+from a3c.loss import gae
+
+
+class RolloutStorage(object):
+    """Preallocated, time-major buffers for one rollout of `num_envs` envs.
+
+    `obs`, `hxs` and `cxs` hold the model inputs of every step plus the one
+    after the last step, which `after_update` carries into the next rollout.
+    `values`, `log_probs` and `entropies` are written in place and keep
+    their autograd history until `after_update`.
+    """
+    def __init__(self, num_steps, num_envs, obs_shape, obs_dtype, hidden_size=512, device='cpu'):
+        self.num_steps = num_steps
+        self.num_envs = num_envs
+
+        self.obs = torch.zeros(num_steps + 1, num_envs, *obs_shape, dtype=obs_dtype, device=device)
+        self.hxs = torch.zeros(num_steps + 1, num_envs, hidden_size, device=device)
+        self.cxs = torch.zeros(num_steps + 1, num_envs, hidden_size, device=device)
+        self.actions = torch.zeros(num_steps, num_envs, 1, dtype=torch.long, device=device)
+        self.rewards = torch.zeros(num_steps, num_envs, 1, device=device)
+        self.masks = torch.ones(num_steps, num_envs, 1, device=device)
+        self.values = torch.zeros(num_steps + 1, num_envs, 1, device=device)
+        self.log_probs = torch.zeros(num_steps, num_envs, 1, device=device)
+        self.entropies = torch.zeros(num_steps, num_envs, 1, device=device)
+
+        self.step = 0
+
+    def insert(self, obs, hx, cx, action, reward, mask, value, log_prob, entropy):
+        """Record the current step; `obs`, `hx` and `cx` are the next inputs"""
+        step = self.step
+        self.obs[step + 1].copy_(obs)
+        self.hxs[step + 1].copy_(hx.detach())
+        self.cxs[step + 1].copy_(cx.detach())
+        self.actions[step].copy_(action)
+        self.rewards[step].copy_(reward)
+        self.masks[step].copy_(mask)
+
+        # differentiable in-place writes
+        self.values[step] = value
+        self.log_probs[step] = log_prob
+        self.entropies[step] = entropy
+
+        self.step += 1
+
+    def recompute(self, model):
+        """Replace the stored outputs with one batched, differentiable pass"""
+        n = self.step
+        values, log_probs, entropies = model.evaluate_actions(
+            self.obs[:n],
+            self.hxs[0],
+            self.cxs[0],
+            self.masks[:n],
+            self.actions[:n],
+        )
+        self.values[:n] = values
+        self.log_probs[:n] = log_probs
+        self.entropies[:n] = entropies
+
+    def loss(self, R, args):
+        """A3C loss over the filled steps, bootstrapped from `R`"""
+        n = self.step
+        self.values[n] = R
+        return gae(
+            R,
+            self.rewards[:n],
+            self.values[:n + 1],
+            self.log_probs[:n],
+            self.entropies[:n],
+            args,
+            self.masks[:n],
+        )
+
+    def after_update(self):
+        """Start the next rollout from the last inputs, without autograd history"""
+        n = self.step
+        self.obs[0].copy_(self.obs[n])
+        self.hxs[0].copy_(self.hxs[n])
+        self.cxs[0].copy_(self.cxs[n])
+
+        self.values = self.values.detach()
+        self.log_probs = self.log_probs.detach()
+        self.entropies = self.entropies.detach()
+
+        self.step = 0
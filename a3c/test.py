@@ -12,7 +12,7 @@ import torch
 import torch.nn.functional as F
 from emoji import emojize
 
-from models import ActorCritic
+from models import ActorCritic, FlatParameters
 from mario_actions import ACTIONS
 from mario_wrapper import create_mario_env
 from optimizers import SharedAdam
@@ -21,7 +21,8 @@ from utils import FontColor, decode_info, setup_logger
 from a3c.utils import ensure_shared_grads, choose_action
 
 
-def test(rank, args, shared_model, counter, device):
+def test(rank, args, services, counter, device):
+    services.require('checkpoints')
     time.sleep(2.)
 
     # logging
@@ -31,7 +32,7 @@ def test(rank, args, shared_model, counter, device):
 
     # torch.manual_seed(args.seed + rank)
 
-    env = create_mario_env(args.env_name, ACTIONS[args.move_set], args.buffer_depth)
+    env = create_mario_env(args.env_name, ACTIONS[args.move_set], args.buffer_depth, args.uint8_obs, args.reset_cache, args.frame_skip, args.max_pool)
     if args.record:
         if not os.path.exists(f'playback/{args.env_name}/'):
             os.makedirs(f'playback/{args.env_name}/{args.model_id}', exist_ok=True)
@@ -41,10 +42,11 @@ def test(rank, args, shared_model, counter, device):
     observation_space = env.observation_space.shape[0]
     action_space = env.action_space.n
 
-    model = ActorCritic(observation_space, action_space)
+    model = ActorCritic(observation_space, action_space, args.obs_norm if args.uint8_obs else None)
     if torch.cuda.is_available():
         model.cuda()
     model.eval()
+    flat = FlatParameters(model)
 
     state = env.reset()
     state = torch.from_numpy(state)
@@ -57,7 +59,7 @@ def test(rank, args, shared_model, counter, device):
         episode_length += 1
         # shared model sync
         if done:
-            model.load_state_dict(shared_model.state_dict())
+            flat.sync(services.flat)
             cx = torch.zeros(1, 512)
             hx = torch.zeros(1, 512)
 
@@ -115,6 +117,7 @@ def test(rank, args, shared_model, counter, device):
             )
 
             result_logger.info(info_log)
+            services.checkpoints.report(flat.synced, reward_sum)
 
             reward_sum = 0
             episode_length = 0
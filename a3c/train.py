@@ -5,156 +5,241 @@ import logging
 from collections import deque
 from itertools import count
 
-import numpy as np
 import gym
 import torch
 import torch.nn as nn
 import torch.optim as optim
 import torch.nn.functional as F
 
-from models import ActorCritic
+from models import ActorCritic, FlatParameters
 from mario_actions import ACTIONS
-from mario_wrapper import create_mario_env
-from optimizers import SharedAdam
-from utils import FontColor, save_checkpoint, get_epsilon, setup_logger
+from mario_vec_env import create_mario_vec_env
+from optimizers import SharedAdam, create_optimizer
+from utils import FontColor, PhaseTimer, ActionHistogram, get_epsilon
 
-from a3c.utils import ensure_shared_grads, choose_action
-from a3c.loss import gae
+from a3c.utils import ensure_shared_buffers, choose_action
+from a3c.storage import RolloutStorage
 
 
-def train(rank, args, shared_model, counter, lock, optimizer=None, device='cpu', select_sample=True):
+def train(rank, args, shared_model, services, counter, lock, optimizer=None, device='cpu', select_sample=True, server=None):
     # torch.manual_seed(args.seed + rank)
 
-    # logging
-    log_dir = f'logs/{args.env_name}/{args.model_id}/{args.uuid}/'
-    loss_logger = setup_logger('loss', log_dir, f'loss.log')
-    action_logger = setup_logger('actions', log_dir, f'actions.log')
-
     text_color = FontColor.RED if select_sample else FontColor.GREEN
     print(text_color + f"Process: {rank: 3d} | {'Sampling' if select_sample else 'Decision'} | Device: {str(device).upper()}", FontColor.END)
 
-    env = create_mario_env(args.env_name, ACTIONS[args.move_set], args.buffer_depth)
-    observation_space = env.observation_space.shape[0]
-    action_space = env.action_space.n
+    # one env runs in-process; more run in subprocesses behind a batched forward
+    env = create_mario_vec_env(
+        args.env_name,
+        args.num_envs,
+        ACTIONS[args.move_set],
+        args.buffer_depth,
+        args.uint8_obs,
+        args.reset_cache,
+        args.frame_skip,
+        args.max_pool,
+    )
 
     # env.seed(args.seed + rank)
 
-    model = ActorCritic(observation_space, action_space)
+    iteration = create_worker(rank, args, env, shared_model, services, counter, lock, optimizer, device, select_sample, server)
+    for t in count(start=args.start_step):
+        iteration(t)
+
+
+def create_worker(rank, args, env, shared_model, services, counter, lock, optimizer=None, device='cpu', select_sample=True, server=None):
+    """Sets up an A3C worker stepping `env`; returns its `iteration(t)`,
+    one rollout and update of the shared model"""
+    services.require('checkpoints', 'telemetry', 'grads')
+
+    # logging, written by the telemetry process
+    log_dir = f'logs/{args.env_name}/{args.model_id}/{args.uuid}/'
+    telemetry = services.telemetry
+    profiler = PhaseTimer(
+        rank,
+        log_dir,
+        args.profile,
+        args.profile_interval,
+        args.profile_capture,
+        args.profile_start,
+        args.profile_ranks,
+        args.profile_tool,
+    )
+
+    observation_space = env.observation_space.shape[0]
+    action_space = env.action_space.n
+    num_envs = env.num_envs
+
+    model = ActorCritic(observation_space, action_space, args.obs_norm if args.uint8_obs else None)
     if torch.cuda.is_available():
         model = model.cuda()
         model.device = device
+    flat = FlatParameters(model)
+    actions = ActionHistogram(action_space, args.action_log_interval)
+    grads = services.grads
+    grads.attach(model, shared_model)
 
-    if optimizer is None:
-        optimizer = optim.Adam(shared_model.parameters(), lr=args.lr)
+    if optimizer is None:  # per-worker optimizer state
+        optimizer = create_optimizer(args.optimizer, shared_model.parameters(), args.lr)
 
     model.train()
 
-    state = env.reset()
-    state = torch.from_numpy(state)
-    done = True
+    state = env.reset_tensor()
+    rollouts = RolloutStorage(args.num_steps, num_envs, state.shape[1:], state.dtype, device=model.device)
+    rollouts.obs[0].copy_(state)
 
-    episode_length = 0
-    for t in count(start=args.start_step):
+    def iteration(t):
         if t % args.save_interval == 0 and t > 0:
-            save_checkpoint(shared_model, optimizer, args, t)
-
-        # Sync shared model
-        model.load_state_dict(shared_model.state_dict())
-
-        if done:
-            cx = torch.zeros(1, 512)
-            hx = torch.zeros(1, 512)
-        else:
-            cx = cx.detach()
-            hx = hx.detach()
-
-        values = []
-        log_probs = []
-        rewards = []
-        entropies = []
+            save_start = time.perf_counter()
+            services.checkpoints.request(t)
+            telemetry.log('checkpoints', {'rank': rank, 'step': t, 'stall': time.perf_counter() - save_start})
+            profiler.lap('checkpoint')
+
+        # Sync shared model, skipping it while within the staleness bound
+        start = time.perf_counter()
+        staleness = flat.staleness(services.flat)
+        synced = flat.sync(services.flat, args.sync_staleness)
+        telemetry.sample('sync', {
+            'rank': rank,
+            'version': flat.synced,
+            'staleness': staleness,
+            'synced': synced,
+            'time': time.perf_counter() - start,
+            })
+        profiler.lap('sync')
+
+        # views of the storage share its version counter, so the graph gets
+        # copies that later in-place writes to the storage cannot invalidate
+        hx = rollouts.hxs[0].clone()
+        cx = rollouts.cxs[0].clone()
+
+        # with --recompute acting keeps no graph, and leaves ObservationNorm's
+        # running statistics to the batched pass
+        if args.recompute:
+            model.eval()
 
         for step in range(args.num_steps):
-            episode_length += 1
+            if server is not None:
+                # the inference process acts, --recompute builds the graph
+                action, value, log_prob = server.act(rank, rollouts.obs[step], not select_sample)
+                hx, cx = server.state(rank)
+                profiler.lap('forward')
+                entropy = torch.zeros_like(value)
+                reason = 'multinomial' if select_sample else 'choice'
+
+                if select_sample and args.greedy_eps and random.random() < get_epsilon(t):
+                    action = torch.randint(0, action_space, (num_envs, 1))
+                    reason = 'uniform'
+
+            else:
+                with torch.set_grad_enabled(not args.recompute):
+                    value, logit, (hx, cx) = model((rollouts.obs[step].clone(), (hx, cx)))
 
-            value, logit, (hx, cx) = model((state.unsqueeze(0), (hx, cx)))
+                    prob = F.softmax(logit, dim=-1)
+                    log_prob = F.log_softmax(logit, dim=-1)
+                    entropy = -(log_prob * prob).sum(-1, keepdim=True)
+                profiler.lap('forward')
 
-            prob = F.softmax(logit, dim=-1)
-            log_prob = F.log_softmax(logit, dim=-1)
-            entropy = -(log_prob * prob).sum(-1, keepdim=True)
-            entropies.append(entropy)
+                reason = ''
 
-            reason = ''
+                if select_sample:
+                    rand = random.random()
+                    epsilon = get_epsilon(t)
+                    if rand < epsilon and args.greedy_eps:
+                        action = torch.randint(0, action_space, (num_envs, 1))
+                        reason = 'uniform'
 
-            if select_sample:
-                rand = random.random()
-                epsilon = get_epsilon(t)
-                if rand < epsilon and args.greedy_eps:
-                    action = torch.randint(0, action_space, (1, 1))
-                    reason = 'uniform'
+                    else:
+                        action = prob.multinomial(1)
+                        reason = 'multinomial'
 
                 else:
-                    action = prob.multinomial(1)
-                    reason = 'multinomial'
-
-            else:
-                action = prob.max(-1, keepdim=True)[1]
-                reason = 'choice'
+                    action = prob.max(-1, keepdim=True)[1]
+                    reason = 'choice'
 
-            action_logger.info({
-                'rank': rank,
-                'action': action.item(),
-                'reason': reason,
-                })
+                log_prob = log_prob.gather(-1, action.to(log_prob.device))
+            profiler.lap('sample')
 
+            if actions.add(action.view(-1).cpu().numpy(), reason):
+                telemetry.log('actions', {'rank': rank, **actions.pop()})
+            profiler.lap('log')
 
             if torch.cuda.is_available():
                 action = action.cuda()
                 value = value.cuda()
 
-            log_prob = log_prob.gather(-1, action)
-
-            action_out = ACTIONS[args.move_set][action.item()]
-
-            state, reward, done, info = env.step(action.item())
-
-            done = done or episode_length >= args.max_episode_length
-            reward = max(min(reward, 50), -50)  # h/t @ArvindSoma
+            _, reward, done, info, mask = env.step_episodes(action.view(-1).cpu().numpy(), args.max_episode_length)
+            profiler.lap('env')
 
             with lock:
-                counter.value += 1
-
-            if done:
-                episode_length = 0
-                state = env.reset()
-
-            state = torch.from_numpy(state)
-            values.append(value)
-            log_probs.append(log_prob)
-            rewards.append(reward)
-
-            if done:
+                counter.value += num_envs
+            profiler.lap('counter')
+
+            # finished episodes start over with a fresh recurrent state
+            mask = mask.to(hx.device)
+            hx = hx * mask
+            cx = cx * mask
+            if server is not None:
+                server.reset_state(rank, mask.cpu())
+
+            rollouts.insert(
+                state, hx, cx, action,
+                torch.from_numpy(reward).float().unsqueeze(1),
+                mask, value, log_prob, entropy,
+            )
+            profiler.lap('storage')
+
+            if done.all():
                 break
 
-        R = torch.zeros(1, 1)
-        if not done:
-            value, _, _ = model((state.unsqueeze(0), (hx, cx)))
+        R = torch.zeros(num_envs, 1)
+        if not done.all():
+            # the next rollout's first step normalizes this frame, so the
+            # bootstrap leaves ObservationNorm's running statistics alone
+            model.eval()
+            with torch.no_grad():
+                value, _, _ = model((rollouts.obs[rollouts.step], (hx, cx)))
             R = value.data
+        model.train()
+        profiler.lap('forward')
 
-        values.append(R)
+        if args.recompute:
+            rollouts.recompute(model)
+            profiler.lap('recompute')
 
-        loss = gae(R, rewards, values, log_probs, entropies, args)
+        loss = rollouts.loss(R.to(rollouts.values.device), args)
+        profiler.lap('loss')
 
-        loss_logger.info({'rank': rank, 'sampling': select_sample, 'loss': loss.item()})
+        telemetry.log('loss', {'rank': rank, 'sampling': select_sample, 'loss': loss.item()})
+        profiler.lap('log')
 
-        optimizer.zero_grad()
+        grads.zero_grad()
 
         (loss).backward()
         # loss.backward()
         nn.utils.clip_grad_norm_(model.parameters(), args.max_grad_norm)
+        profiler.lap('backward')
+
+        ensure_shared_buffers(model, shared_model)
+        rollouts.after_update()
+        profiler.lap('storage')
+
+        start = time.perf_counter()
+        if grads.step(rank, optimizer):
+            services.flat.bump()
+        profiler.lap('optimizer')
+        telemetry.sample('grads', {
+            'rank': rank,
+            'mode': grads.mode,
+            'optimizer': args.optimizer,
+            'step_time': time.perf_counter() - start,
+            **grads.stats(),
+            })
+        profiler.lap('log')
+        profiler.step()
+
+    profiler.skip()
+    return iteration
 
-        ensure_shared_grads(model, shared_model)
-
-        optimizer.step()
 
 if __name__ == "__main__":
     pass
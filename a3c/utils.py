@@ -9,6 +9,12 @@ def ensure_shared_grads(model, shared):
         shared_param._grad = param.grad
 
 
+def ensure_shared_buffers(model, shared):
+    """Push running statistics (e.g. ObservationNorm) back to the shared model"""
+    for buffer, shared_buffer in zip(model.buffers(), shared.buffers()):
+        shared_buffer.copy_(buffer)
+
+
 def choose_action(model, state, hx, cx):
     model.eval()  # set to eval mode
     _, logits, _ = model.forward((state.unsqueeze(0), (hx, cx)))
@@ -1,7 +1,6 @@
 import os
 import time
 import argparse
-import warnings
 
 import gym
 import torch
@@ -9,11 +8,8 @@ import torch.multiprocessing as _mp
 import torchvision
 from xvfbwrapper import Xvfb
 
-from models import ActorCritic
-from optimizers import SharedAdam
-from mario_wrapper import create_mario_env
-from a3c import train, test
-from utils import FontColor, fetch_name, debug, restore_checkpoint, cli, setup_logger, plot_loss, plot_reward
+from launcher import launch
+from utils import FontColor, fetch_name, debug, cli, setup_logger, plot_loss, plot_reward
 from mario_actions import ACTIONS
 
 
@@ -43,87 +39,7 @@ def main(args):
     args_logger.info(vars(args))
     env_logger.info(vars(os.environ))
 
-    env = create_mario_env(args.env_name, ACTIONS[args.move_set], args.buffer_depth)
-
-    shared_model = ActorCritic(env.observation_space.shape[0], env.action_space.n)
-
-    if torch.cuda.is_available():
-        shared_model = shared_model.cuda()
-
-    shared_model.share_memory()
-
-    optimizer = SharedAdam(shared_model.parameters(), lr=args.lr)
-    optimizer.share_memory()
-
-    if args.load_model:  # TODO Load model before initializing optimizer
-        checkpoint_file = f"{args.env_name}/{args.model_id}_{args.algorithm}_params.tar"
-        checkpoint = restore_checkpoint(checkpoint_file)
-        assert args.env_name == checkpoint['env'], \
-            "Checkpoint is for different environment"
-        args.model_id = checkpoint['id']
-        args.start_step = checkpoint['step']
-        print("Loading model from checkpoint...")
-        print(f"Environment: {args.env_name}")
-        print(f"      Agent: {args.model_id}")
-        print(f"   Controls: {args.move_set}")
-        print(f"      Start: Step {args.start_step}")
-        shared_model.load_state_dict(checkpoint['model_state_dict'])
-        optimizer.load_state_dict(checkpoint['optimizer_state_dict'])
-
-    else:
-        print(f"Environment: {args.env_name}")
-        print(f"      Agent: {args.model_id}")
-        print(f"   Controls: {args.move_set}")
-
-    torch.manual_seed(args.seed)
-
-    print(
-        FontColor.BLUE + \
-        f"CPUs:    {mp.cpu_count(): 3d} | " + \
-        f"GPUs: {None if not torch.cuda.is_available() else torch.cuda.device_count()}" + \
-        FontColor.END
-    )
-
-    processes = []
-
-    counter = mp.Value('i', 0)
-    lock = mp.Lock()
-
-    # Queue training processes
-    num_processes = args.num_processes
-    no_sample = args.non_sample  # count of non-sampling processes
-
-    if args.num_processes > 1:
-        num_processes = args.num_processes - 1
-
-    samplers = num_processes - no_sample
-
-    for rank in range(0, num_processes):
-        device = 'cpu'
-        if torch.cuda.is_available():
-            device = 0  # TODO: Need to move to distributed to handle multigpu
-        if rank < samplers:  # random action
-            p = mp.Process(
-                target=train,
-                args=(rank, args, shared_model, counter, lock, optimizer, device),
-            )
-        else:  # best action
-            p = mp.Process(
-                target=train,
-                args=(rank, args, shared_model, counter, lock, optimizer, device, False),
-            )
-        p.start()
-        time.sleep(1.)
-        processes.append(p)
-
-    # Queue test process
-    p = mp.Process(
-        target=test,
-        args=(args.num_processes, args, shared_model, counter, 0)
-    )
-
-    p.start()
-    processes.append(p)
+    processes, _ = launch(args, mp)
 
     for p in processes:
         p.join()
@@ -0,0 +1,89 @@
+import os
+import time
+import argparse
+import tempfile
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+import torch.multiprocessing as _mp
+
+from models import ActorCritic, FlatParameters
+from optimizers import SharedAdam
+from utils import CheckpointService, Services
+from utils.transport import checkpoint_path, checkpoint_state, restore_checkpoint
+from utils.mmap_checkpoint import save_mmap_checkpoint
+
+
+parser = argparse.ArgumentParser('Mario.ai Checkpoint Benchmark')
+parser.add_argument('--processes', type=int, default=16, help='workers saving concurrently (default: 16)')
+parser.add_argument('--updates', type=int, default=100, help='updates per worker and mode (default: 100)')
+parser.add_argument('--save-interval', type=int, default=10, help='updates between saves, as in the trainer (default: 10)')
+parser.add_argument('--checkpoint-interval', type=float, default=1., help='minimum seconds between service writes (default: 1)')
+# read by the checkpoint helpers
+parser.add_argument('--env-name', default='benchmark')
+parser.add_argument('--model-id', default='checkpoint')
+parser.add_argument('--algorithm', default='A3C')
+parser.add_argument('--checkpoint-format', default='tar', choices=['tar', 'mmap'], help='format both modes write (default: tar)')
+parser.add_argument('--uuid', default='benchmark')
+
+
+def worker(rank, args, dir, shared_model, services, optimizer, use_service, barrier, results):
+    torch.set_num_threads(1)
+    model = ActorCritic(4, 12)
+    obs, hx, cx = torch.randn(1, 4, 84, 84), torch.zeros(1, 512), torch.zeros(1, 512)
+
+    stalls = []
+    barrier.wait()
+    start = time.perf_counter()
+    for t in range(1, args.updates + 1):
+        if t % args.save_interval == 0:
+            save_start = time.perf_counter()
+            if use_service:
+                services.checkpoints.request(t)
+            else:  # every worker rewrites the same file, as train did
+                path = checkpoint_path(args, dir)
+                save = torch.save if path.endswith('.tar') else save_mmap_checkpoint
+                save(checkpoint_state(shared_model, optimizer, args, t), path)
+            stalls.append(time.perf_counter() - save_start)
+
+        value, logit, _ = model((obs, (hx, cx)))
+        (value.pow(2).mean() - F.log_softmax(logit, dim=-1).mean()).backward()
+        services.flat.bump()
+    results.put((args.updates / (time.perf_counter() - start), stalls))
+
+
+def main(args):
+    mp = _mp.get_context('spawn')
+    with tempfile.TemporaryDirectory() as dir:
+        os.makedirs(os.path.dirname(checkpoint_path(args, dir)))
+        for name, use_service in (('every worker (before)', False), ('checkpoint service', True)):
+            shared_model = ActorCritic(4, 12)
+            services = Services(FlatParameters(shared_model, mp.Lock()).share_memory())
+            shared_model.share_memory()
+            optimizer = SharedAdam(shared_model.parameters(), lr=1e-4)
+            optimizer.share_memory()
+            services.checkpoints = CheckpointService(mp, args.checkpoint_interval)
+            if use_service:
+                services.checkpoints.start(shared_model, services.flat, optimizer, args, dir)
+
+            barrier, results = mp.Barrier(args.processes), mp.Queue()
+            processes = [mp.Process(target=worker, args=(rank, args, dir, shared_model, services, optimizer, use_service, barrier, results)) for rank in range(args.processes)]
+            for p in processes:
+                p.start()
+            stats = [results.get() for _ in range(args.processes)]
+            for p in processes:
+                p.join()
+
+            rate = np.mean([s[0] for s in stats])
+            stalls = np.concatenate([s[1] for s in stats]) * 1e3
+            try:
+                restore_checkpoint(os.path.relpath(checkpoint_path(args, dir), dir), dir)
+                intact = 'loads'
+            except Exception as e:
+                intact = f'torn ({type(e).__name__})'
+            print(f"{name:>22s}: {rate: 7.1f} updates/sec per worker | stall p50 {np.percentile(stalls, 50): 8.3f} ms | p99 {np.percentile(stalls, 99): 8.3f} ms | max {stalls.max(): 8.3f} ms | file {intact}")
+
+
+if __name__ == "__main__":
+    _ = main(parser.parse_args())
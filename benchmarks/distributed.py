@@ -0,0 +1,95 @@
+import time
+import argparse
+
+import torch
+import torch.nn.functional as F
+import torch.distributed as dist
+import torch.multiprocessing as _mp
+
+from models import ActorCritic, FlatParameters
+from a3c.distributed import NodeSync
+
+
+parser = argparse.ArgumentParser('Mario.ai Distributed Sync Benchmark')
+parser.add_argument('--nodes', type=int, nargs='+', default=[1, 2, 4], help='node counts launched on localhost (default: 1 2 4)')
+parser.add_argument('--seconds', type=float, default=20., help='seconds of training per node count and mode (default: 20)')
+parser.add_argument('--dist-interval', type=float, default=1., help='seconds between syncs (default: 1)')
+parser.add_argument('--topk-ratio', type=float, default=0.01, help='share of entries sent with topk (default: 0.01)')
+parser.add_argument('--port', type=int, default=29500, help='first localhost port to use (default: 29500)')
+
+CONFIGS = (
+    ('allreduce', 'none'),
+    ('allreduce', 'fp16'),
+    ('allreduce', 'topk'),
+    ('ps', 'none'),
+    ('ps', 'fp16'),
+    ('ps', 'topk'),
+)
+
+
+def node(rank, world_size, port, args, mode, compression, results):
+    """One trainer node: a local SGD loop standing in for its workers"""
+    torch.set_num_threads(1)
+    torch.manual_seed(rank)
+    dist.init_process_group('gloo', init_method=f'tcp://127.0.0.1:{port}', rank=rank, world_size=world_size)
+
+    model = ActorCritic(4, 12)
+    flat = FlatParameters(model)
+    sync = NodeSync(flat, mode, compression, args.topk_ratio)
+    optimizer = torch.optim.SGD(model.parameters(), lr=1e-3)
+    obs, hx, cx = torch.randn(8, 4, 84, 84), torch.zeros(8, 512), torch.zeros(8, 512)
+
+    updates, sent, sync_time = 0, 0, 0.
+    start = last = time.perf_counter()
+    while time.perf_counter() - start < args.seconds:
+        value, logit, _ = model((obs, (hx, cx)))
+        loss = value.pow(2).mean() - F.log_softmax(logit, dim=-1).mean()
+        optimizer.zero_grad()
+        loss.backward()
+        optimizer.step()
+        updates += 1
+
+        if time.perf_counter() - last > args.dist_interval:
+            t = time.perf_counter()
+            sent += sync.sync()
+            sync_time += time.perf_counter() - t
+            last = time.perf_counter()
+    elapsed = time.perf_counter() - start
+
+    # with no local updates pending, one more sync must leave all nodes equal
+    sync.sync()
+    spread = (flat.flat - sync.base).abs().max().view(1)
+    gap = flat.flat.clone()
+    dist.broadcast(gap, 0)
+    spread = torch.max(spread, (flat.flat - gap).abs().max().view(1))
+    dist.all_reduce(spread, op=dist.ReduceOp.MAX)
+
+    results.put((updates / elapsed, sent, sync_time / elapsed, spread.item()))
+
+
+def main(args):
+    mp = _mp.get_context('spawn')
+    port = args.port
+    for mode, compression in CONFIGS:
+        print(f"--dist-mode {mode} --compression {compression}")
+        baseline = None
+        for n in args.nodes:
+            results = mp.Queue()
+            processes = [mp.Process(target=node, args=(rank, n, port, args, mode, compression, results)) for rank in range(n)]
+            port += 1
+            for p in processes:
+                p.start()
+            stats = [results.get() for _ in range(n)]
+            for p in processes:
+                p.join()
+
+            rate = sum(s[0] for s in stats)
+            baseline = baseline or rate / n
+            sent = sum(s[1] for s in stats) / n
+            share = sum(s[2] for s in stats) / n
+            spread = max(s[3] for s in stats)
+            print(f"{n: 3d} nodes: {rate: 8.1f} updates/sec | efficiency {rate / (n * baseline): 6.1%} | {sent / 2**20: 8.1f} MB sent per node | {share: 6.1%} time syncing | max spread {spread:.2e}")
+
+
+if __name__ == "__main__":
+    _ = main(parser.parse_args())
@@ -0,0 +1,35 @@
+import time
+import argparse
+
+import torch
+
+from models import ActorCritic
+from mario_actions import ACTIONS
+from mario_vec_env import create_mario_vec_env
+from a3c.evaluate import run_episodes, summarize
+
+
+parser = argparse.ArgumentParser('Mario.ai Evaluation Benchmark')
+parser.add_argument('--env-name', default='SuperMarioBrosNoFrameskip-1-1-v0', help='environment to evaluate on')
+parser.add_argument('--episodes', type=int, default=16, help='episodes per evaluation round (default: 16)')
+parser.add_argument('--max-episode-length', type=int, default=2000, help='agent steps before an episode is cut (default: 2000)')
+parser.add_argument('--buffer-depth', type=int, default=4, help='depth of the frame buffer (default: 4)')
+
+
+def main(args):
+    torch.set_num_threads(1)
+    model = ActorCritic(args.buffer_depth, len(ACTIONS['complex']))
+    model.eval()
+
+    # one env is the old test process without its rendering and reset delay
+    for processes in (1, 2, 4, 8, 16):
+        env = create_mario_vec_env(args.env_name, processes, ACTIONS['complex'], args.buffer_depth)
+        start = time.perf_counter()
+        summary = summarize(run_episodes(model, env, args.episodes, args.max_episode_length))
+        elapsed = time.perf_counter() - start
+        env.close()
+        print(f"{processes: 3d} envs: {elapsed: 8.2f} s per round of {args.episodes} | {args.episodes / elapsed: 6.2f} episodes/sec | mean reward {summary['reward']: 8.2f}")
+
+
+if __name__ == "__main__":
+    _ = main(parser.parse_args())
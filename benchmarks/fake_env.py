@@ -0,0 +1,57 @@
+import time
+
+import numpy as np
+import gym
+from gym.spaces.box import Box
+from gym.spaces.discrete import Discrete
+from gym_super_mario_bros.actions import COMPLEX_MOVEMENT
+
+
+class FakeMarioEnv(gym.Env):
+    """In-process stand-in for a discretized Super Mario Bros env.
+
+    Cycles through a pool of pregenerated 240x256x3 frames and reports the
+    same `info` fields as gym-super-mario-bros, without booting the emulator.
+    With `fps` set, each step busy-waits to emulate the emulator's speed.
+    Mario powers up a third of the way in and every other episode ends on
+    the flag.
+    """
+    def __init__(self, move_set=COMPLEX_MOVEMENT, episode_length=2000, pool_size=16, seed=0, fps=None):
+        self.observation_space = Box(low=0, high=255, shape=(240, 256, 3), dtype=np.uint8)
+        self.action_space = Discrete(len(move_set))
+        self.episode_length = episode_length
+        self.step_time = 1. / fps if fps else 0.
+
+        rng = np.random.RandomState(seed)
+        self.frames = rng.randint(0, 256, (pool_size, 240, 256, 3)).astype(np.uint8)
+        self.steps = 0
+        self.episodes = 0
+
+    def _info(self):
+        return {
+            'coins': 0,
+            'flag_get': self.steps >= self.episode_length and self.episodes % 2 == 1,
+            'life': 2,
+            'score': 100 * (self.steps // 500),
+            'stage': 1,
+            'status': 'small' if self.steps < self.episode_length // 3 else 'tall',
+            'time': 400 - self.steps // 24,
+            'world': 1,
+            'x_pos': 40 + self.steps // 2,
+        }
+
+    def step(self, action):
+        if self.step_time:
+            deadline = time.perf_counter() + self.step_time
+            while time.perf_counter() < deadline:
+                pass
+        self.steps += 1
+        done = self.steps >= self.episode_length
+        frame = self.frames[self.steps % len(self.frames)]
+
+        return frame, 0., done, self._info()
+
+    def reset(self):
+        self.steps = 0
+        self.episodes += 1
+        return self.frames[0]
@@ -0,0 +1,134 @@
+import sys
+import time
+import argparse
+import tracemalloc
+from collections import deque
+
+import numpy as np
+import gym
+from gym.spaces.box import Box
+from gym.spaces.discrete import Discrete
+
+from mario_wrapper import FrameBuffer
+
+
+parser = argparse.ArgumentParser('Mario.ai FrameBuffer Benchmark')
+parser.add_argument('--steps', type=int, default=5000, help='number of agent steps (default: 5000)')
+parser.add_argument('--buffer-depth', type=int, default=4, help='depth of the frame buffer (default: 4)')
+
+TRACEBACK_DEPTH = 25  # frames kept per traced allocation, for the all_frames filter
+
+
+class StaticFrameEnv(gym.Env):
+    """Returns the same preallocated frame every step, so it allocates nothing"""
+    def __init__(self, dtype=np.float32):
+        self.observation_space = Box(low=0, high=255, shape=(1, 84, 84), dtype=np.uint8)
+        self.action_space = Discrete(1)
+        self.frame = np.random.rand(1, 84, 84).astype(dtype)
+        self.info = {}
+
+    def step(self, action):
+        return self.frame, 0., False, self.info
+
+    def reset(self):
+        return self.frame
+
+
+class LegacyFrameBuffer(gym.Wrapper):
+    """The deque + np.stack implementation FrameBuffer replaced"""
+    def __init__(self, env=None, skip=16):
+        super(LegacyFrameBuffer, self).__init__(env)
+        self.skip = skip
+        self.buffer = deque(maxlen=self.skip)
+
+    def step(self, action):
+        obs, reward, is_done, info = self.env.step(action)
+        total_reward = reward
+        self.buffer.append(obs)
+        for i in range(self.skip - 1):
+            if not is_done:
+                obs, reward, is_done, info = self.env.step(action)
+                total_reward += reward
+            self.buffer.append(obs)
+
+        frame = np.stack(self.buffer, axis=0)
+        frame = np.reshape(frame, (self.skip, 84, 84))
+        return frame, total_reward, is_done, info
+
+    def reset(self):
+        self.buffer.clear()
+        obs = self.env.reset()
+        for i in range(self.skip):
+            self.buffer.append(obs)
+        frame = np.stack(self.buffer, axis=0)
+        return np.reshape(frame, (self.skip, 84, 84))
+
+
+def measure(env, steps):
+    """Steps/sec, bytes still held by the wrapper module and peak traced bytes"""
+    env.reset()
+    for _ in range(10):
+        env.step(0)
+
+    # all_frames also matches allocations made inside numpy or torch on
+    # behalf of the wrapper, not only those whose top frame is in it
+    module = tracemalloc.Filter(True, sys.modules[type(env).__module__].__file__, all_frames=True)
+    tracemalloc.start(TRACEBACK_DEPTH)
+    before = tracemalloc.take_snapshot().filter_traces([module])
+    for _ in range(steps):
+        env.step(0)
+    after = tracemalloc.take_snapshot().filter_traces([module])
+    tracemalloc.stop()
+    net = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+
+    # a fresh start resets the peak (tracemalloc.reset_peak needs Python 3.9)
+    tracemalloc.start()
+    base, _ = tracemalloc.get_traced_memory()
+    for _ in range(steps):
+        env.step(0)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    for _ in range(steps):
+        env.step(0)
+    rate = steps / (time.perf_counter() - start)
+
+    return rate, net, peak - base
+
+
+def main(args):
+    ring = FrameBuffer(StaticFrameEnv(), args.buffer_depth)
+    legacy = LegacyFrameBuffer(StaticFrameEnv(), args.buffer_depth)
+    obs_bytes = ring.reset().nbytes
+
+    for name, env in (('deque (before)', legacy), ('ring buffer', ring)):
+        rate, net, peak = measure(env, args.steps)
+        print(f"{name:>16s}: {rate: 10.1f} steps/sec | net: {net: 8d} B | peak per step: {peak: 8d} B")
+
+    failures = check_no_allocation(ring, args.steps, obs_bytes)
+    for failure in failures:
+        print(f"FAILED: {failure}")
+    if not failures:
+        print(f"Steady-state allocation per step is zero (observation: {obs_bytes} B)")
+    return failures
+
+
+def check_no_allocation(env, steps, obs_bytes):
+    """The check asked for with the ring buffer: once warm, a FrameBuffer
+    step allocates nothing. No bytes may stay held by allocations with
+    mario_wrapper anywhere in their traceback, and the traced peak over
+    `steps` steps must stay below one observation. The repo has no test
+    suite, so this runs here and sets the exit code."""
+    _, net, peak = measure(env, steps)
+    failures = []
+    if net > 0:
+        failures.append(f"FrameBuffer held {net} more bytes after {steps} steps")
+    if peak >= obs_bytes:
+        failures.append(f"FrameBuffer allocated {peak} bytes in a single step")
+    return failures
+
+
+if __name__ == "__main__":
+    failures = main(parser.parse_args())
+    sys.exit(1 if failures else 0)
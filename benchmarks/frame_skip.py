@@ -0,0 +1,58 @@
+import time
+import argparse
+
+import gym_super_mario_bros
+from nes_py.wrappers import BinarySpaceToDiscreteSpaceEnv
+from gym_super_mario_bros.actions import COMPLEX_MOVEMENT
+
+from mario_wrapper import wrap_mario
+from benchmarks.fake_env import FakeMarioEnv
+
+
+parser = argparse.ArgumentParser('Mario.ai Frame Skip Benchmark')
+parser.add_argument('--env-name', default='SuperMarioBrosNoFrameskip-1-1-v0', help='environment to step')
+parser.add_argument('--fake', action='store_true', help='step an in-process fake env to isolate wrapper cost')
+parser.add_argument('--frames', type=int, default=2000, help='NES frames per configuration (default: 2000)')
+parser.add_argument('--frame-skip', type=int, default=4, help='frame skip of the lazy configurations (default: 4)')
+parser.add_argument('--uint8-obs', action='store_true', help='benchmark the uint8 observation stack')
+
+
+def make_env(args):
+    if args.fake:
+        return FakeMarioEnv()
+    env = gym_super_mario_bros.make(args.env_name)
+    return BinarySpaceToDiscreteSpaceEnv(env, COMPLEX_MOVEMENT)
+
+
+def run(args, buffer_depth, frame_skip, max_pool):
+    env = wrap_mario(make_env(args), buffer_depth, args.uint8_obs, frame_skip=frame_skip, max_pool=max_pool)
+    frames_per_step = buffer_depth * frame_skip
+    steps = max(args.frames // frames_per_step, 1)
+
+    env.reset()
+    start = time.perf_counter()
+    for _ in range(steps):
+        _, _, done, _ = env.step(0)
+        if done:
+            env.reset()
+    elapsed = time.perf_counter() - start
+    env.close()
+
+    return steps / elapsed, steps * frames_per_step / elapsed
+
+
+def main(args):
+    configs = (
+        ('every frame (before)', 1, False),
+        (f'frame skip {args.frame_skip}', args.frame_skip, False),
+        (f'frame skip {args.frame_skip} + max', args.frame_skip, True),
+    )
+    for buffer_depth in (4, 16):
+        print(f"--buffer-depth {buffer_depth}")
+        for name, frame_skip, max_pool in configs:
+            steps, frames = run(args, buffer_depth, frame_skip, max_pool)
+            print(f"{name:>22s}: {steps: 9.1f} agent steps/sec | {frames: 10.1f} NES frames/sec")
+
+
+if __name__ == "__main__":
+    _ = main(parser.parse_args())
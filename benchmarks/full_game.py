@@ -0,0 +1,186 @@
+import os
+import sys
+import json
+import time
+import socket
+import platform
+import argparse
+import subprocess
+
+import numpy as np
+import torch
+import torch.multiprocessing as _mp
+import gym_super_mario_bros
+from nes_py.wrappers import BinarySpaceToDiscreteSpaceEnv
+
+from models import ActorCritic
+from mario_actions import ACTIONS
+from mario_wrapper import wrap_mario
+from utils.transport import restore_checkpoint
+
+
+parser = argparse.ArgumentParser('Mario.ai Full Game Benchmark')
+parser.add_argument('--checkpoint', default=None, help='checkpoint to act with, relative to --checkpoint-dir (default: random policy)')
+parser.add_argument('--checkpoint-dir', default='checkpoints', help='directory checkpoints live in (default: checkpoints)')
+parser.add_argument('--rom', type=int, default=0, choices=[0, 1, 2, 3], help='gym-super-mario-bros ROM version (default: 0)')
+parser.add_argument('--levels', nargs='*', default=None, metavar='LEVEL', help='world-stage levels to run (default: all 32)')
+parser.add_argument('--processes', type=int, default=_mp.cpu_count(), help='levels run in parallel (default: all CPUs)')
+parser.add_argument('--steps', type=int, default=2000, help='agent steps per level (default: 2000)')
+parser.add_argument('--raw-frames', type=int, default=2000, help='unwrapped emulator frames per level (default: 2000)')
+parser.add_argument('--max-episode-length', type=int, default=2000, help='agent steps before an episode is cut (default: 2000)')
+parser.add_argument('--move-set', default='complex', help='the set of possible actions (default: complex)')
+parser.add_argument('--buffer-depth', type=int, default=4, help='depth of the frame buffer (default: 4)')
+parser.add_argument('--frame-skip', type=int, default=1, help='NES frames per frame buffer slot (default: 1)')
+parser.add_argument('--max-pool', action='store_true', help='max-pool the last two frames of each frame skip')
+parser.add_argument('--uint8-obs', action='store_true', help='uint8 observations normalized in the model')
+parser.add_argument('--obs-norm', default='running', choices=['fixed', 'running'], help='in-model normalization for uint8 observations (default: running)')
+parser.add_argument('--seed', type=int, default=0, help='random policy seed (default: 0)')
+parser.add_argument('--output', default=None, help='JSON report path (default: benchmarks/results/full_game-<host>-<time>.json)')
+
+
+def _make_env(args, level):
+    env = gym_super_mario_bros.make(f'SuperMarioBrosNoFrameskip-{level}-v{args.rom}')
+    return BinarySpaceToDiscreteSpaceEnv(env, ACTIONS[args.move_set])
+
+
+def _load_model(args, num_actions):
+    if args.checkpoint is None:
+        return None
+    model = ActorCritic(args.buffer_depth, num_actions, args.obs_norm if args.uint8_obs else None)
+    model.load_state_dict(restore_checkpoint(args.checkpoint, args.checkpoint_dir, optimizer=False)['model_state_dict'])
+    model.eval()
+    return model
+
+
+def run_level(args, level):
+    """Raw emulator speed, then the wrapped env under the policy, on one level"""
+    torch.set_num_threads(1)
+    rng = np.random.RandomState(args.seed)
+
+    env = _make_env(args, level)
+    num_actions = env.action_space.n
+    env.reset()
+    start = time.perf_counter()
+    for _ in range(args.raw_frames):
+        _, _, done, _ = env.step(rng.randint(num_actions))
+        if done:
+            env.reset()
+    raw_time = (time.perf_counter() - start) / args.raw_frames
+    env.close()
+
+    env = wrap_mario(_make_env(args, level), args.buffer_depth, args.uint8_obs, frame_skip=args.frame_skip, max_pool=args.max_pool)
+    model = _load_model(args, num_actions)
+    frames_per_step = args.buffer_depth * args.frame_skip
+
+    episodes = []
+    env_time = policy_time = 0.
+    reward_sum, length = 0., 0
+    state = env.reset()
+    hx, cx = torch.zeros(1, 512), torch.zeros(1, 512)
+    start = time.perf_counter()
+    for _ in range(args.steps):
+        policy_start = time.perf_counter()
+        if model is None:
+            action = rng.randint(num_actions)
+        else:
+            with torch.no_grad():
+                _, logit, (hx, cx) = model((torch.from_numpy(state).unsqueeze(0), (hx, cx)))
+            action = logit.max(-1)[1].item()
+        env_start = time.perf_counter()
+        policy_time += env_start - policy_start
+
+        state, reward, done, info = env.step(action)
+        env_time += time.perf_counter() - env_start
+        reward_sum += reward
+        length += 1
+
+        if done or length >= args.max_episode_length:
+            episodes.append({
+                'reward': reward_sum,
+                'length': length,
+                'x_pos': int(info['x_pos']),
+                'flag_get': bool(info['flag_get']),
+                })
+            reward_sum, length = 0., 0
+            hx, cx = torch.zeros(1, 512), torch.zeros(1, 512)
+            state = env.reset()
+    elapsed = time.perf_counter() - start
+    env.close()
+
+    # an unfinished last episode still counts for progress
+    finished = episodes or [{'reward': reward_sum, 'length': length, 'x_pos': int(info['x_pos']), 'flag_get': False}]
+    wrapped_time = env_time / (args.steps * frames_per_step)
+    return {
+        'level': level,
+        'raw_fps': 1. / raw_time,
+        'wrapped_fps': 1. / wrapped_time,
+        'wrapper_overhead': (wrapped_time - raw_time) / raw_time,
+        'decisions_per_sec': args.steps / elapsed,
+        'policy_share': policy_time / elapsed,
+        'episodes': len(episodes),
+        'episode_length_mean': float(np.mean([e['length'] for e in finished])),
+        'reward_mean': float(np.mean([e['reward'] for e in finished])),
+        'x_pos_max': max(e['x_pos'] for e in finished),
+        'completion_rate': float(np.mean([e['flag_get'] for e in finished])),
+    }
+
+
+def _run_level(job):
+    return run_level(*job)
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(args):
+    levels = args.levels or [f'{world}-{stage}' for world in range(1, 9) for stage in range(1, 5)]
+    mp = _mp.get_context('spawn')
+
+    start = time.time()
+    with mp.Pool(min(args.processes, len(levels))) as pool:
+        results = pool.map(_run_level, [(args, level) for level in levels])
+
+    for r in results:
+        print(
+            f"{r['level']:>4s}: raw {r['raw_fps']: 8.1f} fps | wrapped {r['wrapped_fps']: 8.1f} fps " + \
+            f"(+{r['wrapper_overhead']: 6.1%}) | {r['decisions_per_sec']: 7.1f} decisions/sec | " + \
+            f"length {r['episode_length_mean']: 7.1f} | x_pos max {r['x_pos_max']: 5d} | complete {r['completion_rate']: 5.1%}"
+        )
+
+    report = {
+        'meta': {
+            'host': socket.gethostname(),
+            'platform': platform.platform(),
+            'python': sys.version.split()[0],
+            'torch': torch.__version__,
+            'cpus': mp.cpu_count(),
+            'commit': _git_commit(),
+            'time': start,
+            'wall_time': time.time() - start,
+            'policy': args.checkpoint or 'random',
+            'args': vars(args),
+        },
+        'totals': {
+            'raw_fps': float(np.mean([r['raw_fps'] for r in results])),
+            'wrapped_fps': float(np.mean([r['wrapped_fps'] for r in results])),
+            'wrapper_overhead': float(np.mean([r['wrapper_overhead'] for r in results])),
+            'decisions_per_sec': float(np.sum([r['decisions_per_sec'] for r in results])),
+            'x_pos_mean': float(np.mean([r['x_pos_max'] for r in results])),
+            'completion_rate': float(np.mean([r['completion_rate'] for r in results])),
+        },
+        'levels': results,
+    }
+
+    output = args.output or os.path.join('benchmarks', 'results', f"full_game-{report['meta']['host']}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Report: {output}")
+
+
+if __name__ == "__main__":
+    _ = main(parser.parse_args())
@@ -0,0 +1,96 @@
+import time
+import argparse
+
+import torch
+
+from a3c.loss import gae
+
+
+parser = argparse.ArgumentParser('Mario.ai GAE Benchmark')
+parser.add_argument('--num-steps', type=int, nargs='+', default=[20, 50, 200], help='rollout lengths to benchmark (default: 20 50 200)')
+parser.add_argument('--num-envs', type=int, default=1, help='envs per rollout (default: 1)')
+parser.add_argument('--repeats', type=int, default=100, help='loss evaluations per length and mode (default: 100)')
+parser.add_argument('--gamma', type=float, default=0.9)
+parser.add_argument('--tau', type=float, default=1.00)
+parser.add_argument('--entropy-coef', type=float, default=0.01)
+parser.add_argument('--value-loss-coef', type=float, default=0.5)
+
+
+def gae_loop(R, rewards, values, log_probs, entropies, args, masks=None):
+    """The per-step implementation `gae` replaced"""
+    if masks is None:
+        masks = [torch.ones(1, 1)] * len(rewards)
+
+    policy_loss = 0
+    value_loss = 0
+    loss = torch.zeros(1, 1)
+    for i in reversed(range(len(rewards))):
+        if torch.cuda.is_available():
+            loss = loss.cuda()
+
+        mask = masks[i]
+        R = args.gamma * R.data * mask.to(R.device) + rewards[i].to(R.device)
+        if torch.cuda.is_available():
+            R = R.cuda()
+
+        advantage = R - values[i].data
+        value_loss = value_loss + 0.5 * advantage.pow(2)
+
+        delta_t = rewards[i] + args.gamma * values[i + 1].data.cpu() * mask - values[i].data.cpu()
+        if torch.cuda.is_available():
+            delta_t = delta_t.cuda()
+
+        if torch.cuda.is_available():
+            loss = loss.cuda() * args.gamma * args.tau * mask.cuda() + delta_t.cuda()
+        else:
+            loss = loss.cpu() * args.gamma * args.tau * mask + delta_t.cpu()
+
+        policy_loss = policy_loss - \
+                      log_probs[i] * loss - \
+                      args.entropy_coef * entropies[i]
+
+    total_loss = policy_loss + args.value_loss_coef * value_loss
+
+    return total_loss.sum()
+
+
+def rollout(args, num_steps):
+    """Random rollout with episode ends, shaped like the one `train` builds"""
+    n = args.num_envs
+    logits = torch.randn(num_steps, n, 12, requires_grad=True)
+    log_prob = torch.log_softmax(logits, dim=-1)
+    entropies = -(log_prob * log_prob.exp()).sum(-1, keepdim=True)
+    log_probs = log_prob[..., :1]
+    values = torch.randn(num_steps + 1, n, 1)
+    rewards = torch.randn(num_steps, n, 1)
+    masks = (torch.rand(num_steps, n, 1) > 0.05).float()
+    return logits, (values[-1], list(rewards), list(values), list(log_probs), list(entropies), args, list(masks))
+
+
+def run(loss_fn, args, num_steps):
+    logits, inputs = rollout(args, num_steps)
+    loss_fn(*inputs)  # warm up the scripted scan
+    start = time.perf_counter()
+    for _ in range(args.repeats):
+        loss = loss_fn(*inputs)
+        grad, = torch.autograd.grad(loss, logits, retain_graph=True)
+    elapsed = (time.perf_counter() - start) / args.repeats
+    return elapsed, loss.detach(), grad
+
+
+def main(args):
+    torch.manual_seed(0)
+    for num_steps in args.num_steps:
+        state = torch.get_rng_state()
+        before, loss_before, grad_before = run(gae_loop, args, num_steps)
+        torch.set_rng_state(state)
+        after, loss_after, grad_after = run(gae, args, num_steps)
+
+        print(f"--num-steps {num_steps}")
+        print(f"{'loop (before)':>16s}: {before * 1e3: 8.3f} ms per loss + backward")
+        print(f"{'vectorized':>16s}: {after * 1e3: 8.3f} ms per loss + backward | x{before / after:.1f}")
+        print(f"{'':>16s}  max error: loss {(loss_before - loss_after).abs().item():.2e} | grad {(grad_before - grad_after).abs().max().item():.2e}")
+
+
+if __name__ == "__main__":
+    _ = main(parser.parse_args())
@@ -0,0 +1,63 @@
+import time
+import argparse
+
+import torch
+import torch.multiprocessing as _mp
+
+from models import ActorCritic, FlatParameters
+from optimizers import SharedAdam
+from a3c.grads import SharedGradients
+from utils import Services
+
+
+parser = argparse.ArgumentParser('Mario.ai Gradient Transfer Benchmark')
+parser.add_argument('--processes', type=int, nargs='+', default=[4, 8, 16, 32], help='worker counts to benchmark (default: 4 8 16 32)')
+parser.add_argument('--updates', type=int, default=50, help='updates per worker and mode (default: 50)')
+parser.add_argument('--buffer-depth', type=int, default=4, help='depth of the frame buffer (default: 4)')
+
+
+def worker(rank, args, shared_model, services, optimizer, barrier):
+    torch.set_num_threads(1)
+    model = ActorCritic(args.buffer_depth, 12)
+    FlatParameters(model)
+    grads = services.grads
+    grads.attach(model, shared_model)
+
+    barrier.wait()
+    for _ in range(args.updates):
+        grads.zero_grad()
+        grads.grads.normal_()  # stands in for backward
+        if grads.step(rank, optimizer):
+            services.flat.bump()
+
+
+def main(args):
+    torch.set_num_threads(1)
+    mp = _mp.get_context('spawn')
+
+    for n in args.processes:
+        print(f"--processes {n}")
+        for mode in SharedGradients.MODES:
+            shared_model = ActorCritic(args.buffer_depth, 12)
+            services = Services(FlatParameters(shared_model, mp.Lock()).share_memory())
+            shared_model.share_memory()
+            services.grads = SharedGradients(shared_model, mode, n, mp.Lock(), mp.Lock())
+            optimizer = SharedAdam(shared_model.parameters(), lr=1e-4)
+            optimizer.share_memory()
+
+            barrier = mp.Barrier(n + 1)
+            processes = [mp.Process(target=worker, args=(rank, args, shared_model, services, optimizer, barrier)) for rank in range(n)]
+            for p in processes:
+                p.start()
+            barrier.wait()
+            start = time.perf_counter()
+            for p in processes:
+                p.join()
+            elapsed = time.perf_counter() - start
+
+            stats = services.grads.stats()
+            print(f"{mode:>12s}: {stats['pushed'] / elapsed: 8.1f} updates/sec | {stats['steps'] / elapsed: 8.1f} steps/sec | merged {stats['merged']: 5d} | overlapped {stats['overlapped']: 5d}")
+
+
+if __name__ == "__main__":
+    _ = main(parser.parse_args())
@@ -0,0 +1,67 @@
+import io
+import os
+import time
+import argparse
+import tempfile
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+
+from models import ActorCritic
+from optimizers import SharedAdam
+from utils import CheckpointHistory
+
+
+parser = argparse.ArgumentParser('Mario.ai Checkpoint History Benchmark')
+parser.add_argument('--saves', type=int, default=50, help='checkpoints written (default: 50)')
+parser.add_argument('--updates', type=int, default=10, help='optimizer steps between checkpoints (default: 10)')
+parser.add_argument('--lr', type=float, default=1e-4, help='learning rate of the simulated updates (default: 1e-4)')
+parser.add_argument('--keyframe-interval', type=int, default=10, help='history entries per keyframe (default: 10)')
+
+
+def main(args):
+    torch.manual_seed(0)
+    model = ActorCritic(4, 12)
+    optimizer = SharedAdam(model.parameters(), lr=args.lr)
+    obs, hx, cx = torch.randn(8, 4, 84, 84), torch.zeros(8, 512), torch.zeros(8, 512)
+
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    full = len(buffer.getvalue())
+
+    with tempfile.TemporaryDirectory() as dir:
+        # keep everything, to measure the size of each entry kind
+        history = CheckpointHistory(dir, args.keyframe_interval, keep_last=args.saves)
+        sizes, write_times = {'key': [], 'delta': []}, []
+        for step in range(args.saves):
+            for _ in range(args.updates):
+                value, logit, _ = model((obs, (hx, cx)))
+                optimizer.zero_grad()
+                (value.pow(2).mean() - F.log_softmax(logit, dim=-1).mean()).backward()
+                optimizer.step()
+
+            start = time.perf_counter()
+            entry = history.add(step, step, model.state_dict())
+            write_times.append(time.perf_counter() - start)
+            sizes[entry['kind']].append(entry['bytes'])
+
+        restore_times, error = [], 0.
+        for step in history.steps():
+            start = time.perf_counter()
+            checkpoint = history.load(step)
+            restore_times.append(time.perf_counter() - start)
+        for name, tensor in model.state_dict().items():
+            error = max(error, (checkpoint['model_state_dict'][name] - tensor).abs().max().item())
+
+        total = sum(os.path.getsize(os.path.join(dir, f)) for f in os.listdir(dir))
+
+    print(f"     full .tar: {full / 2**20: 8.2f} MB per checkpoint, {args.saves * full / 2**20: 8.1f} MB for {args.saves}")
+    print(f"      keyframe: {np.mean(sizes['key']) / 2**20: 8.2f} MB ({np.mean(sizes['key']) / full: 5.1%})")
+    print(f"         delta: {np.mean(sizes['delta']) / 2**20: 8.2f} MB ({np.mean(sizes['delta']) / full: 5.1%})")
+    print(f"       history: {total / 2**20: 8.1f} MB for {args.saves} ({total / (args.saves * full): 5.1%})")
+    print(f"    write time: p50 {np.percentile(write_times, 50) * 1e3: 8.2f} ms | restore p50 {np.percentile(restore_times, 50) * 1e3: 8.2f} ms | max error {error:.1e}")
+
+
+if __name__ == "__main__":
+    _ = main(parser.parse_args())
@@ -0,0 +1,41 @@
+import time
+import argparse
+
+import torch.multiprocessing as _mp
+
+from launcher import launch
+from utils import cli
+
+
+parser = argparse.ArgumentParser('Mario.ai IMPALA Benchmark', epilog='other arguments are passed on to the trainer CLI')
+parser.add_argument('--processes', type=int, default=8, help='processes given to each algorithm (default: 8)')
+parser.add_argument('--seconds', type=float, default=120., help='seconds to run each algorithm after warm-up (default: 120)')
+parser.add_argument('--warm-up', type=float, default=30., help='seconds to let processes start before counting (default: 30)')
+
+
+def main(args, trainer_argv):
+    mp = _mp.get_context('spawn')
+    print(f"--processes {args.processes}")
+    for algorithm in ('A3C', 'IMPALA', 'PPO'):
+        # the trainer keeps one of --num-processes for evaluation
+        trainer_args = cli.get_args(trainer_argv + [
+            '--algorithm', algorithm,
+            '--uint8-obs',
+            '--model-id', f'benchmark-{algorithm}',
+            '--num-processes', str(args.processes + 1),
+        ])
+        processes, counter = launch(trainer_args, mp)
+
+        time.sleep(args.warm_up)
+        start, frames = time.perf_counter(), counter.value
+        time.sleep(args.seconds)
+        rate = (counter.value - frames) / (time.perf_counter() - start)
+
+        for p in processes:
+            p.terminate()
+        print(f"{algorithm:>8s}: {rate: 9.1f} frames/sec")
+
+
+if __name__ == "__main__":
+    args, trainer_argv = parser.parse_known_args()
+    _ = main(args, trainer_argv)
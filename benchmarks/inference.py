@@ -0,0 +1,91 @@
+import time
+import argparse
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+import torch.multiprocessing as _mp
+
+from models import ActorCritic, FlatParameters
+from a3c.inference import InferenceServer, serve
+from utils import Services
+
+
+parser = argparse.ArgumentParser('Mario.ai Inference Server Benchmark')
+parser.add_argument('--processes', type=int, nargs='+', default=[4, 8, 16], help='worker counts to benchmark (default: 4 8 16)')
+parser.add_argument('--num-envs', type=int, default=1, help='envs per worker (default: 1)')
+parser.add_argument('--actions', type=int, default=200, help='act calls per worker and mode (default: 200)')
+parser.add_argument('--buffer-depth', type=int, default=4, help='depth of the frame buffer (default: 4)')
+parser.add_argument('--inference-batch', type=int, default=0, help='most workers per batch, 0 for all (default: 0)')
+parser.add_argument('--inference-latency', type=float, default=5., help='batching deadline in ms (default: 5)')
+parser.add_argument('--uint8-obs', action='store_true', help='send uint8 observations')
+# read by `serve`
+parser.add_argument('--sync-staleness', type=int, default=0)
+parser.add_argument('--obs-norm', default='running')
+parser.add_argument('--env-name', default='benchmark')
+parser.add_argument('--model-id', default='inference')
+parser.add_argument('--uuid', default='benchmark')
+
+
+def worker(rank, args, services, server, barrier, results):
+    torch.set_num_threads(1)
+    dtype = torch.uint8 if args.uint8_obs else torch.float32
+    obs = torch.randint(0, 256, (args.num_envs, args.buffer_depth, 84, 84)).to(dtype)
+
+    if server is None:
+        model = ActorCritic(args.buffer_depth, 12, args.obs_norm if args.uint8_obs else None)
+        FlatParameters(model).sync(services.flat)
+        model.eval()
+        hx, cx = torch.zeros(args.num_envs, 512), torch.zeros(args.num_envs, 512)
+
+    latency = []
+    barrier.wait()
+    for _ in range(args.actions):
+        start = time.perf_counter()
+        if server is None:
+            with torch.no_grad():
+                value, logit, (hx, cx) = model((obs, (hx, cx)))
+            action = F.softmax(logit, dim=-1).multinomial(1)
+        else:
+            server.act(rank, obs)
+        latency.append(time.perf_counter() - start)
+    results.put(latency)
+
+
+def run(args, mp, n, use_server):
+    shared_model = ActorCritic(args.buffer_depth, 12, args.obs_norm if args.uint8_obs else None)
+    services = Services(FlatParameters(shared_model).share_memory())
+    shared_model.share_memory()
+
+    server = None
+    if use_server:
+        dtype = torch.uint8 if args.uint8_obs else torch.float32
+        server = InferenceServer(mp, n, args.num_envs, (args.buffer_depth, 84, 84), dtype, args.inference_batch, args.inference_latency / 1e3)
+        mp.Process(target=serve, args=(args, services, server, 12), daemon=True).start()
+
+    barrier, results = mp.Barrier(n + 1), mp.Queue()
+    processes = [mp.Process(target=worker, args=(rank, args, services, server, barrier, results)) for rank in range(n)]
+    for p in processes:
+        p.start()
+    barrier.wait()
+    start = time.perf_counter()
+    latency = np.concatenate([results.get() for _ in range(n)]) * 1e3
+    elapsed = time.perf_counter() - start
+    for p in processes:
+        p.join()
+
+    return n * args.actions * args.num_envs / elapsed, np.percentile(latency, 50), np.percentile(latency, 99)
+
+
+def main(args):
+    torch.set_num_threads(1)
+    mp = _mp.get_context('spawn')
+    for n in args.processes:
+        print(f"--processes {n}")
+        for name, use_server in (('per-worker (before)', False), ('inference server', True)):
+            rate, p50, p99 = run(args, mp, n, use_server)
+            print(f"{name:>20s}: {rate: 9.1f} actions/sec | p50 {p50: 7.2f} ms | p99 {p99: 7.2f} ms")
+
+
+if __name__ == "__main__":
+    _ = main(parser.parse_args())
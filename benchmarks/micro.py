@@ -0,0 +1,251 @@
+import sys
+import json
+import time
+import argparse
+from functools import partial
+from itertools import count
+from collections import OrderedDict
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+import torch.multiprocessing as _mp
+
+from models import ActorCritic, FlatParameters
+from optimizers import SharedAdam, OPTIMIZERS, create_optimizer
+from mario_vec_env import DummyVecEnv
+from mario_wrapper import FrameProcessor, ProcessMarioFrame, NormalizedEnv, _process_frame, wrap_mario
+from a3c.grads import SharedGradients
+from a3c.loss import gae
+from a3c.train import create_worker
+from utils import cli, CheckpointService, Telemetry, Services
+from utils.profiler import PhaseTimer
+from benchmarks.fake_env import FakeMarioEnv
+from benchmarks.gae import rollout
+
+
+parser = argparse.ArgumentParser('Mario.ai Microbenchmarks')
+parser.add_argument('--filter', default='', help='only run cases whose name contains this')
+parser.add_argument('--samples', type=int, default=20, help='timed samples per case (default: 20)')
+parser.add_argument('--min-time', type=float, default=0.05, help='seconds per sample, calls are batched to reach it (default: 0.05)')
+parser.add_argument('--fps', type=float, default=None, help='emulated NES frames/sec of the fake env (default: unthrottled)')
+parser.add_argument('--num-envs', type=int, default=1, help='batch size of the model cases (default: 1)')
+parser.add_argument('--num-steps', type=int, default=50, help='rollout length of the loss and train cases (default: 50)')
+parser.add_argument('--buffer-depth', type=int, default=4, help='depth of the frame buffer (default: 4)')
+parser.add_argument('--output', default=None, help='write results to this JSON file')
+parser.add_argument('--compare', default=None, help='JSON results of an earlier run to check for regressions')
+parser.add_argument('--tolerance', type=float, default=0.1, help='slowdown of the median flagged as a regression (default: 0.1)')
+parser.add_argument('--gamma', type=float, default=0.9)
+parser.add_argument('--tau', type=float, default=1.00)
+parser.add_argument('--entropy-coef', type=float, default=0.01)
+parser.add_argument('--value-loss-coef', type=float, default=0.5)
+parser.add_argument('--max-grad-norm', type=float, default=250)
+
+
+CASES = OrderedDict()
+
+
+def case(name):
+    """Registers a setup function that returns the callable to time"""
+    def register(setup):
+        CASES[name] = setup
+        return setup
+    return register
+
+
+def _stepper(env):
+    env.reset()
+    def step():
+        if env.step(0)[2]:
+            env.reset()
+    return step
+
+
+@case('frame.process_frame')
+def _(args):
+    frame = FakeMarioEnv().reset()
+    return lambda: _process_frame(frame)
+
+
+@case('frame.processor_uint8')
+def _(args):
+    frame, processor = FakeMarioEnv().reset(), FrameProcessor()
+    out = np.zeros((1, 84, 84), dtype=np.uint8)
+    return lambda: processor(frame, out=out)
+
+
+@case('env.fake_step')
+def _(args):
+    return _stepper(FakeMarioEnv(fps=args.fps))
+
+
+@case('wrapper.process_mario_frame')
+def _(args):
+    return _stepper(ProcessMarioFrame(FakeMarioEnv(fps=args.fps)))
+
+
+@case('wrapper.normalized_env')
+def _(args):
+    return _stepper(NormalizedEnv(ProcessMarioFrame(FakeMarioEnv(fps=args.fps))))
+
+
+@case('wrapper.frame_buffer')
+def _(args):
+    return _stepper(wrap_mario(FakeMarioEnv(fps=args.fps), args.buffer_depth))
+
+
+@case('wrapper.frame_buffer_uint8')
+def _(args):
+    return _stepper(wrap_mario(FakeMarioEnv(fps=args.fps), args.buffer_depth, uint8_obs=True))
+
+
+def _model_inputs(args):
+    model = ActorCritic(args.buffer_depth, 12)
+    n = args.num_envs
+    return model, (torch.randn(n, args.buffer_depth, 84, 84), (torch.zeros(n, 512), torch.zeros(n, 512)))
+
+
+@case('model.forward')
+def _(args):
+    model, inputs = _model_inputs(args)
+    def forward():
+        with torch.no_grad():
+            model(inputs)
+    return forward
+
+
+@case('model.forward_backward')
+def _(args):
+    model, inputs = _model_inputs(args)
+    def forward_backward():
+        model.zero_grad()
+        value, logit, _ = model(inputs)
+        (value.pow(2).mean() - F.log_softmax(logit, dim=-1).mean()).backward()
+    return forward_backward
+
+
+@case('loss.gae')
+def _(args):
+    logits, inputs = rollout(args, args.num_steps)
+    def loss():
+        torch.autograd.grad(gae(*inputs), logits)
+    return loss
+
+
+@case('optimizer.shared_adam_step')
+def _(args):
+    model, inputs = _model_inputs(args)
+    optimizer = SharedAdam(model.parameters(), lr=1e-4)
+    optimizer.share_memory()
+    value, logit, _ = model(inputs)
+    (value.mean() + logit.mean()).backward()
+    return optimizer.step
+
+
+@case('profiler.lap')
+def _(args):
+    """What --profile adds to every instrumented phase"""
+    profiler = PhaseTimer(0, 'logs/benchmark/micro/', enabled=True, interval=float('inf'))
+    return lambda: profiler.lap('phase')
+
+
+def _train_iteration(args, mode, optimizer):
+    """One iteration of an A3C worker on the fake env, as a3c.train runs it"""
+    mp = _mp.get_context('spawn')
+    train_args = cli.get_args([
+        '--env-name', 'benchmark',
+        '--model-id', 'micro',
+        '--uuid', 'benchmark',
+        '--num-steps', str(args.num_steps),
+        '--buffer-depth', str(args.buffer_depth),
+        '--grad-mode', mode,
+        '--optimizer', optimizer,
+    ])
+    env = DummyVecEnv(lambda: wrap_mario(FakeMarioEnv(fps=args.fps), args.buffer_depth))
+
+    shared_model = ActorCritic(args.buffer_depth, env.action_space.n)
+    services = Services(FlatParameters(shared_model, mp.Lock()).share_memory())
+    shared_model.share_memory()
+    optimizer = create_optimizer(optimizer, shared_model.parameters(), train_args.lr)
+    optimizer.share_memory()
+    services.grads = SharedGradients(shared_model, mode, 1, mp.Lock(), mp.Lock())
+    services.checkpoints = CheckpointService(mp, train_args.checkpoint_interval)
+    services.telemetry = Telemetry(mp, 'logs/benchmark/micro/benchmark/')
+    services.telemetry.start(mp)
+
+    iteration = create_worker(0, train_args, env, shared_model, services, mp.Value('i', 0), mp.Lock(), optimizer)
+    steps = count(1)
+    return lambda: iteration(next(steps))
+
+
+for mode in SharedGradients.MODES:
+    for name in OPTIMIZERS:
+        case(f'train.iteration.{mode}.{name}')(partial(_train_iteration, mode=mode, optimizer=name))
+
+
+def measure(fn, samples, min_time):
+    """Seconds per call: one warm-up call, then `samples` timed batches
+    of as many calls as fit in `min_time`"""
+    start = time.perf_counter()
+    fn()
+    number = max(int(min_time / max(time.perf_counter() - start, 1e-9)), 1)
+
+    times = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        times.append((time.perf_counter() - start) / number)
+    times = np.array(times)
+    return {
+        'median': float(np.median(times)),
+        'min': float(times.min()),
+        'iqr': float(np.percentile(times, 75) - np.percentile(times, 25)),
+        'calls': number * samples,
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Prints the change of every case's median; returns the regressed cases"""
+    regressions = []
+    for name, stats in results.items():
+        if name not in baseline:
+            continue
+        ratio = stats['median'] / baseline[name]['median']
+        flag = ''
+        if ratio > 1. + tolerance:
+            flag = 'REGRESSION'
+            regressions.append(name)
+        elif ratio < 1. - tolerance:
+            flag = 'faster'
+        print(f"{name:>30s}: {baseline[name]['median'] * 1e3: 10.4f} -> {stats['median'] * 1e3: 10.4f} ms | x{ratio: 5.2f} {flag}")
+    return regressions
+
+
+def main(args):
+    torch.manual_seed(0)
+    torch.set_num_threads(1)
+
+    results = OrderedDict()
+    for name, setup in CASES.items():
+        if args.filter not in name:
+            continue
+        results[name] = measure(setup(args), args.samples, args.min_time)
+        stats = results[name]
+        print(f"{name:>30s}: median {stats['median'] * 1e3: 10.4f} ms | min {stats['min'] * 1e3: 10.4f} ms | iqr {stats['iqr'] * 1e3: 8.4f} ms")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'args': vars(args), 'torch': torch.__version__, 'results': results}, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+        print(f"Against {args.compare}:")
+        return compare(results, baseline, args.tolerance)
+    return []
+
+
+if __name__ == "__main__":
+    regressions = main(parser.parse_args())
+    sys.exit(1 if regressions else 0)
@@ -0,0 +1,72 @@
+import time
+import pickle
+import argparse
+
+import torch
+
+from models import ActorCritic
+from mario_wrapper import wrap_mario
+from benchmarks.fake_env import FakeMarioEnv
+
+
+parser = argparse.ArgumentParser('Mario.ai Observation Mode Benchmark')
+parser.add_argument('--steps', type=int, default=500, help='number of agent steps per mode (default: 500)')
+parser.add_argument('--buffer-depth', type=int, default=4, help='depth of the frame buffer (default: 4)')
+parser.add_argument('--num-steps', type=int, default=50, help='rollout length used for the memory estimate (default: 50)')
+parser.add_argument('--obs-norm', default='running', choices=['fixed', 'running'], help='in-model normalization for uint8 observations')
+
+
+def run(args, uint8_obs):
+    env = wrap_mario(FakeMarioEnv(), args.buffer_depth, uint8_obs)
+    model = ActorCritic(args.buffer_depth, env.action_space.n, args.obs_norm if uint8_obs else None)
+    hx, cx = torch.zeros(1, 512), torch.zeros(1, 512)
+
+    state = env.reset()
+    obs_bytes = state.nbytes
+    pickled = len(pickle.dumps(torch.from_numpy(state.copy())))
+
+    start = time.perf_counter()
+    for _ in range(args.steps):
+        state, _, done, _ = env.step(0)
+        if done:
+            state = env.reset()
+    env_rate = args.steps / (time.perf_counter() - start)
+
+    state = torch.from_numpy(state.copy()).unsqueeze(0)
+    start = time.perf_counter()
+    with torch.no_grad():
+        for _ in range(args.steps):
+            model((state, (hx, cx)))
+    model_rate = args.steps / (time.perf_counter() - start)
+
+    batch = state.repeat(args.num_steps, 1, 1, 1)
+    start = time.perf_counter()
+    with torch.no_grad():
+        for _ in range(args.steps // args.num_steps):
+            model((batch, (hx.repeat(args.num_steps, 1), cx.repeat(args.num_steps, 1))))
+    batch_rate = (args.steps // args.num_steps) * args.num_steps / (time.perf_counter() - start)
+
+    return {
+        'dtype': str(state.dtype),
+        'obs_bytes': obs_bytes,
+        'rollout_bytes': obs_bytes * args.num_steps,
+        'pickled_bytes': pickled,
+        'env_steps': env_rate,
+        'forward': model_rate,
+        'forward_batched': batch_rate,
+    }
+
+
+def main(args):
+    results = {'float (before)': run(args, False), 'uint8': run(args, True)}
+
+    print(f"{'':>16s} | {'dtype':>13s} | {'obs':>9s} | {'rollout':>10s} | {'pickled':>9s} | {'env steps/s':>11s} | {'fwd/s':>8s} | {f'fwd/s x{args.num_steps}':>10s}")
+    for name, r in results.items():
+        print(
+            f"{name:>16s} | {r['dtype']:>13s} | {r['obs_bytes']:>7d} B | {r['rollout_bytes'] / 2**20:>7.2f} MB | " + \
+            f"{r['pickled_bytes']:>7d} B | {r['env_steps']:>11.1f} | {r['forward']:>8.1f} | {r['forward_batched']:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    _ = main(parser.parse_args())
@@ -0,0 +1,101 @@
+import time
+import argparse
+
+import torch
+import torch.nn as nn
+import torch.multiprocessing as _mp
+
+from models import ActorCritic, FlatParameters
+from optimizers import OPTIMIZERS, create_optimizer, state_bytes
+
+
+parser = argparse.ArgumentParser('Mario.ai Optimizer Benchmark')
+parser.add_argument('--steps', type=int, default=200, help='optimizer steps per model and optimizer (default: 200)')
+parser.add_argument('--widths', type=int, nargs='+', default=[256, 1024, 2048], help='widths of the synthetic 8-layer MLPs (default: 256 1024 2048)')
+parser.add_argument('--processes', type=int, default=8, help='workers stepping one shared ActorCritic concurrently (default: 8)')
+parser.add_argument('--shards', type=int, default=8, help='shards of the sharded flat-adam (default: 8)')
+
+
+def make_optimizers(args, model, mp):
+    for name in OPTIMIZERS:
+        yield name, lambda name=name: create_optimizer(name, model.parameters(), 1e-4)
+        if name != 'shared-adam':
+            yield f'{name} x{args.shards}', lambda name=name: create_optimizer(name, model.parameters(), 1e-4, [mp.Lock() for _ in range(args.shards)])
+
+
+def shared(model):
+    FlatParameters(model).share_memory()  # the parameters stay views of one buffer
+    model.share_memory()
+    for p in model.parameters():
+        p.grad = torch.randn_like(p)
+    return model
+
+
+def check_round_trip(make, model):
+    """Max error of the state restored into a fresh optimizer"""
+    optimizer = make()
+    for _ in range(3):
+        optimizer.step()
+    expected = optimizer.state_dict()['state']
+
+    restored = make()
+    restored.load_state_dict(optimizer.state_dict())
+    error = 0.
+    for key, state in restored.state_dict()['state'].items():
+        for name, value in state.items():
+            value, target = torch.as_tensor(value).float(), torch.as_tensor(expected[key][name]).float()
+            error = max(error, (value - target).abs().max().item())
+    return error
+
+
+def worker(args, optimizer, barrier):
+    torch.set_num_threads(1)
+    barrier.wait()
+    for _ in range(args.steps):
+        optimizer.step()
+
+
+def main(args):
+    torch.set_num_threads(1)
+    mp = _mp.get_context('spawn')
+
+    models = [('ActorCritic', ActorCritic(4, 12))]
+    for width in args.widths:
+        models.append((f'MLP {width}', nn.Sequential(*[nn.Linear(width, width) for _ in range(8)])))
+
+    for name, model in models:
+        model = shared(model)
+        print(f"{name} | {sum(p.numel() for p in model.parameters()) / 1e6:.2f}M parameters")
+        for opt_name, make in make_optimizers(args, model, mp):
+            optimizer = make()
+            optimizer.step()  # warm up
+            start = time.perf_counter()
+            for _ in range(args.steps):
+                optimizer.step()
+            print(f"{opt_name:>22s}: {args.steps / (time.perf_counter() - start): 9.1f} steps/sec | state {state_bytes(optimizer) / 2**20: 8.1f} MB")
+
+    model = shared(ActorCritic(4, 12))
+    print("ActorCritic | state_dict round trip")
+    for opt_name, make in make_optimizers(args, model, mp):
+        error = check_round_trip(make, model)
+        assert error == 0., f"{opt_name} lost state on load: max error {error}"
+        print(f"{opt_name:>22s}: restored")
+
+    model = shared(ActorCritic(4, 12))
+    print(f"ActorCritic | {args.processes} processes")
+    for opt_name, make in make_optimizers(args, model, mp):
+        optimizer = make()
+        optimizer.share_memory()
+        barrier = mp.Barrier(args.processes + 1)
+        processes = [mp.Process(target=worker, args=(args, optimizer, barrier)) for _ in range(args.processes)]
+        for p in processes:
+            p.start()
+        barrier.wait()
+        start = time.perf_counter()
+        for p in processes:
+            p.join()
+        print(f"{opt_name:>22s}: {args.processes * args.steps / (time.perf_counter() - start): 9.1f} steps/sec in total")
+
+
+if __name__ == "__main__":
+    _ = main(parser.parse_args())
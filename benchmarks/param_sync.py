@@ -0,0 +1,71 @@
+import time
+import argparse
+
+import numpy as np
+import torch
+import torch.multiprocessing as _mp
+
+from models import ActorCritic, FlatParameters
+
+
+parser = argparse.ArgumentParser('Mario.ai Parameter Sync Benchmark')
+parser.add_argument('--processes', type=int, nargs='+', default=[8, 16, 32], help='worker counts to benchmark (default: 8 16 32)')
+parser.add_argument('--syncs', type=int, default=50, help='syncs per worker and mode (default: 50)')
+parser.add_argument('--buffer-depth', type=int, default=4, help='depth of the frame buffer (default: 4)')
+parser.add_argument('--staleness', type=int, default=4, help='staleness bound of the bounded mode (default: 4)')
+
+MODES = ('load_state_dict (before)', 'flat copy', 'flat copy, bounded')
+
+
+def worker(rank, args, shared_model, shared_flat, barrier, results):
+    torch.set_num_threads(1)
+    model = ActorCritic(args.buffer_depth, 12)
+    flat = FlatParameters(model)
+
+    for mode in MODES:
+        flat.synced = None
+        elapsed = []
+        barrier.wait()
+        for _ in range(args.syncs):
+            start = time.perf_counter()
+            if mode == MODES[0]:
+                model.load_state_dict(shared_model.state_dict())
+            else:
+                flat.sync(shared_flat, args.staleness if mode == MODES[2] else 0)
+            elapsed.append(time.perf_counter() - start)
+
+            # every worker publishes an update per rollout
+            shared_flat.bump()
+        results.put((mode, elapsed))
+
+
+def main(args):
+    torch.set_num_threads(1)
+    mp = _mp.get_context('spawn')
+
+    shared_model = ActorCritic(args.buffer_depth, 12)
+    shared_flat = FlatParameters(shared_model, mp.Lock()).share_memory()
+    shared_model.share_memory()
+    print(f"Parameters: {shared_flat.flat.numel()} ({shared_flat.flat.numel() * 4 / 2**20:.1f} MB)")
+
+    for n in args.processes:
+        barrier, results = mp.Barrier(n), mp.Queue()
+        processes = [mp.Process(target=worker, args=(rank, args, shared_model, shared_flat, barrier, results)) for rank in range(n)]
+        for p in processes:
+            p.start()
+
+        times = {mode: [] for mode in MODES}
+        for _ in range(n * len(MODES)):
+            mode, elapsed = results.get()
+            times[mode].extend(elapsed)
+        for p in processes:
+            p.join()
+
+        print(f"--processes {n}")
+        for mode in MODES:
+            t = np.array(times[mode]) * 1e3
+            print(f"{mode:>26s}: mean {t.mean(): 8.3f} ms | p99 {np.percentile(t, 99): 8.3f} ms | total {t.sum() / n: 9.1f} ms per worker")
+
+
+if __name__ == "__main__":
+    _ = main(parser.parse_args())
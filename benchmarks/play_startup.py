@@ -0,0 +1,61 @@
+import os
+import time
+import argparse
+import tempfile
+
+import numpy as np
+import torch
+import torch.multiprocessing as _mp
+
+from models import ActorCritic
+from optimizers import SharedAdam
+from utils.transport import restore_checkpoint, write_checkpoint
+
+
+parser = argparse.ArgumentParser('Mario.ai Play Startup Benchmark')
+parser.add_argument('--runs', type=int, default=10, help='fresh processes per format (default: 10)')
+parser.add_argument('--obs-norm', action='store_true', help='checkpoint a uint8 model with ObservationNorm')
+
+
+def first_action(file, dir, obs_norm, results):
+    """play.py's startup, from restoring the checkpoint to the first action"""
+    start = time.perf_counter()
+    checkpoint = restore_checkpoint(file, dir, optimizer=False)
+    loaded = time.perf_counter()
+
+    model = ActorCritic(4, 12, obs_norm)
+    model.load_state_dict(checkpoint['model_state_dict'])
+    with torch.no_grad():
+        obs = torch.zeros(1, 4, 84, 84, dtype=torch.uint8 if obs_norm else torch.float32)
+        _, logit, _ = model((obs, (torch.zeros(1, 512), torch.zeros(1, 512))))
+    logit.max(-1)[1].item()
+    results.put((loaded - start, time.perf_counter() - start))
+
+
+def main(args):
+    mp = _mp.get_context('spawn')
+    obs_norm = 'running' if args.obs_norm else None
+    model = ActorCritic(4, 12, obs_norm)
+    optimizer = SharedAdam(model.parameters(), lr=1e-4)
+    value, _, _ = model((torch.zeros(1, 4, 84, 84, dtype=torch.uint8 if obs_norm else torch.float32), (torch.zeros(1, 512), torch.zeros(1, 512))))
+    value.sum().backward()
+    optimizer.step()  # a trained checkpoint carries the optimizer state play.py never uses
+    state = dict(env='benchmark', id='startup', step=0, model_state_dict=model.state_dict(), optimizer_state_dict=optimizer.state_dict())
+
+    with tempfile.TemporaryDirectory() as dir:
+        for name, file in (('tar', 'params.tar'), ('mmap', 'params')):
+            write_checkpoint(state, os.path.join(dir, file))
+            results = mp.Queue()
+            stats = []
+            for _ in range(args.runs):  # a fresh process each time, as play.py starts
+                p = mp.Process(target=first_action, args=(file, dir, obs_norm, results))
+                p.start()
+                stats.append(results.get())
+                p.join()
+
+            load, total = np.array(stats).T * 1e3
+            print(f"{name:>5s}: load p50 {np.percentile(load, 50): 8.2f} ms | first action p50 {np.percentile(total, 50): 8.2f} ms | p99 {np.percentile(total, 99): 8.2f} ms")
+
+
+if __name__ == "__main__":
+    _ = main(parser.parse_args())
@@ -0,0 +1,84 @@
+import time
+import argparse
+
+import numpy as np
+from torchvision import transforms
+
+from mario_wrapper import FrameProcessor
+
+
+parser = argparse.ArgumentParser('Mario.ai Frame Preprocessing Benchmark')
+parser.add_argument('--frames', type=int, default=2000, help='number of frames to process (default: 2000)')
+parser.add_argument('--batch-size', type=int, default=16, help='batch size for the batched path (default: 16)')
+parser.add_argument('--env-name', type=str, default=None, help='capture frames from this environment instead of noise')
+
+
+def legacy_process_frame(frame, shape=(84, 84)):
+    """Original torchvision/PIL pipeline from `mario_wrapper._process_frame`"""
+    process = transforms.Compose([
+        transforms.ToPILImage(),
+        transforms.Grayscale(),
+        transforms.Resize(shape),
+        transforms.ToTensor(),
+    ])
+    return process(frame)
+
+
+def sample_frames(n, env_name=None):
+    if env_name is None:
+        return np.random.randint(0, 256, (n, 240, 256, 3), dtype=np.uint8)
+
+    import gym_super_mario_bros
+    env = gym_super_mario_bros.make(env_name)
+    frames = [env.reset().copy()]
+    while len(frames) < n:
+        obs, _, done, _ = env.step(env.action_space.sample())
+        frames.append(obs.copy())
+        if done:
+            frames.append(env.reset().copy())
+    env.close()
+
+    return np.stack(frames[:n])
+
+
+def timeit(fn, frames):
+    start = time.perf_counter()
+    fn(frames)
+    return len(frames) / (time.perf_counter() - start)
+
+
+def main(args):
+    frames = sample_frames(args.frames, args.env_name)
+    processor = FrameProcessor()
+
+    expected = np.stack([legacy_process_frame(f).numpy() for f in frames[:200]])
+    actual = np.stack([processor(f) for f in frames[:200]])
+    error = np.abs(expected - actual) * 255
+    print(f"Max error: {error.max():.3f} levels | Mean error: {error.mean():.4f} levels")
+
+    def legacy(frames):
+        for f in frames:
+            legacy_process_frame(f)
+
+    def single(frames):
+        for f in frames:
+            processor(f)
+
+    def batched(frames):
+        out = np.empty((args.batch_size, 84, 84), dtype=np.float32)
+        for i in range(0, len(frames) - args.batch_size + 1, args.batch_size):
+            processor(frames[i:i + args.batch_size], out=out)
+
+    def batched_uint8(frames):
+        out = np.empty((args.batch_size, 84, 84), dtype=np.uint8)
+        for i in range(0, len(frames) - args.batch_size + 1, args.batch_size):
+            processor(frames[i:i + args.batch_size], out=out)
+
+    print(f"{'PIL (before)':>24s}: {timeit(legacy, frames): 10.1f} frames/sec")
+    print(f"{'FrameProcessor':>24s}: {timeit(single, frames): 10.1f} frames/sec")
+    print(f"{f'batched x{args.batch_size}':>24s}: {timeit(batched, frames): 10.1f} frames/sec")
+    print(f"{f'batched x{args.batch_size} (uint8)':>24s}: {timeit(batched_uint8, frames): 10.1f} frames/sec")
+
+
+if __name__ == "__main__":
+    _ = main(parser.parse_args())
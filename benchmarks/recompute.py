@@ -0,0 +1,94 @@
+import time
+import resource
+import argparse
+
+import torch
+import torch.nn.functional as F
+import torch.multiprocessing as _mp
+
+from models import ActorCritic
+from a3c.storage import RolloutStorage
+
+
+parser = argparse.ArgumentParser('Mario.ai Rollout Recompute Benchmark')
+parser.add_argument('--updates', type=int, default=20, help='updates timed per mode (default: 20)')
+parser.add_argument('--num-steps', type=int, default=50, help='rollout length (default: 50)')
+parser.add_argument('--num-envs', type=int, default=1, help='envs per rollout (default: 1)')
+parser.add_argument('--buffer-depth', type=int, default=4, help='depth of the frame buffer (default: 4)')
+parser.add_argument('--float-obs', action='store_true', help='use float observations instead of uint8')
+parser.add_argument('--gamma', type=float, default=0.9)
+parser.add_argument('--tau', type=float, default=1.00)
+parser.add_argument('--entropy-coef', type=float, default=0.01)
+parser.add_argument('--value-loss-coef', type=float, default=0.5)
+
+
+def update(model, optimizer, rollouts, args, recompute):
+    """One rollout and update of `train`, with random frames in place of the env"""
+    hx = rollouts.hxs[0].clone()
+    cx = rollouts.cxs[0].clone()
+    if recompute:
+        model.eval()
+
+    for step in range(args.num_steps):
+        with torch.set_grad_enabled(not recompute):
+            value, logit, (hx, cx) = model((rollouts.obs[step].clone(), (hx, cx)))
+            prob = F.softmax(logit, dim=-1)
+            log_prob = F.log_softmax(logit, dim=-1)
+            entropy = -(log_prob * prob).sum(-1, keepdim=True)
+        action = prob.multinomial(1)
+        state = torch.randint(0, 256, rollouts.obs.shape[1:]).to(rollouts.obs.dtype)
+        rollouts.insert(
+            state, hx, cx, action,
+            torch.randn(args.num_envs, 1),
+            torch.ones(args.num_envs, 1),
+            value, log_prob.gather(-1, action), entropy,
+        )
+
+    with torch.no_grad():
+        R, _, _ = model((rollouts.obs[rollouts.step], (hx, cx)))
+
+    if recompute:
+        model.train()
+        rollouts.recompute(model)
+
+    loss = rollouts.loss(R, args)
+    optimizer.zero_grad()
+    loss.backward()
+    optimizer.step()
+    rollouts.after_update()
+
+
+def run(args, recompute, results):
+    torch.set_num_threads(1)
+    torch.manual_seed(0)
+    model = ActorCritic(args.buffer_depth, 12, None if args.float_obs else 'running')
+    optimizer = torch.optim.Adam(model.parameters(), lr=1e-4)
+    dtype = torch.float32 if args.float_obs else torch.uint8
+    rollouts = RolloutStorage(args.num_steps, args.num_envs, (args.buffer_depth, 84, 84), dtype)
+
+    update(model, optimizer, rollouts, args, recompute)  # warm up
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    start = time.perf_counter()
+    for _ in range(args.updates):
+        update(model, optimizer, rollouts, args, recompute)
+    elapsed = time.perf_counter() - start
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    results.put((args.updates / elapsed, peak / 1024., before / 1024.))
+
+
+def main(args):
+    mp = _mp.get_context('spawn')
+    for name, recompute in (('step-wise graph (before)', False), ('batched recompute', True)):
+        # a fresh process per mode, so the peak RSS is its own
+        results = mp.Queue()
+        p = mp.Process(target=run, args=(args, recompute, results))
+        p.start()
+        rate, peak, before = results.get()
+        p.join()
+        print(f"{name:>24s}: {rate: 7.2f} updates/sec | {rate * args.num_steps * args.num_envs: 8.1f} frames/sec | peak RSS {peak: 7.1f} MB (after warm-up {before: 7.1f} MB)")
+
+
+if __name__ == "__main__":
+    _ = main(parser.parse_args())
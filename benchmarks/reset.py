@@ -0,0 +1,54 @@
+import time
+import argparse
+
+import numpy as np
+
+from mario_wrapper import create_mario_env
+
+
+parser = argparse.ArgumentParser('Mario.ai Reset Benchmark')
+parser.add_argument('--env-name', default='SuperMarioBrosNoFrameskip-1-1-v0', help='environment to reset')
+parser.add_argument('--resets', type=int, default=200, help='number of resets timed per mode (default: 200)')
+parser.add_argument('--episodes', type=int, default=20, help='random-policy episodes per mode for the worker time share (default: 20)')
+parser.add_argument('--episode-length', type=int, default=50, help='agent steps before a forced reset (default: 50)')
+parser.add_argument('--buffer-depth', type=int, default=4, help='depth of the frame buffer (default: 4)')
+parser.add_argument('--uint8-obs', action='store_true', help='benchmark the uint8 observation stack')
+
+
+def run(args, reset_cache):
+    env = create_mario_env(args.env_name, skip=args.buffer_depth, uint8_obs=args.uint8_obs, reset_cache=reset_cache)
+    first = env.reset().copy()
+
+    start = time.perf_counter()
+    for _ in range(args.resets):
+        state = env.reset()
+    reset_rate = args.resets / (time.perf_counter() - start)
+    if args.uint8_obs:  # float observations drift with the normalizer statistics
+        assert np.array_equal(first, state), "cached reset changed the first observation"
+
+    rng = np.random.RandomState(0)
+    reset_time = step_time = 0.
+    for _ in range(args.episodes):
+        start = time.perf_counter()
+        env.reset()
+        reset_time += time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(args.episode_length):
+            _, _, done, _ = env.step(rng.randint(env.action_space.n))
+            if done:
+                break
+        step_time += time.perf_counter() - start
+
+    env.close()
+    return reset_rate, reset_time / (reset_time + step_time)
+
+
+def main(args):
+    for name, reset_cache in (('no cache (before)', None), ('reset cache', [])):
+        rate, share = run(args, reset_cache)
+        print(f"{name:>17s}: {rate: 10.1f} resets/sec | reset share of worker time: {100 * share: 5.1f}%")
+
+
+if __name__ == "__main__":
+    _ = main(parser.parse_args())
@@ -0,0 +1,64 @@
+import time
+import argparse
+import tempfile
+
+import numpy as np
+import torch.multiprocessing as _mp
+
+from utils import setup_logger, Telemetry, ActionHistogram
+
+
+parser = argparse.ArgumentParser('Mario.ai Telemetry Benchmark')
+parser.add_argument('--processes', type=int, nargs='+', default=[1, 8, 32], help='processes logging into the same files (default: 1 8 32)')
+parser.add_argument('--steps', type=int, default=20000, help='steps logged per process (default: 20000)')
+parser.add_argument('--action-log-interval', type=int, default=100, help='steps per action histogram record (default: 100)')
+
+
+def worker(rank, args, log_dir, telemetry, barrier, results):
+    rng = np.random.RandomState(rank)
+    actions = rng.randint(0, 12, args.steps)
+    if telemetry is None:  # a synchronous handler and a line per action, as train did
+        action_logger = setup_logger('actions', log_dir, f'actions.log')
+    else:
+        histogram = ActionHistogram(12, args.action_log_interval)
+
+    barrier.wait()
+    start = time.perf_counter()
+    for a in actions:
+        if telemetry is None:
+            action_logger.info({'rank': rank, 'action': int(a), 'reason': 'multinomial'})
+        elif histogram.add([a], 'multinomial'):
+            telemetry.log('actions', {'rank': rank, **histogram.pop()})
+    if telemetry is not None:
+        telemetry.flush()
+    results.put(args.steps / (time.perf_counter() - start))
+
+
+def main(args):
+    mp = _mp.get_context('spawn')
+    for n in args.processes:
+        print(f"--processes {n}")
+        for name in ('logger per action (before)', 'telemetry + histogram'):
+            with tempfile.TemporaryDirectory() as log_dir:
+                telemetry = None
+                if name.startswith('telemetry'):
+                    telemetry = Telemetry(mp, log_dir)
+                    writer = telemetry.start(mp)
+
+                barrier, results = mp.Barrier(n), mp.Queue()
+                processes = [mp.Process(target=worker, args=(rank, args, log_dir, telemetry, barrier, results)) for rank in range(n)]
+                for p in processes:
+                    p.start()
+                rates = [results.get() for _ in range(n)]
+                for p in processes:
+                    p.join()
+                if telemetry is not None:
+                    telemetry.close()
+                    writer.join()
+
+            rate = np.mean(rates)
+            print(f"{name:>28s}: {rate: 10.1f} steps/sec per process | {1e6 / rate: 8.2f} us per step")
+
+
+if __name__ == "__main__":
+    _ = main(parser.parse_args())
@@ -0,0 +1,3 @@
+from impala.actor import act
+from impala.learner import learn
+from impala.trajectories import TrajectoryQueue
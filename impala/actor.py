@@ -0,0 +1,67 @@
+import torch
+import torch.nn.functional as F
+
+from models import ActorCritic, FlatParameters
+from mario_actions import ACTIONS
+from mario_vec_env import create_mario_vec_env
+from utils import FontColor, setup_logger
+
+
+def act(rank, args, services, trajectories, counter, lock):
+    """IMPALA actor: roll out the latest synced policy into trajectory slots"""
+    log_dir = f'logs/{args.env_name}/{args.model_id}/{args.uuid}/'
+    sync_logger = setup_logger('sync', log_dir, f'sync.log')
+    print(FontColor.RED + f"Process: {rank: 3d} | Actor | Device: CPU", FontColor.END)
+
+    env = create_mario_vec_env(
+        args.env_name,
+        args.num_envs,
+        ACTIONS[args.move_set],
+        args.buffer_depth,
+        True,
+        args.reset_cache,
+        args.frame_skip,
+        args.max_pool,
+    )
+    num_envs = env.num_envs
+
+    # actors run on the CPU; syncs copy from the shared model's device
+    model = ActorCritic(env.observation_space.shape[0], env.action_space.n, args.obs_norm)
+    model.device = 'cpu'
+    flat = FlatParameters(model)
+    model.eval()  # running normalization statistics are tracked by the learner
+
+    state = env.reset_tensor()
+    hx = torch.zeros(num_envs, 512)
+    cx = torch.zeros(num_envs, 512)
+
+    while True:
+        staleness = flat.staleness(services.flat)
+        flat.sync(services.flat, args.sync_staleness)
+        sync_logger.info({'rank': rank, 'version': flat.synced, 'staleness': staleness})
+
+        slot = trajectories.free.get()
+        trajectories.hx[slot].copy_(hx)
+        trajectories.cx[slot].copy_(cx)
+        trajectories.obs[slot, 0].copy_(state)
+
+        for step in range(args.num_steps):
+            with torch.no_grad():
+                _, logit, (hx, cx) = model((state, (hx, cx)))
+            action = F.softmax(logit, dim=-1).multinomial(1)
+
+            _, reward, done, info, mask = env.step_episodes(action.view(-1).numpy(), args.max_episode_length)
+
+            # finished episodes start over with a fresh recurrent state
+            hx = hx * mask
+            cx = cx * mask
+
+            trajectories.obs[slot, step + 1].copy_(state)
+            trajectories.actions[slot, step].copy_(action)
+            trajectories.logits[slot, step].copy_(logit)
+            trajectories.rewards[slot, step].copy_(torch.from_numpy(reward).float().unsqueeze(1))
+            trajectories.masks[slot, step].copy_(mask)
+
+        trajectories.full.put(slot)
+        with lock:
+            counter.value += args.num_steps * num_envs
@@ -0,0 +1,78 @@
+import time
+from itertools import count
+
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+
+from impala.vtrace import vtrace
+from utils import FontColor, setup_logger
+
+
+def learn(args, shared_model, services, optimizer, trajectories, counter):
+    """IMPALA learner: the only process that updates `shared_model`"""
+    services.require('checkpoints')
+    log_dir = f'logs/{args.env_name}/{args.model_id}/{args.uuid}/'
+    loss_logger = setup_logger('loss', log_dir, f'loss.log')
+    checkpoint_logger = setup_logger('checkpoints', log_dir, f'checkpoints.log')
+    throughput_logger = setup_logger('throughput', log_dir, f'throughput.log')
+    print(FontColor.GREEN + f"Learner | batch {args.batch_size} trajectories x {args.num_steps} steps", FontColor.END)
+
+    model = shared_model
+    model.train()
+
+    start, frames = time.perf_counter(), counter.value
+    for t in count(start=args.start_step):
+        if t % args.save_interval == 0 and t > 0:
+            save_start = time.perf_counter()
+            services.checkpoints.request(t)
+            checkpoint_logger.info({'rank': 0, 'step': t, 'stall': time.perf_counter() - save_start})
+
+        slots = [trajectories.full.get() for _ in range(args.batch_size)]
+        obs, actions, behavior_logits, rewards, masks, hx, cx = trajectories.batch(slots)
+        for slot in slots:
+            trajectories.free.put(slot)
+
+        device = model.device
+        values, logits = model.unroll(obs, hx, cx, masks)
+        actions, behavior_logits = actions.to(device), behavior_logits.to(device)
+        rewards, masks = rewards.to(device), masks.to(device)
+
+        vs, advantages, log_probs = vtrace(
+            behavior_logits,
+            logits[:-1],
+            actions,
+            rewards,
+            values[:-1],
+            values[-1],
+            masks,
+            args.gamma,
+            args.clip_rho,
+            args.clip_c,
+        )
+
+        prob = F.softmax(logits[:-1], dim=-1)
+        entropy = -(prob * F.log_softmax(logits[:-1], dim=-1)).sum(-1)
+
+        policy_loss = -(log_probs * advantages).sum()
+        value_loss = 0.5 * (vs - values[:-1]).pow(2).sum()
+        loss = policy_loss + args.value_loss_coef * value_loss - args.entropy_coef * entropy.sum()
+
+        optimizer.zero_grad()
+        loss.backward()
+        nn.utils.clip_grad_norm_(model.parameters(), args.max_grad_norm)
+        optimizer.step()
+
+        # actors pick the new weights up by version
+        services.flat.bump()
+
+        loss_logger.info({'rank': 0, 'sampling': True, 'loss': loss.item()})
+
+        elapsed = time.perf_counter() - start
+        if elapsed > 10.:
+            throughput_logger.info({
+                'step': t,
+                'version': int(services.flat.version),
+                'frames_per_sec': (counter.value - frames) / elapsed,
+                })
+            start, frames = time.perf_counter(), counter.value
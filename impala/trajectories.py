@@ -0,0 +1,40 @@
+import torch
+
+
+class TrajectoryQueue(object):
+    """Fixed-length trajectories in shared memory, handed over by slot index.
+
+    Actors take a slot from `free`, fill it with `num_steps` steps of
+    `num_envs` envs (uint8 observations including the bootstrap frame,
+    actions, behavior logits, rewards, masks and the initial LSTM state)
+    and put it on `full`. The learner batches full slots and frees them.
+    """
+    def __init__(self, ctx, num_slots, num_steps, num_envs, obs_shape, num_actions):
+        self.obs = torch.zeros(num_slots, num_steps + 1, num_envs, *obs_shape, dtype=torch.uint8)
+        self.actions = torch.zeros(num_slots, num_steps, num_envs, 1, dtype=torch.int64)
+        self.logits = torch.zeros(num_slots, num_steps, num_envs, num_actions)
+        self.rewards = torch.zeros(num_slots, num_steps, num_envs, 1)
+        self.masks = torch.ones(num_slots, num_steps, num_envs, 1)
+        self.hx = torch.zeros(num_slots, num_envs, 512)
+        self.cx = torch.zeros(num_slots, num_envs, 512)
+        for tensor in self.tensors():
+            tensor.share_memory_()
+
+        self.free = ctx.Queue()
+        self.full = ctx.Queue()
+        for slot in range(num_slots):
+            self.free.put(slot)
+
+    def tensors(self):
+        return self.obs, self.actions, self.logits, self.rewards, self.masks, self.hx, self.cx
+
+    def batch(self, slots):
+        """Copy `slots` out as time-major (steps, len(slots) * num_envs, ...) tensors"""
+        index = torch.tensor(slots)
+        obs, actions, logits, rewards, masks = [
+            t[index].transpose(0, 1).contiguous().view(t.size(1), -1, *t.shape[3:])
+            for t in (self.obs, self.actions, self.logits, self.rewards, self.masks)
+        ]
+        hx = self.hx[index].view(-1, self.hx.size(-1))
+        cx = self.cx[index].view(-1, self.cx.size(-1))
+        return obs, actions, logits, rewards, masks, hx, cx
@@ -0,0 +1,34 @@
+import torch
+import torch.nn.functional as F
+
+from a3c.loss import discount
+
+
+def vtrace(behavior_logits, target_logits, actions, rewards, values, bootstrap, masks, gamma, clip_rho=1.0, clip_c=1.0):
+    """V-trace targets and policy-gradient advantages (Espeholt et al., 2018)
+
+    All inputs are time-major (steps, envs, -1); `bootstrap` is the value
+    after the last step. Returns the value targets `vs`, the advantages and
+    the target policy's log-probs of `actions`, of which only the log-probs
+    carry gradients.
+    """
+    target_log_probs = F.log_softmax(target_logits, dim=-1).gather(-1, actions)
+    behavior_log_probs = F.log_softmax(behavior_logits, dim=-1).gather(-1, actions)
+
+    with torch.no_grad():
+        rhos = (target_log_probs - behavior_log_probs).exp()
+        clipped_rhos = rhos.clamp(max=clip_rho)
+        cs = rhos.clamp(max=clip_c)
+
+        values = values.detach()
+        bootstrap = bootstrap.detach()
+        discounts = gamma * masks
+        next_values = torch.cat([values[1:], bootstrap.unsqueeze(0)])
+
+        deltas = clipped_rhos * (rewards + discounts * next_values - values)
+        vs = discount(discounts * cs, deltas, torch.zeros_like(bootstrap)) + values
+
+        next_vs = torch.cat([vs[1:], bootstrap.unsqueeze(0)])
+        advantages = clipped_rhos * (rewards + discounts * next_vs - values)
+
+    return vs, advantages, target_log_probs
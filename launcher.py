@@ -0,0 +1,196 @@
+import time
+import warnings
+
+import torch
+
+from models import ActorCritic, FlatParameters
+from optimizers import create_optimizer, state_bytes
+from mario_wrapper import create_mario_env
+from a3c import train, test, evaluate
+from a3c.grads import SharedGradients
+from a3c.inference import InferenceServer, serve
+from a3c.distributed import sync_nodes
+from impala import act, learn, TrajectoryQueue
+from ppo import train as train_ppo
+from utils import FontColor, restore_checkpoint, CheckpointService, CheckpointHistory, history_path, Telemetry, Services
+from mario_actions import ACTIONS
+
+
+def launch(args, mp):
+    """Builds the shared model, optimizer and services of a trainer node and
+    starts its processes for `args.algorithm`, plus the node sync and the
+    evaluation or test process; returns the processes and frame counter"""
+    log_dir = f'logs/{args.env_name}/{args.model_id}/{args.uuid}/'
+
+    if args.algorithm == 'IMPALA':  # trajectories carry uint8 observations
+        args.uint8_obs = True
+
+    env = create_mario_env(args.env_name, ACTIONS[args.move_set], args.buffer_depth, args.uint8_obs)
+
+    shared_model = ActorCritic(
+        env.observation_space.shape[0],
+        env.action_space.n,
+        args.obs_norm if args.uint8_obs else None,
+    )
+
+    if torch.cuda.is_available():
+        shared_model = shared_model.cuda()
+
+    counter = mp.Value('i', 0)
+    lock = mp.Lock()
+
+    # one contiguous shared buffer, synced by workers with a single copy
+    services = Services(FlatParameters(shared_model, lock).share_memory())
+    shared_model.share_memory()
+
+    shard_locks = [mp.Lock() for _ in range(args.optimizer_shards)]
+    optimizer = create_optimizer(args.optimizer, shared_model.parameters(), args.lr, shard_locks)
+    optimizer.share_memory()
+
+    if args.load_model:  # TODO Load model before initializing optimizer
+        checkpoint_file = f"{args.env_name}/{args.model_id}_{args.algorithm}_params.tar"
+        checkpoint = restore_checkpoint(checkpoint_file)
+        assert args.env_name == checkpoint['env'], \
+            "Checkpoint is for different environment"
+        args.model_id = checkpoint['id']
+        args.start_step = checkpoint['step']
+        print("Loading model from checkpoint...")
+        print(f"Environment: {args.env_name}")
+        print(f"      Agent: {args.model_id}")
+        print(f"   Controls: {args.move_set}")
+        print(f"      Start: Step {args.start_step}")
+        shared_model.load_state_dict(checkpoint['model_state_dict'])
+        optimizer.load_state_dict(checkpoint['optimizer_state_dict'])
+
+    else:
+        print(f"Environment: {args.env_name}")
+        print(f"      Agent: {args.model_id}")
+        print(f"   Controls: {args.move_set}")
+
+    torch.manual_seed(args.seed)
+
+    # workers buffer log records, one process writes them
+    services.telemetry = Telemetry(mp, log_dir, args.telemetry_batch, args.telemetry_interval, args.telemetry_sample)
+    services.telemetry.start(mp)
+
+    # workers only request saves, one thread here writes them
+    history = None
+    if args.checkpoint_history:
+        history = CheckpointHistory(history_path(args), args.keyframe_interval, args.keep_last, args.keep_every, args.keep_best)
+    services.checkpoints = CheckpointService(mp, args.checkpoint_interval, args.checkpoint_updates, history)
+    services.checkpoints.start(shared_model, services.flat, optimizer, args)
+
+    print(
+        FontColor.BLUE + \
+        f"CPUs:    {mp.cpu_count(): 3d} | " + \
+        f"GPUs: {None if not torch.cuda.is_available() else torch.cuda.device_count()}" + \
+        FontColor.END
+    )
+
+    processes = []
+
+    # Queue training processes
+    num_processes = args.num_processes
+    no_sample = args.non_sample  # count of non-sampling processes
+
+    if args.num_processes > 1:
+        num_processes = args.num_processes - 1
+
+    samplers = num_processes - no_sample
+
+    if args.algorithm == 'IMPALA':
+        # actors only act, a single learner owns the update
+        trajectories = TrajectoryQueue(
+            mp,
+            max(2 * num_processes, args.batch_size),
+            args.num_steps,
+            args.num_envs,
+            env.observation_space.shape,
+            env.action_space.n,
+        )
+        p = mp.Process(target=learn, args=(args, shared_model, services, optimizer, trajectories, counter))
+        p.start()
+        processes.append(p)
+
+        for rank in range(0, max(num_processes - 1, 1)):
+            p = mp.Process(target=act, args=(rank, args, services, trajectories, counter, lock))
+            p.start()
+            processes.append(p)
+
+    elif args.algorithm == 'PPO':
+        # one synchronous learner steps every env
+        p = mp.Process(target=train_ppo, args=(args, shared_model, services, optimizer, counter, lock))
+        p.start()
+        processes.append(p)
+
+    else:
+        # with --no-shared every worker builds its own optimizer in `train`
+        state_size = state_bytes(optimizer) / 2**20
+        print(
+            FontColor.BLUE + \
+            f"Optimizer: {args.optimizer} | " + \
+            (f"State: {state_size:.1f} MB x {num_processes} workers" if args.no_shared else f"State: {state_size:.1f} MB shared") + \
+            FontColor.END
+        )
+        worker_optimizer = None if args.no_shared else optimizer
+
+        # gradient handoff from the workers to the shared optimizer
+        services.grads = SharedGradients(shared_model, args.grad_mode, num_processes, mp.Lock(), mp.Lock())
+
+        # one process runs the acting forward pass for every worker
+        server = None
+        if args.inference_server:
+            args.recompute = True
+            server = InferenceServer(
+                mp,
+                num_processes,
+                args.num_envs,
+                env.observation_space.shape,
+                torch.uint8 if args.uint8_obs else torch.float32,
+                args.inference_batch,
+                args.inference_latency / 1e3,
+            )
+            p = mp.Process(target=serve, args=(args, services, server, env.action_space.n), daemon=True)
+            p.start()
+
+        for rank in range(0, num_processes):
+            device = 'cpu'
+            if torch.cuda.is_available():
+                device = 0  # TODO: Need to move to distributed to handle multigpu
+            if rank < samplers:  # random action
+                p = mp.Process(
+                    target=train,
+                    args=(rank, args, shared_model, services, counter, lock, worker_optimizer, device),
+                    kwargs=dict(server=server),
+                )
+            else:  # best action
+                p = mp.Process(
+                    target=train,
+                    args=(rank, args, shared_model, services, counter, lock, worker_optimizer, device, False),
+                    kwargs=dict(server=server),
+                )
+            p.start()
+            time.sleep(1.)
+            processes.append(p)
+
+    # sync this node's shared model with the other trainer nodes
+    if args.world_size > 1:
+        p = mp.Process(target=sync_nodes, args=(args, services, counter))
+        p.start()
+        processes.append(p)
+
+    # Queue evaluation process, or the rendered test process
+    if args.eval_episodes > 0:
+        if args.record:
+            warnings.warn("--record is ignored by the evaluation pool, use --eval-episodes 0 to record playback")
+        p = mp.Process(target=evaluate, args=(args, services, counter))
+    else:
+        p = mp.Process(
+            target=test,
+            args=(args.num_processes, args, services, counter, 0)
+        )
+
+    p.start()
+    processes.append(p)
+
+    return processes, counter
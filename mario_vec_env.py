@@ -0,0 +1,229 @@
+import ctypes
+from functools import partial
+
+import numpy as np
+import torch
+import torch.multiprocessing as _mp
+from gym_super_mario_bros.actions import COMPLEX_MOVEMENT
+
+from mario_wrapper import create_mario_env
+
+
+INFO_KEYS = ('coins', 'flag_get', 'life', 'score', 'stage', 'status', 'time', 'world', 'x_pos')
+STATUSES = ('small', 'tall', 'fireball')
+
+_STEP, _RESET, _CLOSE = b's', b'r', b'c'
+
+
+def _encode_info(info, out):
+    for i, key in enumerate(INFO_KEYS):
+        value = info.get(key, 0)
+        out[i] = STATUSES.index(value) if key == 'status' else value
+
+
+def _decode_info(row):
+    info = {key: int(value) for key, value in zip(INFO_KEYS, row)}
+    info['status'] = STATUSES[info['status']]
+    info['flag_get'] = bool(info['flag_get'])
+    return info
+
+
+def _shared_array(ctx, dtype, shape):
+    dtype = np.dtype(dtype)
+    raw = ctx.RawArray(ctypes.c_uint8, int(np.prod(shape)) * dtype.itemsize)
+    return raw, dtype, shape
+
+
+def _as_numpy(shared):
+    raw, dtype, shape = shared
+    return np.frombuffer(raw, dtype=dtype).reshape(shape)
+
+
+def _worker(index, remote, parent_remote, env_fn, buffers):
+    parent_remote.close()
+    env = env_fn()
+    obs, actions, rewards, dones, infos = [_as_numpy(b) for b in buffers]
+    remote.send((env.observation_space, env.action_space))
+
+    try:
+        while True:
+            cmd = remote.recv_bytes()
+            if cmd == _STEP:
+                state, reward, done, info = env.step(int(actions[index]))
+                _encode_info(info, infos[index])
+                if done:  # the info row keeps the terminal step
+                    state = env.reset()
+                obs[index] = state
+                rewards[index] = reward
+                dones[index] = done
+            elif cmd == _RESET:
+                obs[index] = env.reset()
+            elif cmd == _CLOSE:
+                break
+            remote.send_bytes(cmd)
+    except (KeyboardInterrupt, EOFError):
+        pass
+    finally:
+        env.close()
+
+
+REWARD_CLIP = 50  # h/t @ArvindSoma
+
+
+class EpisodeMixin(object):
+    """Episode bookkeeping shared by the training and evaluation loops.
+
+    `step_episodes` cuts episodes at `max_episode_length` steps, optionally
+    clips rewards, and returns the mask that zeroes the recurrent state of
+    envs whose episode ended. `episode_length` still holds the length of
+    an ended or reset episode until the next step.
+    """
+    def _init_episodes(self):
+        self.episode_length = np.zeros(self.num_envs, dtype=np.int64)
+        self._ended = np.zeros(self.num_envs, dtype=np.bool_)
+
+    def reset_tensor(self):
+        """`reset` as a tensor sharing memory with the observation buffer"""
+        return torch.from_numpy(self.reset())
+
+    def step_episodes(self, actions, max_episode_length, reward_clip=REWARD_CLIP):
+        self.episode_length[self._ended] = 0
+        self._ended[:] = False
+        self.episode_length += 1
+
+        obs, reward, done, info = self.step(actions)
+        timeout = self.episode_length >= max_episode_length
+        if timeout.any():
+            obs = self.reset(np.flatnonzero(timeout & ~done))
+        done = done | timeout
+        if reward_clip is not None:
+            reward = np.clip(reward, -reward_clip, reward_clip)
+
+        self._ended |= done
+        mask = torch.from_numpy(1. - done).float().unsqueeze(1)
+        return obs, reward, done, info, mask
+
+
+class SubprocVecEnv(EpisodeMixin):
+    """Runs environments in subprocesses and exchanges data through shared memory.
+
+    Observations, actions, rewards, dones and info fields live in shared
+    arrays; the pipes only carry one-byte commands. Environments reset
+    automatically when done, in which case `obs` holds the first observation
+    of the next episode and the info row describes the terminal step.
+    `obs`, `rewards` and `dones` are overwritten by the next step.
+    """
+    def __init__(self, env_fns, obs_shape, obs_dtype=np.float32, context='spawn'):
+        ctx = _mp.get_context(context)
+        self.num_envs = len(env_fns)
+        n = self.num_envs
+
+        buffers = [
+            _shared_array(ctx, obs_dtype, (n, *obs_shape)),
+            _shared_array(ctx, np.int64, (n,)),
+            _shared_array(ctx, np.float64, (n,)),
+            _shared_array(ctx, np.bool_, (n,)),
+            _shared_array(ctx, np.float64, (n, len(INFO_KEYS))),
+        ]
+        self.obs, self.actions, self.rewards, self.dones, self.infos = [_as_numpy(b) for b in buffers]
+
+        self.remotes, work_remotes = zip(*[ctx.Pipe() for _ in range(n)])
+        self.processes = []
+        for index, (work_remote, remote, env_fn) in enumerate(zip(work_remotes, self.remotes, env_fns)):
+            p = ctx.Process(target=_worker, args=(index, work_remote, remote, env_fn, buffers), daemon=True)
+            p.start()
+            work_remote.close()
+            self.processes.append(p)
+
+        self.observation_space, self.action_space = [r.recv() for r in self.remotes][0]
+        self.waiting = False
+        self.closed = False
+        self._init_episodes()
+
+    def _wait(self, remotes):
+        for remote in remotes:
+            remote.recv_bytes()
+
+    def step_async(self, actions):
+        self.actions[:] = actions
+        for remote in self.remotes:
+            remote.send_bytes(_STEP)
+        self.waiting = True
+
+    def step_wait(self):
+        self._wait(self.remotes)
+        self.waiting = False
+        return self.obs, self.rewards, self.dones, [_decode_info(row) for row in self.infos]
+
+    def step(self, actions):
+        self.step_async(actions)
+        return self.step_wait()
+
+    def reset(self, indices=None):
+        remotes = self.remotes if indices is None else [self.remotes[i] for i in indices]
+        for remote in remotes:
+            remote.send_bytes(_RESET)
+        self._wait(remotes)
+        self._ended[slice(None) if indices is None else indices] = True
+        return self.obs
+
+    def close(self):
+        if self.closed:
+            return
+        if self.waiting:
+            self._wait(self.remotes)
+        for remote in self.remotes:
+            remote.send_bytes(_CLOSE)
+        for p in self.processes:
+            p.join()
+        self.closed = True
+
+
+class DummyVecEnv(EpisodeMixin):
+    """Same interface as SubprocVecEnv for a single in-process environment"""
+    def __init__(self, env_fn, obs_dtype=np.float32):
+        self.env = env_fn()
+        self.num_envs = 1
+        self.observation_space = self.env.observation_space
+        self.action_space = self.env.action_space
+
+        self.obs = np.zeros((1, *self.observation_space.shape), dtype=obs_dtype)
+        self.actions = np.zeros(1, dtype=np.int64)
+        self.rewards = np.zeros(1, dtype=np.float64)
+        self.dones = np.zeros(1, dtype=np.bool_)
+        self._init_episodes()
+
+    def step_async(self, actions):
+        self.actions[:] = actions
+
+    def step_wait(self):
+        state, reward, done, info = self.env.step(int(self.actions[0]))
+        if done:
+            state = self.env.reset()
+        self.obs[0] = state
+        self.rewards[0] = reward
+        self.dones[0] = done
+        return self.obs, self.rewards, self.dones, [info]
+
+    def step(self, actions):
+        self.step_async(actions)
+        return self.step_wait()
+
+    def reset(self, indices=None):
+        if indices is None or len(indices):
+            self.obs[0] = self.env.reset()
+            self._ended[:] = True
+        return self.obs
+
+    def close(self):
+        self.env.close()
+
+
+def create_mario_vec_env(env_id, n, move_set=COMPLEX_MOVEMENT, skip=4, uint8_obs=False, reset_cache=None, frame_skip=1, max_pool=False):
+    """Vectorized `create_mario_env`; a single env runs in-process"""
+    env_fn = partial(create_mario_env, env_id, move_set, skip, uint8_obs, reset_cache, frame_skip, max_pool)
+    obs_dtype = np.uint8 if uint8_obs else np.float32
+
+    if n == 1:
+        return DummyVecEnv(env_fn, obs_dtype)
+    return SubprocVecEnv([env_fn] * n, (skip, 84, 84), obs_dtype)
@@ -1,5 +1,4 @@
 import os
-from collections import deque
 
 import numpy as np
 import gym
@@ -8,30 +7,121 @@ import gym_super_mario_bros
 from gym_super_mario_bros.actions import COMPLEX_MOVEMENT
 from nes_py.wrappers import BinarySpaceToDiscreteSpaceEnv
 import torch
-from torchvision import transforms
 
 from utils import setup_logger
 
 
+def _resample_weights(in_size, out_size, support=1.0):
+    """Resampling matrix for PIL's antialiased bilinear (triangle) filter"""
+    scale = in_size / out_size
+    filterscale = max(scale, 1.0)
+    radius = support * filterscale
+
+    weights = np.zeros((out_size, in_size), dtype=np.float32)
+    for i in range(out_size):
+        center = (i + 0.5) * scale
+        lo = max(int(center - radius + 0.5), 0)
+        hi = min(int(center + radius + 0.5), in_size)
+        x = (np.arange(lo, hi) - center + 0.5) / filterscale
+        w = np.clip(1. - np.abs(x), 0., None)
+        weights[i, lo:hi] = w / w.sum()
+
+    return weights
+
+
+class FrameProcessor(object):
+    """Grayscale + resize for batches of RGB frames without going through PIL.
+
+    Equivalent to ToPILImage -> Grayscale -> Resize -> ToTensor, using ITU-R
+    601-2 luminance weights and precomputed row/column resampling matrices.
+    PIL rounds to 8 bits after each resampling pass, so outputs differ from
+    the PIL pipeline by at most one intensity level (1/255) per pixel.
+    """
+    def __init__(self, shape=(84, 84), in_shape=(240, 256)):
+        self.shape = tuple(shape)
+        self.in_shape = tuple(in_shape)
+        self.luminance = np.array([0.299, 0.587, 0.114], dtype=np.float32)
+        self.rows = torch.from_numpy(_resample_weights(in_shape[0], shape[0]))
+        self.cols = torch.from_numpy(_resample_weights(in_shape[1], shape[1]).T.copy())
+        self._scratch = {}
+
+    def _buffers(self, n):
+        if n not in self._scratch:
+            self._scratch[n] = (
+                np.empty((n, *self.in_shape), dtype=np.float32),
+                np.empty((n, *self.in_shape), dtype=np.float32),
+                torch.empty((n, self.in_shape[0], self.shape[1])),
+                torch.empty((n, *self.shape)),
+            )
+        return self._scratch[n]
+
+    def __call__(self, frames, out=None):
+        """Process (H, W, 3) or (N, H, W, 3) uint8 frames into (N, 84, 84).
+
+        Writes into `out` when given: float outputs are scaled to [0, 1] like
+        ToTensor, uint8 outputs keep the 0-255 range.
+        """
+        frames = np.asarray(frames)
+        if frames.ndim == 3:
+            frames = frames[None]
+        n = frames.shape[0]
+
+        if out is None:
+            out = np.empty((n, *self.shape), dtype=np.float32)
+        gray, channel, tmp, res = self._buffers(n)
+
+        # luminance, rounded to 8 bits like PIL's convert('L')
+        np.multiply(frames[..., 0], self.luminance[0], out=gray)
+        for c in (1, 2):
+            np.multiply(frames[..., c], self.luminance[c], out=channel)
+            gray += channel
+        np.rint(gray, out=gray)
+
+        torch.matmul(torch.from_numpy(gray), self.cols, out=tmp)
+
+        if out.dtype == np.float32:
+            out_t = torch.from_numpy(out)
+            torch.matmul(self.rows, tmp, out=out_t)
+            out_t.mul_(1. / 255)
+        else:
+            torch.matmul(self.rows, tmp, out=res)
+            res.round_()
+            np.copyto(out, res.numpy(), casting='unsafe')
+
+        return out
+
+
+_processors = {}
+
+
 def _process_frame(frame, shape=(84, 84)):
     if frame is not None:
-        tsfms = [
-            transforms.ToPILImage(),
-            transforms.Grayscale(),
-            transforms.Resize(shape),
-            transforms.ToTensor(),
-        ]
-        process = transforms.Compose(tsfms)
-        frame_t = process(frame)
+        if shape not in _processors:
+            _processors[shape] = FrameProcessor(shape)
+        frame_t = torch.from_numpy(_processors[shape](frame))
     else:
-        frame_t = torch.zeros((1, 84, 84))
+        frame_t = torch.zeros((1, *shape))
 
     return frame_t
 
 
 class ProcessMarioFrame(gym.Wrapper):
-    def __init__(self, env=None):
+    """Custom reward and frame preprocessing for a single NES frame per step.
+
+    With `frame_skip` > 1 each step repeats the action for that many frames,
+    accumulating the custom reward frame by frame but preprocessing only the
+    last one. `max_pool` takes the pixel-wise max of the last two raw frames
+    first, which removes sprites that flicker between frames.
+    """
+    def __init__(self, env=None, uint8=False, frame_skip=1, max_pool=False):
         super(ProcessMarioFrame, self).__init__(env)
+        # uint8 frames are written into a reused buffer and left unscaled
+        self.uint8 = uint8
+        self.frame_skip = frame_skip
+        self.max_pool = max_pool
+        self.raw = None
+        self.processor = FrameProcessor()
+        self.frame = np.zeros((1, 84, 84), dtype=np.uint8)
         self.observation_space = Box(
             low=0,
             high=255,
@@ -44,8 +134,29 @@ class ProcessMarioFrame(gym.Wrapper):
         self.prev_dist = 40  # starting position
 
     def step(self, action):
-        obs, _, is_done, info = self.env.step(action)  # custom reward calculated below
-
+        total_reward = 0
+        prev = None
+        for i in range(self.frame_skip):
+            if self.max_pool and 0 < i == self.frame_skip - 1:
+                prev = self._keep(obs)
+            obs, _, is_done, info = self.env.step(action)  # custom reward calculated below
+            total_reward += self._reward(is_done, info)
+            if is_done:
+                break
+
+        if prev is not None:
+            obs = np.maximum(prev, obs, out=prev)
+
+        return self._process(obs), total_reward, is_done, info
+
+    def _keep(self, obs):
+        # the emulator may hand out the same screen array on every step
+        if self.raw is None:
+            self.raw = np.empty_like(obs)
+        np.copyto(self.raw, obs)
+        return self.raw
+
+    def _reward(self, is_done, info):
         # custom reward
         dist = min(max((info['x_pos'] - self.prev_dist), 0), 2)
         self.prev_dist = info['x_pos'] # + 1
@@ -72,9 +183,7 @@ class ProcessMarioFrame(gym.Wrapper):
             else:
                 flag = -20
 
-        reward = dist + time + stat + score + flag
-
-        return _process_frame(obs), reward, is_done, info
+        return dist + time + stat + score + flag
 
     def reset(self):
         self.prev_time = 400
@@ -82,47 +191,90 @@ class ProcessMarioFrame(gym.Wrapper):
         self.prev_score = 0
         self.prev_dist = 40
 
-        return _process_frame(self.env.reset())
+        return self._process(self.env.reset())
+
+    def get_state(self):
+        return dict(
+            prev_time=self.prev_time,
+            prev_stat=self.prev_stat,
+            prev_score=self.prev_score,
+            prev_dist=self.prev_dist,
+        )
+
+    def set_state(self, state):
+        self.__dict__.update(state)
+
+    def _process(self, frame):
+        if self.uint8:
+            return self.processor(frame, out=self.frame)
+        return _process_frame(frame)
 
 
 class FrameBuffer(gym.Wrapper):
+    """Stacks the last `skip` frames in a preallocated ring buffer.
+
+    The buffer holds two copies of the ring, `skip` slots apart, so the
+    stacked observation is always a contiguous slice of it and no array is
+    allocated per step. The returned observation is a view that is only
+    valid until the next call to `step` or `reset`.
+    """
     def __init__(self, env=None, skip=16, shape=(84, 84)):
         super(FrameBuffer, self).__init__(env)
         self.counter = 0
         self.skip = skip
-        self.observation_space = Box(low=0, high=255, shape=(self.skip, 84, 84), dtype=np.uint8)
-        self.buffer = deque(maxlen=self.skip)
+        self.shape = tuple(shape)
+        self.observation_space = Box(low=0, high=255, shape=(self.skip, *self.shape), dtype=np.uint8)
+        self.buffer = None
+        self.views = None
+        self.pos = 0
+        self.pushed = 0
+
+    def _allocate(self, dtype):
+        self.buffer = np.zeros((2 * self.skip, *self.shape), dtype=dtype)
+        self.views = [self.buffer[i:i + self.skip] for i in range(self.skip)]
+
+    def _push(self, obs):
+        self.buffer[self.pos] = np.asarray(obs)
+        self.pos = (self.pos + 1) % self.skip
+        self.pushed += 1
+
+    def _observation(self):
+        # mirror the slots written since the last observation that the
+        # current view reads from the upper copy
+        lo = max(self.pos - min(self.pushed, self.skip), 0)
+        if lo < self.pos:
+            self.buffer[self.skip + lo:self.skip + self.pos] = self.buffer[lo:self.pos]
+        self.pushed = 0
+
+        return self.views[self.pos]
 
     def step(self, action):
         obs, reward, is_done, info = self.env.step(action)
-        counter = 1
         total_reward = reward
-        self.buffer.append(obs)
+        self._push(obs)
 
         for i in range(self.skip - 1):
             if not is_done:
                 obs, reward, is_done, info = self.env.step(action)
                 total_reward += reward
-                counter += 1
-                self.buffer.append(obs)
-            else:
-                self.buffer.append(obs)
+            self._push(obs)
 
-        frame = np.stack(self.buffer, axis=0)
-        frame = np.reshape(frame, (self.skip, 84, 84))
-
-        return frame, total_reward, is_done, info
+        return self._observation(), total_reward, is_done, info
 
     def reset(self):
-        self.buffer.clear()
-        obs = self.env.reset()
-        for i in range(self.skip):
-            self.buffer.append(obs)
+        return self.fill(self.env.reset())
+
+    def fill(self, obs):
+        """Start a new stack filled with `obs`"""
+        obs = np.asarray(obs)
+        if self.buffer is None or self.buffer.dtype != obs.dtype:
+            self._allocate(obs.dtype)
 
-        frame = np.stack(self.buffer, axis=0)
-        frame = np.reshape(frame, (self.skip, 84, 84))
+        self.buffer[:] = obs.reshape(self.shape)
+        self.pos = 0
+        self.pushed = 0
 
-        return frame
+        return self._observation()
 
 
 class NormalizedEnv(gym.ObservationWrapper):
@@ -148,15 +300,87 @@ class NormalizedEnv(gym.ObservationWrapper):
             return obs
 
 
-def wrap_mario(env, buffer_depth):
-    env = ProcessMarioFrame(env)
-    env = NormalizedEnv(env)
+class ResetCache(gym.Wrapper):
+    """Resets levels from a snapshot instead of rerunning the wrapper stack.
+
+    Expects the stack built by `wrap_mario`. The first reset of a level saves
+    the emulator state (nes_py backup), the ProcessMarioFrame state and the
+    processed first frame. Later resets restore the emulator from the backup
+    and rebuild the stacked observation from the cached frame, skipping frame
+    preprocessing. NormalizedEnv statistics are left running rather than
+    rolled back; the cached frame goes through it as on a regular reset.
+
+    `levels` lists the 'world-stage' keys to cache, or None for every level.
+    """
+    def __init__(self, env=None, levels=None):
+        super(ResetCache, self).__init__(env)
+        self.levels = None if levels is None else set(levels)
+        self.snapshots = {}
+        self.hits = 0
+
+        self.frame_buffer = self._find(FrameBuffer)
+        self.normalizer = self._find(NormalizedEnv)
+        self.frame_env = self._find(ProcessMarioFrame)
+
+    def _find(self, wrapper):
+        env = self.env
+        while isinstance(env, gym.Wrapper):
+            if isinstance(env, wrapper):
+                return env
+            env = env.env
+        return None
+
+    def step(self, action):
+        return self.env.step(action)
+
+    def _level(self):
+        env = self.unwrapped
+        world = getattr(env, '_target_world', None) or 1
+        stage = getattr(env, '_target_stage', None) or 1
+        return f"{world}-{stage}"
+
+    def reset(self):
+        level = self._level()
+        snapshot = self.snapshots.get(level)
+        if snapshot is None:
+            frame = self.frame_env.reset()
+            if self.levels is None or level in self.levels:
+                self.snapshots[level] = self._capture(frame)
+        else:
+            # nes_py's reset restores the backup, skipping the boot sequence
+            self.frame_env.env.reset()
+            self.frame_env.set_state(snapshot['state'])
+            frame = snapshot['frame']
+            self.hits += 1
+
+        if self.normalizer is not None:
+            frame = self.normalizer.observation(frame)
+
+        return self.frame_buffer.fill(frame)
+
+    def _capture(self, frame):
+        env = self.unwrapped
+        if hasattr(env, '_backup'):
+            env._backup()
+
+        return dict(
+            state=self.frame_env.get_state(),
+            frame=frame.clone() if torch.is_tensor(frame) else frame.copy(),
+        )
+
+
+def wrap_mario(env, buffer_depth, uint8_obs=False, reset_cache=None, frame_skip=1, max_pool=False):
+    env = ProcessMarioFrame(env, uint8=uint8_obs, frame_skip=frame_skip, max_pool=max_pool)
+    if not uint8_obs:  # uint8 frames are normalized by the model
+        env = NormalizedEnv(env)
     env = FrameBuffer(env, buffer_depth)
+    if reset_cache is not None:
+        env = ResetCache(env, reset_cache or None)
     return env
 
 
-def create_mario_env(env_id, move_set=COMPLEX_MOVEMENT, skip=4):
+def create_mario_env(env_id, move_set=COMPLEX_MOVEMENT, skip=4, uint8_obs=False, reset_cache=None, frame_skip=1, max_pool=False):
     env = gym_super_mario_bros.make(env_id)
     env = BinarySpaceToDiscreteSpaceEnv(env, move_set)
-    env = wrap_mario(env, skip)
+    env = wrap_mario(env, skip, uint8_obs, reset_cache, frame_skip, max_pool)
     return env
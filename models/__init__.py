@@ -1 +1,2 @@
-from models.actor_critic import ActorCritic
+from models.actor_critic import ActorCritic, ObservationNorm
+from models.flat import FlatParameters
@@ -29,14 +29,48 @@ def weights_init(model):
         model.bias.data.fill_(0)
 
 
+class ObservationNorm(nn.Module):
+    """Normalizes uint8 frames inside the model in a single batched op.
+
+    'fixed' uses constant statistics (measured on World 1 frames scaled to
+    [0, 1]). 'running' starts from the same values and tracks exponential
+    moving averages of the frame mean and std while in training mode, the
+    way NormalizedEnv does per frame.
+    """
+    def __init__(self, mode='running', mean=0.54, std=0.076, alpha=0.9999):
+        super(ObservationNorm, self).__init__()
+        assert mode in ('fixed', 'running'), f"unknown normalization: {mode}"
+        self.mode = mode
+        self.alpha = alpha
+        self.register_buffer('mean', torch.tensor(mean))
+        self.register_buffer('std', torch.tensor(std))
+
+    def forward(self, x):
+        x = x.float()
+        if self.mode == 'running' and self.training:
+            with torch.no_grad():
+                frames = x.view(-1, x.size(-2) * x.size(-1))
+                mean = frames.mean(1)
+                std = (frames.pow(2).mean(1) - mean.pow(2)).clamp_(min=0).sqrt_()
+                self.mean.mul_(self.alpha).add_(mean.mean() / 255., alpha=1 - self.alpha)
+                self.std.mul_(self.alpha).add_(std.mean() / 255., alpha=1 - self.alpha)
+
+        scale = 1. / (255. * (self.std + 1e-8))
+        shift = -self.mean / (self.std + 1e-8)
+        return torch.addcmul(shift, x, scale)
+
+
 class ActorCritic(nn.Module):
-    def __init__(self, num_inputs, num_actions):
+    def __init__(self, num_inputs, num_actions, normalize=None):
         super(ActorCritic, self).__init__()
 
         self.device = 'cpu'
         if torch.cuda.is_available():
             self.device = 'cuda'
 
+        # uint8 observations are normalized by the model instead of the env
+        self.obs_norm = ObservationNorm(normalize) if normalize else None
+
         self.conv1 = nn.Conv2d(num_inputs, 32, 3, stride=2, padding=1)
         self.conv2 = nn.Conv2d(32, 32, 3, stride=2, padding=1)
         self.conv3 = nn.Conv2d(32, 32, 3, stride=2, padding=1)
@@ -62,18 +96,61 @@ class ActorCritic(nn.Module):
 
         self.train()  # enter training mode
 
-    def forward(self, inputs):
-        x, (hx, cx) = inputs
-        x, hx, cx = x.to(self.device), hx.to(self.device), cx.to(self.device)
+    def features(self, x):
+        if self.obs_norm is not None:
+            x = self.obs_norm(x)
 
         x = F.elu(self.conv1(x))
         x = F.elu(self.conv2(x))
         x = F.elu(self.conv3(x))
         x = F.elu(self.conv4(x))
 
-        x = x.view(-1, 32 * 6 * 6)
+        return x.view(-1, 32 * 6 * 6)
+
+    def forward(self, inputs):
+        x, (hx, cx) = inputs
+        x, hx, cx = x.to(self.device), hx.to(self.device), cx.to(self.device)
+
+        x = self.features(x)
         hx, cx = self.lstm(x, (hx, cx))
 
         x = hx
 
         return self.critic_linear(x), self.actor_linear(x), (hx, cx)
+
+    def unroll(self, x, hx, cx, masks):
+        """Rerun a (steps, envs) rollout.
+
+        The conv trunk runs once over all steps * envs frames; the LSTM is
+        unrolled from the initial `hx`/`cx`, resetting it where `masks`
+        ends an episode. `masks` may be a step shorter than `x`, for a
+        trailing bootstrap frame. Returns the values and logits, each of
+        shape (steps, envs, -1).
+        """
+        steps, envs = x.shape[:2]
+        x, hx, cx = x.to(self.device), hx.to(self.device), cx.to(self.device)
+        masks = masks.to(self.device)
+
+        x = self.features(x.view(steps * envs, *x.shape[2:])).view(steps, envs, -1)
+
+        hxs = []
+        for i in range(steps):
+            hx, cx = self.lstm(x[i], (hx, cx))
+            hxs.append(hx)
+            if i < len(masks):
+                hx = hx * masks[i]
+                cx = cx * masks[i]
+        x = torch.stack(hxs)
+
+        return self.critic_linear(x), self.actor_linear(x)
+
+    def evaluate_actions(self, x, hx, cx, masks, actions):
+        """Values, log-probs of `actions` and entropies of a rerun rollout,
+        each of shape (steps, envs, 1)"""
+        value, logit = self.unroll(x, hx, cx, masks)
+
+        prob = F.softmax(logit, dim=-1)
+        log_prob = F.log_softmax(logit, dim=-1)
+        entropy = -(log_prob * prob).sum(-1, keepdim=True)
+
+        return value, log_prob.gather(-1, actions.to(self.device)), entropy
@@ -0,0 +1,61 @@
+import torch
+
+
+class FlatParameters(object):
+    """Keeps a model's parameters and buffers in one contiguous flat buffer.
+
+    Every parameter and buffer is re-pointed to a view of `flat`, so a whole
+    model can be copied with a single `copy_`. `version` counts updates of the
+    shared model; `synced` is the version a worker copy was last synced to.
+    A shared copy bumped by several processes takes the `lock` they share,
+    as `version += 1` is not atomic.
+    Re-pointing is undone by `Module._apply` (e.g. `.cuda()`), so flatten a
+    model after moving it to its device.
+    """
+    def __init__(self, model, lock=None):
+        tensors = list(model.parameters()) + list(model.buffers())
+        dtypes = {t.dtype for t in tensors}
+        assert len(dtypes) == 1, f"cannot flatten mixed dtypes {dtypes}"
+
+        self.flat = torch.zeros(sum(t.numel() for t in tensors), dtype=tensors[0].dtype, device=tensors[0].device)
+        offset = 0
+        for t in tensors:
+            n = t.numel()
+            self.flat[offset:offset + n].copy_(t.data.view(-1))
+            t.data = self.flat[offset:offset + n].view_as(t)
+            offset += n
+
+        self.version = torch.zeros(1, dtype=torch.int64)
+        self.synced = None
+        self.lock = lock
+
+    def share_memory(self):
+        self.flat.share_memory_()
+        self.version.share_memory_()
+        return self
+
+    def bump(self):
+        if self.lock is None:
+            self.version += 1
+            return
+        with self.lock:
+            self.version += 1
+
+    def staleness(self, source):
+        """Updates to `source` since the last sync, None if never synced"""
+        if self.synced is None:
+            return None
+        return int(source.version) - self.synced
+
+    def sync(self, source, max_staleness=0):
+        """Copy `source` unless it is at most `max_staleness` versions ahead"""
+        staleness = self.staleness(source)
+        if staleness is not None and staleness <= max_staleness:
+            return False
+
+        # read the version first: an update racing with the copy only makes
+        # the next sync happen sooner
+        version = int(source.version)
+        self.flat.copy_(source.flat)
+        self.synced = version
+        return True
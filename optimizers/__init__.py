@@ -1 +1,4 @@
 from optimizers.shared_adam import SharedAdam
+from optimizers.flat_adam import FlatSharedAdam
+from optimizers.shared_rmsprop import SharedRMSprop
+from optimizers.registry import OPTIMIZERS, create_optimizer, state_bytes
@@ -0,0 +1,135 @@
+import random
+
+import torch
+
+
+def flat_view(tensors):
+    """A flat view over `tensors` if they are consecutive views of one
+    storage, else None"""
+    first = tensors[0].data
+    offset = first.storage_offset()
+    for t in tensors:
+        t = t.data
+        if t.storage().data_ptr() != first.storage().data_ptr() or \
+           t.storage_offset() != offset or not t.is_contiguous():
+            return None
+        offset += t.numel()
+    return first.new().set_(first.storage(), first.storage_offset(), (offset - first.storage_offset(),))
+
+
+def flatten(tensors):
+    """One flat tensor over `tensors`, re-pointing them to views of it
+    unless they already share one"""
+    flat = flat_view(tensors)
+    if flat is not None:
+        return flat
+
+    flat = tensors[0].data.new_zeros(sum(t.numel() for t in tensors))
+    offset = 0
+    for t in tensors:
+        n = t.numel()
+        flat[offset:offset + n].copy_(t.data.view(-1))
+        t.data = flat[offset:offset + n].view_as(t)
+        offset += n
+    return flat
+
+
+class FlatSharedOptimizer(object):
+    """Mixin keeping an optimizer's parameters and its `STATE` in flat tensors.
+
+    A step is a handful of whole-model kernels instead of several per
+    parameter, and reads one shared step counter. With `shard_locks` the
+    flat tensors are split into one shard per lock; a step updates them one
+    at a time under that shard's lock, starting at a random shard so
+    concurrent workers mostly hold different locks. Each shard keeps its
+    own step counter. Only a single parameter group is supported.
+    """
+    STATE = ()
+
+    def _flatten_state(self, shard_locks):
+        assert len(self.param_groups) == 1, f"{type(self).__name__} supports a single parameter group"
+
+        self.params = self.param_groups[0]['params']
+        self.flat = flatten(self.params)
+        self.buffers = {name: torch.zeros_like(self.flat) for name in self.STATE}
+
+        self.shard_locks = shard_locks
+        num_shards = len(shard_locks) if shard_locks else 1
+        bounds = torch.linspace(0, self.flat.numel(), num_shards + 1).long().tolist()
+        self.shards = list(zip(bounds[:-1], bounds[1:]))
+        self.steps = torch.zeros(num_shards)
+
+        self._point_state()
+
+    def _point_state(self):
+        offset = 0
+        for p in self.params:
+            n = p.numel()
+            state = self.state[p]
+            state['step'] = self.steps
+            for name, buffer in self.buffers.items():
+                state[name] = buffer[offset:offset + n].view_as(p)
+            offset += n
+
+    def share_memory(self):
+        self.flat.share_memory_()
+        self.steps.share_memory_()
+        for buffer in self.buffers.values():
+            buffer.share_memory_()
+
+    def load_state_dict(self, state_dict):
+        super(FlatSharedOptimizer, self).load_state_dict(state_dict)
+        # `_point_state` replaces these entries with views of the flat
+        # buffers, so the loaded values are copied out first
+        loaded = [{name: self.state[p][name].clone() for name in self.STATE} for p in self.params]
+        step = self.state[self.params[0]]['step']
+        step = step.clone() if torch.is_tensor(step) else torch.tensor([float(step)])
+        step = step.view(-1).to(self.steps.dtype)
+        self._point_state()
+        for p, state in zip(self.params, loaded):
+            for name in self.STATE:
+                self.state[p][name].copy_(state[name])
+        if step.numel() == self.steps.numel():
+            self.steps.copy_(step)
+        else:  # saved with a different number of shards
+            self.steps.fill_(float(step.max()))
+
+    def _flat_grad(self):
+        grads = [p.grad if p.grad is not None else torch.zeros_like(p) for p in self.params]
+        grad = flat_view(grads)
+        if grad is None:  # grads that are not views of one flat buffer
+            grad = torch.cat([g.contiguous().view(-1) for g in grads])
+        return grad
+
+    def step(self, closure=None):
+        loss = None
+        if closure is not None:
+            loss = closure()
+
+        grad = self._flat_grad()
+        if self.shard_locks is None:
+            self._step_shard(0, grad)
+            return loss
+
+        start = random.randrange(len(self.shards))
+        for i in range(len(self.shards)):
+            shard = (start + i) % len(self.shards)
+            with self.shard_locks[shard]:
+                self._step_shard(shard, grad)
+
+        return loss
+
+    def _step_shard(self, shard, grad):
+        lo, hi = self.shards[shard]
+        self.steps[shard] += 1
+        self._update(
+            self.param_groups[0],
+            self.flat[lo:hi],
+            grad[lo:hi],
+            {name: buffer[lo:hi] for name, buffer in self.buffers.items()},
+            float(self.steps[shard]),
+        )
+
+    def _update(self, group, param, grad, state, step):
+        """Update one slice of the flat parameters in place"""
+        raise NotImplementedError
@@ -0,0 +1,33 @@
+import math
+
+import torch.optim as optim
+
+from optimizers.flat import FlatSharedOptimizer
+
+
+class FlatSharedAdam(FlatSharedOptimizer, optim.Adam):
+    """SharedAdam over single flat parameter and moment tensors"""
+    STATE = ('exp_avg', 'exp_avg_sq')
+
+    def __init__(self, params, lr=1e-3, betas=(0.9, 0.999), eps=1e-8, weight_decay=0, shard_locks=None):
+        super(FlatSharedAdam, self).__init__(params, lr, betas, eps, weight_decay)
+        self._flatten_state(shard_locks)
+
+    def _update(self, group, param, grad, state, step):
+        beta1, beta2 = group['betas']
+        exp_avg, exp_avg_sq = state['exp_avg'], state['exp_avg_sq']
+
+        if group['weight_decay'] != 0:
+            grad = grad.add(param, alpha=group['weight_decay'])
+
+        # Decay 1st and 2nd moment running avg coef
+        exp_avg.mul_(beta1).add_(grad, alpha=1 - beta1)
+        exp_avg_sq.mul_(beta2).addcmul_(grad, grad, value=1 - beta2)
+
+        denom = exp_avg_sq.sqrt().add_(group['eps'])
+
+        bias_correct1 = 1 - beta1 ** step
+        bias_correct2 = 1 - beta2 ** step
+        step_size = group['lr'] * math.sqrt(bias_correct2) / bias_correct1
+
+        param.addcdiv_(exp_avg, denom, value=-step_size)
@@ -0,0 +1,33 @@
+from optimizers.flat import FlatSharedOptimizer
+from optimizers.shared_adam import SharedAdam
+from optimizers.flat_adam import FlatSharedAdam
+from optimizers.shared_rmsprop import SharedRMSprop
+
+
+OPTIMIZERS = {
+    'shared-adam': SharedAdam,
+    'flat-adam': FlatSharedAdam,
+    'shared-rmsprop': SharedRMSprop,
+}
+
+
+def create_optimizer(name, params, lr, shard_locks=None):
+    """Build one of `OPTIMIZERS`; `shard_locks` only applies to flat ones"""
+    if name not in OPTIMIZERS:
+        raise ValueError(f"unknown optimizer: {name}")
+    if shard_locks:
+        if not issubclass(OPTIMIZERS[name], FlatSharedOptimizer):
+            raise ValueError(f"{name} does not support shards")
+        return OPTIMIZERS[name](params, lr=lr, shard_locks=shard_locks)
+    return OPTIMIZERS[name](params, lr=lr)
+
+
+def state_bytes(optimizer):
+    """Bytes held by an optimizer's state, counting shared storages once"""
+    storages = {}
+    for state in optimizer.state.values():
+        for value in state.values():
+            if hasattr(value, 'storage'):
+                storage = value.storage()
+                storages[storage.data_ptr()] = storage.size() * storage.element_size()
+    return sum(storages.values())
@@ -0,0 +1,27 @@
+import torch.optim as optim
+
+from optimizers.flat import FlatSharedOptimizer
+
+
+class SharedRMSprop(FlatSharedOptimizer, optim.RMSprop):
+    """Flat-buffer RMSprop with shared statistics, as in the A3C paper.
+
+    Keeps one moving average of squared gradients, half of Adam's state.
+    Defaults follow the paper (alpha 0.99, eps 0.1).
+    """
+    STATE = ('square_avg',)
+
+    def __init__(self, params, lr=1e-3, alpha=0.99, eps=0.1, weight_decay=0, shard_locks=None):
+        super(SharedRMSprop, self).__init__(params, lr, alpha, eps, weight_decay)
+        self._flatten_state(shard_locks)
+
+    def _update(self, group, param, grad, state, step):
+        square_avg = state['square_avg']
+
+        if group['weight_decay'] != 0:
+            grad = grad.add(param, alpha=group['weight_decay'])
+
+        square_avg.mul_(group['alpha']).addcmul_(grad, grad, value=1 - group['alpha'])
+        avg = square_avg.sqrt().add_(group['eps'])
+
+        param.addcdiv_(grad, avg, value=-group['lr'])
@@ -17,7 +17,7 @@ from models import ActorCritic
 from mario_actions import ACTIONS
 from mario_wrapper import create_mario_env
 from optimizers import SharedAdam
-from utils import FontColor, decode_info, setup_logger, get_args, restore_checkpoint
+from utils import FontColor, decode_info, setup_logger, get_args, restore_checkpoint, CheckpointHistory, history_path
 
 from a3c.utils import ensure_shared_grads, choose_action
 
@@ -31,20 +31,32 @@ args.reset_delay = 3.
 
 
 def play(args):
-    env = create_mario_env(args.env_name, ACTIONS[args.move_set])
+    env = create_mario_env(
+        args.env_name,
+        ACTIONS[args.move_set],
+        uint8_obs=args.uint8_obs,
+        reset_cache=args.reset_cache,
+        frame_skip=args.frame_skip,
+        max_pool=args.max_pool,
+    )
 
     observation_space = env.observation_space.shape[0]
     action_space = env.action_space.n
 
-    model = ActorCritic(observation_space, action_space)
+    model = ActorCritic(observation_space, action_space, args.obs_norm if args.uint8_obs else None)
 
     checkpoint_file = \
         f"{args.env_name}/{args.model_id}_{args.algorithm}_params.tar"
-    checkpoint = restore_checkpoint(checkpoint_file)
+    checkpoint = restore_checkpoint(checkpoint_file, optimizer=False)
     assert args.env_name == checkpoint['env'], \
         "This checkpoint is for different environment: {checkpoint['env']}"
     args.model_id = checkpoint['id']
 
+    if args.history_step is not None:
+        step = args.history_step if args.history_step == 'best' else int(args.history_step)
+        checkpoint = CheckpointHistory(history_path(args)).load(step)
+        print(f"       Step: {checkpoint['step']} (reward: {checkpoint['reward']})")
+
     print(f"Environment: {args.env_name}")
     print(f"      Agent: {args.model_id}")
     model.load_state_dict(checkpoint['model_state_dict'])
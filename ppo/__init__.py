@@ -0,0 +1 @@
+from ppo.train import train
@@ -0,0 +1,24 @@
+import torch
+
+from a3c.loss import discount
+
+
+def gae_targets(rewards, values, R, masks, gamma, tau):
+    """Time-major GAE advantages and returns of a rollout bootstrapped from `R`"""
+    next_values = torch.cat([values[1:], R.unsqueeze(0)])
+    deltas = rewards + gamma * next_values * masks - values
+    advantages = discount(gamma * tau * masks, deltas, torch.zeros_like(R))
+    return advantages + values, advantages
+
+
+def ppo_loss(log_probs, old_log_probs, advantages, values, returns, entropies, args):
+    """Clipped-surrogate PPO loss, averaged over a minibatch"""
+    ratio = (log_probs - old_log_probs).exp()
+    surr1 = ratio * advantages
+    surr2 = ratio.clamp(1. - args.clip_param, 1. + args.clip_param) * advantages
+
+    policy_loss = -torch.min(surr1, surr2).mean()
+    value_loss = 0.5 * (returns - values).pow(2).mean()
+    entropy = entropies.mean()
+
+    return policy_loss + args.value_loss_coef * value_loss - args.entropy_coef * entropy, policy_loss, value_loss, entropy
@@ -0,0 +1,136 @@
+import time
+from itertools import count
+
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+
+from mario_actions import ACTIONS
+from mario_vec_env import create_mario_vec_env
+from utils import FontColor, setup_logger
+
+from a3c.storage import RolloutStorage
+from ppo.loss import gae_targets, ppo_loss
+
+
+def train(args, shared_model, services, optimizer, counter, lock):
+    """Synchronous PPO over a vector of envs, updating `shared_model` in place"""
+    services.require('checkpoints')
+    log_dir = f'logs/{args.env_name}/{args.model_id}/{args.uuid}/'
+    loss_logger = setup_logger('loss', log_dir, f'loss.log')
+    checkpoint_logger = setup_logger('checkpoints', log_dir, f'checkpoints.log')
+    throughput_logger = setup_logger('throughput', log_dir, f'throughput.log')
+
+    env = create_mario_vec_env(
+        args.env_name,
+        args.num_envs,
+        ACTIONS[args.move_set],
+        args.buffer_depth,
+        args.uint8_obs,
+        args.reset_cache,
+        args.frame_skip,
+        args.max_pool,
+    )
+    num_envs = env.num_envs
+    # minibatches split by env, so there are at most as many as envs
+    num_mini_batch = min(args.num_mini_batch, num_envs)
+    print(FontColor.GREEN + f"PPO | {num_envs} envs x {args.num_steps} steps | {args.ppo_epochs} epochs x {num_mini_batch} minibatches", FontColor.END)
+
+    model = shared_model
+
+    state = env.reset_tensor()
+    rollouts = RolloutStorage(args.num_steps, num_envs, state.shape[1:], state.dtype, device=model.device)
+    rollouts.obs[0].copy_(state)
+
+    for t in count(start=args.start_step):
+        if t % args.save_interval == 0 and t > 0:
+            save_start = time.perf_counter()
+            services.checkpoints.request(t)
+            checkpoint_logger.info({'rank': 0, 'step': t, 'stall': time.perf_counter() - save_start})
+
+        start = time.perf_counter()
+
+        # act without a graph; running normalization statistics are updated
+        # by the first epoch
+        model.eval()
+        hx = rollouts.hxs[0]
+        cx = rollouts.cxs[0]
+        for step in range(args.num_steps):
+            with torch.no_grad():
+                value, logit, (hx, cx) = model((rollouts.obs[step], (hx, cx)))
+            prob = F.softmax(logit, dim=-1)
+            log_prob = F.log_softmax(logit, dim=-1)
+            entropy = -(log_prob * prob).sum(-1, keepdim=True)
+            action = prob.multinomial(1)
+
+            _, reward, done, info, mask = env.step_episodes(action.view(-1).cpu().numpy(), args.max_episode_length)
+
+            # finished episodes start over with a fresh recurrent state
+            mask = mask.to(hx.device)
+            hx = hx * mask
+            cx = cx * mask
+
+            rollouts.insert(
+                state, hx, cx, action,
+                torch.from_numpy(reward).float().unsqueeze(1),
+                mask, value, log_prob.gather(-1, action), entropy,
+            )
+
+        with lock:
+            counter.value += args.num_steps * num_envs
+
+        with torch.no_grad():
+            R, _, _ = model((rollouts.obs[-1], (hx, cx)))
+
+        values = rollouts.values[:-1]
+        returns, advantages = gae_targets(rollouts.rewards, values, R, rollouts.masks, args.gamma, args.tau)
+        advantages = (advantages - advantages.mean()) / (advantages.std() + 1e-5)
+
+        # minibatches of whole env sequences, so the LSTM unrolls from the
+        # stored initial state
+        model.train()
+        for epoch in range(args.ppo_epochs):
+            if model.obs_norm is not None:
+                model.obs_norm.train(epoch == 0)
+
+            for envs in torch.randperm(num_envs).chunk(num_mini_batch):
+                envs = envs.to(rollouts.obs.device)
+                new_values, log_probs, entropies = model.evaluate_actions(
+                    rollouts.obs[:-1, envs],
+                    rollouts.hxs[0, envs],
+                    rollouts.cxs[0, envs],
+                    rollouts.masks[:, envs],
+                    rollouts.actions[:, envs],
+                )
+                loss, policy_loss, value_loss, entropy = ppo_loss(
+                    log_probs,
+                    rollouts.log_probs[:, envs],
+                    advantages[:, envs],
+                    new_values,
+                    returns[:, envs],
+                    entropies,
+                    args,
+                )
+
+                optimizer.zero_grad()
+                loss.backward()
+                nn.utils.clip_grad_norm_(model.parameters(), args.max_grad_norm)
+                optimizer.step()
+
+                loss_logger.info({
+                    'rank': 0,
+                    'sampling': True,
+                    'loss': loss.item(),
+                    'policy_loss': policy_loss.item(),
+                    'value_loss': value_loss.item(),
+                    'entropy': entropy.item(),
+                    })
+
+        # the test process syncs by version
+        services.flat.bump()
+        rollouts.after_update()
+
+        throughput_logger.info({
+            'step': t,
+            'frames_per_sec': args.num_steps * num_envs / (time.perf_counter() - start),
+            })
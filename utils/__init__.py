@@ -2,9 +2,14 @@ from utils.fonts import FontColor
 from utils.roster import fetch_name
 from utils.greedy_epsilon import get_epsilon
 from utils.transport import save_checkpoint, restore_checkpoint
+from utils.checkpointer import CheckpointService
+from utils.history import CheckpointHistory, history_path
 from utils.cli import get_args
 from utils.info import decode_info
 # from utils.parsers import log_parser, csv_parser
 from utils.logger import setup_logger
 from utils.parsers import parse_loss_logs
 from utils.generate_plots import plot_loss, plot_reward
+from utils.profiler import PhaseTimer
+from utils.telemetry import Telemetry, ActionHistogram
+from utils.services import Services
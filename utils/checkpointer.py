@@ -0,0 +1,92 @@
+import time
+import threading
+
+import torch
+
+from utils.logger import setup_logger
+from utils.transport import checkpoint_path, checkpoint_state, write_checkpoint
+
+
+def _clone(state):
+    if isinstance(state, torch.Tensor):
+        return state.clone()
+    if isinstance(state, dict):
+        return type(state)((k, _clone(v)) for k, v in state.items())
+    if isinstance(state, (list, tuple)):
+        return type(state)(_clone(v) for v in state)
+    return state
+
+
+class CheckpointService(object):
+    """Single background writer for the shared model's checkpoint.
+
+    Workers only `request` a save, which costs a shared-value update. A
+    thread in the trainer process takes the latest request, snapshots the
+    shared model and optimizer state by copying their tensors, and writes
+    the copy atomically while training goes on. Requests arriving less than
+    `min_interval` seconds or `min_updates` shared-model versions after the
+    last save are dropped.
+
+    With a `CheckpointHistory` every write is also appended to it, and
+    evaluation rewards sent with `report` score its entries.
+    """
+    def __init__(self, ctx, min_interval=60., min_updates=0, history=None):
+        self.min_interval = min_interval
+        self.min_updates = min_updates
+        self.history = history
+        self.requested = ctx.Value('q', -1)
+        self.pending = ctx.Event()
+        self.rewards = ctx.Queue()
+
+    def request(self, step):
+        with self.requested.get_lock():
+            self.requested.value = max(self.requested.value, step)
+        self.pending.set()
+
+    def report(self, version, reward):
+        if self.history is not None:
+            self.rewards.put((version, reward))
+
+    def start(self, model, flat, optimizer, args, dir='checkpoints'):
+        thread = threading.Thread(target=self._run, args=(model, flat, optimizer, args, dir), daemon=True)
+        thread.start()
+        return thread
+
+    def _run(self, model, flat, optimizer, args, dir):
+        log_dir = f'logs/{args.env_name}/{args.model_id}/{args.uuid}/'
+        checkpoint_logger = setup_logger('checkpoints', log_dir, f'checkpoints.log')
+        path = checkpoint_path(args, dir)
+
+        last_time, last_version = -float('inf'), -float('inf')
+        while True:
+            self.pending.wait()
+            self.pending.clear()
+
+            while self.history is not None and not self.rewards.empty():
+                self.history.report(*self.rewards.get())
+
+            version = int(flat.version)
+            if time.time() - last_time < self.min_interval or version - last_version < self.min_updates:
+                continue
+
+            start = time.perf_counter()
+            state = _clone(checkpoint_state(model, optimizer, args, self.requested.value))
+            snapshot_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            write_checkpoint(state, path)
+            write_time = time.perf_counter() - start
+
+            history_bytes = None
+            if self.history is not None:
+                entry = self.history.add(state['step'], version, state['model_state_dict'])
+                history_bytes = entry and entry['bytes']
+
+            last_time, last_version = time.time(), version
+            checkpoint_logger.info({
+                'step': state['step'],
+                'version': version,
+                'snapshot_time': snapshot_time,
+                'write_time': write_time,
+                'history_bytes': history_bytes,
+                })
@@ -7,7 +7,7 @@ import torch.multiprocessing as _mp
 from utils.roster import fetch_name
 
 
-def get_args():
+def get_args(argv=None):
     # Command Line Interface
     parser = argparse.ArgumentParser(description='mario.ai')
     parser.add_argument('--lr', type=float, default=0.0001, help='learning rate (default: 0.0001)')
@@ -21,11 +21,24 @@ def get_args():
     parser.add_argument('--num-steps', type=int, default=50, help='number of forward steps in A3C (default: 50)')
     parser.add_argument('--max-episode-length', type=int, default=1000000, help='maximum length of an episode (default: 1000000)')
     parser.add_argument('--env-name', default='SuperMarioBrosNoFrameskip-v0', help='environment to train on (default: SuperMarioBrosNoFrameskip-v0)')
-    parser.add_argument('--no-shared', default=False, help='use an optimizer without shared momentum.')
+    parser.add_argument('--sync-staleness', type=int, default=0, help='shared model updates a worker may lag behind before it syncs (default: 0)')
+    parser.add_argument('--grad-mode', default='hogwild', choices=['hogwild', 'accumulate', 'slots'], help='how workers hand gradients to the shared optimizer (default: hogwild)')
+    parser.add_argument('--optimizer', default='shared-adam', choices=['shared-adam', 'flat-adam', 'shared-rmsprop'], help='optimizer (default: shared-adam)')
+    parser.add_argument('--optimizer-shards', type=int, default=0, help='lock-protected shards of flat-adam/shared-rmsprop state, 0 for lock-free (default: 0)')
+    parser.add_argument('--no-shared', action='store_true', help='give every worker its own optimizer state instead of sharing it')
     parser.add_argument('--use-cuda', default=True, help='run on gpu.')
     parser.add_argument('--record', action='store_true', help='record playback of tests')
     parser.add_argument('--save-interval', type=int, default=10, help='model save interval (default: 10)')
     parser.add_argument('--non-sample', type=int, default=2, help='number of non sampling processes (default: 2)')
+    parser.add_argument('--checkpoint-interval', type=float, default=60., help='minimum seconds between checkpoint writes (default: 60)')
+    parser.add_argument('--checkpoint-updates', type=int, default=0, help='minimum shared model updates between checkpoint writes (default: 0)')
+    parser.add_argument('--checkpoint-format', default='tar', choices=['tar', 'mmap'], help='pickled .tar, or raw memory-mapped blobs with a JSON header (default: tar)')
+    parser.add_argument('--checkpoint-history', action='store_true', help='also keep a step-indexed history of delta compressed weights')
+    parser.add_argument('--keyframe-interval', type=int, default=10, help='history entries per full keyframe (default: 10)')
+    parser.add_argument('--keep-last', type=int, default=5, help='latest history entries kept (default: 5)')
+    parser.add_argument('--keep-every', type=int, default=0, help='also keep every Nth history entry, 0 for none (default: 0)')
+    parser.add_argument('--keep-best', type=int, default=1, help='also keep the N history entries with the best evaluation reward (default: 1)')
+    parser.add_argument('--history-step', default=None, help="play this step from the checkpoint history, or 'best' (default: the checkpoint)")
     parser.add_argument('--checkpoint-dir', type=str, default='checkpoints', help='directory to save checkpoints')
     parser.add_argument('--start-step', type=int, default=0, help='training step on which to start')
     parser.add_argument('--model-id', type=str, default="mario", help='name id for the model')
@@ -34,8 +47,36 @@ def get_args():
     parser.add_argument('--verbose', action='store_true', help='print actions for debugging')
     parser.add_argument('--debug', action='store_true', help='print versions of essential packages')
     parser.add_argument('--move-set', default='complex', type=str, help='the set of possible actions')
-    parser.add_argument('--algorithm', default='A3C', type=str, help='algorithm being used')
+    parser.add_argument('--algorithm', default='A3C', type=str, choices=['A3C', 'IMPALA', 'PPO'], help='algorithm being used (default: A3C)')
+    parser.add_argument('--batch-size', type=int, default=4, help='trajectories per IMPALA learner batch (default: 4)')
+    parser.add_argument('--clip-rho', type=float, default=1.0, help='V-trace importance weight clip for the value and policy targets (default: 1.0)')
+    parser.add_argument('--clip-c', type=float, default=1.0, help='V-trace trace cutting clip (default: 1.0)')
+    parser.add_argument('--ppo-epochs', type=int, default=4, help='PPO epochs per rollout (default: 4)')
+    parser.add_argument('--num-mini-batch', type=int, default=4, help='PPO minibatches per epoch, split by env (default: 4)')
+    parser.add_argument('--clip-param', type=float, default=0.2, help='PPO surrogate clip (default: 0.2)')
+    parser.add_argument('--world-size', type=int, default=1, help='trainer nodes synced over torch.distributed (default: 1)')
+    parser.add_argument('--node-rank', type=int, default=0, help='rank of this trainer node (default: 0)')
+    parser.add_argument('--master-addr', default='127.0.0.1', help='address of the rank 0 node (default: 127.0.0.1)')
+    parser.add_argument('--master-port', type=int, default=29500, help='port of the rank 0 node (default: 29500)')
+    parser.add_argument('--dist-mode', default='allreduce', choices=['allreduce', 'ps'], help='average node updates with all-reduce or sum them on a rank 0 parameter server (default: allreduce)')
+    parser.add_argument('--dist-interval', type=float, default=5., help='seconds between node syncs (default: 5)')
+    parser.add_argument('--compression', default='none', choices=['none', 'fp16', 'topk'], help='encoding of the updates sent between nodes (default: none)')
+    parser.add_argument('--topk-ratio', type=float, default=0.01, help='share of entries sent with topk compression (default: 0.01)')
+    parser.add_argument('--telemetry-batch', type=int, default=256, help='log records a process buffers before handing them to the writer (default: 256)')
+    parser.add_argument('--telemetry-interval', type=float, default=1., help='most seconds a log record stays buffered (default: 1)')
+    parser.add_argument('--telemetry-sample', type=float, default=1., help='share of per-update sync and grads records kept (default: 1)')
+    parser.add_argument('--action-log-interval', type=int, default=100, help='steps per action histogram record in actions.log (default: 100)')
+    parser.add_argument('--profile', action='store_true', help='time the phases of every training iteration into profile.log')
+    parser.add_argument('--profile-interval', type=float, default=30., help='seconds between profile.log flushes (default: 30)')
+    parser.add_argument('--profile-capture', type=int, default=0, help='iterations to capture with --profile-tool on --profile-ranks, 0 for none (default: 0)')
+    parser.add_argument('--profile-start', type=int, default=10, help='iteration the capture starts at (default: 10)')
+    parser.add_argument('--profile-ranks', type=int, nargs='*', default=[0], help='ranks that run the capture (default: 0)')
+    parser.add_argument('--profile-tool', default='cprofile', choices=['cprofile', 'torch'], help='cProfile stats or an autograd profiler chrome trace (default: cprofile)')
     parser.add_argument('--headless', action='store_true', help='use virtual frame buffer')
+    parser.add_argument('--eval-episodes', type=int, default=8, help='greedy episodes per level and model version on an evaluation pool, 0 for the single rendered test process (default: 8)')
+    parser.add_argument('--eval-processes', type=int, default=4, help='env processes the evaluation episodes are spread over (default: 4)')
+    parser.add_argument('--eval-levels', nargs='*', default=None, metavar='ENV', help='environments to evaluate on (default: --env-name)')
+    parser.add_argument('--eval-interval', type=float, default=0., help='minimum seconds between evaluation rounds (default: 0)')
     parser.add_argument('--reset-delay', type=int, default=60, help='delay between evaluations')
     parser.add_argument('--save-dir', type=str, default='records', help='file to save results to')
     parser.add_argument('--log-dir', type=str, default='logs/')
@@ -43,9 +84,19 @@ def get_args():
     parser.add_argument('--uuid', type=str, default=str(uuid.uuid4()), help='uuid for session')
     parser.add_argument('--greedy-eps', action='store_true', help='perform uniform random action according to greedy-epsilon schedule')
     parser.add_argument('--buffer-depth', type=int, default=4, help='depth of the frame buffer')
+    parser.add_argument('--frame-skip', type=int, default=1, help='NES frames per frame buffer slot, only the last one is preprocessed (default: 1)')
+    parser.add_argument('--max-pool', action='store_true', help='max-pool the last two frames of each frame skip to remove flicker')
+    parser.add_argument('--reset-cache', nargs='*', default=None, metavar='LEVEL', help='reset from cached snapshots, for the given world-stage levels or all levels if none are given')
+    parser.add_argument('--num-envs', type=int, default=1, help='environments stepped together by each training process (default: 1)')
+    parser.add_argument('--uint8-obs', action='store_true', help='keep observations as uint8 and normalize them in the model')
+    parser.add_argument('--recompute', action='store_true', help='act without autograd and rerun each rollout in one batched pass for the update')
+    parser.add_argument('--inference-server', action='store_true', help='act through one batched inference process instead of per-worker forwards (implies --recompute)')
+    parser.add_argument('--inference-batch', type=int, default=0, help='most workers batched per inference forward, 0 for all (default: 0)')
+    parser.add_argument('--inference-latency', type=float, default=5., help='ms the inference server waits to fill a batch (default: 5)')
+    parser.add_argument('--obs-norm', default='running', choices=['fixed', 'running'], help='in-model normalization for uint8 observations (default: running)')
 
 
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
 
     args.model_id = fetch_name(args.env_name) if not args.model_id else args.model_id
 
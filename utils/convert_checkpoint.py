@@ -0,0 +1,24 @@
+import os
+import argparse
+
+from utils.transport import restore_checkpoint
+from utils.mmap_checkpoint import save_mmap_checkpoint
+
+
+parser = argparse.ArgumentParser('Convert .tar checkpoints to the memory-mapped format')
+parser.add_argument('files', nargs='+', help='.tar checkpoints, relative to --checkpoint-dir')
+parser.add_argument('--checkpoint-dir', default='checkpoints', help='directory checkpoints live in (default: checkpoints)')
+
+
+def convert(file, dir='checkpoints'):
+    """Write `file`'s memory-mapped counterpart next to it"""
+    assert file.endswith('.tar'), f"not a .tar checkpoint: {file}"
+    path = os.path.join(dir, file)[:-len('.tar')]
+    save_mmap_checkpoint(restore_checkpoint(file, dir), path)
+    return path
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    for file in args.files:
+        print(f"{file} -> {convert(file, args.checkpoint_dir)}")
@@ -136,11 +136,12 @@ def plot_reward(args):
 
 def plot_environment_rewards(args):
     def _combine_data(data, master):
+        # test and evaluation rows share only these columns
         assert isinstance(data, dict)
         for session, session_data in data.items():
-            for k, v in session_data.items():
-                master[k] += v
-        master['session'] += [session] * len(v)
+            for k in ('log_time', 'id', 'reward'):
+                master[k] += session_data[k]
+            master['session'] += [session] * len(session_data['reward'])
         return master
 
     log_dir = os.path.join(args.log_dir, args.env_name)
@@ -164,11 +165,6 @@ def plot_environment_rewards(args):
 
         data_store = _combine_data(data, data_store)
 
-    data_store = dict(data_store)
-
-    _ = data_store.pop('greedy-eps', None)
-    _ = data_store.pop('episode', None)
-
     df_master = pd.DataFrame().from_dict(dict(data_store))
     print(df_master.head(10))
     print(df_master.columns)
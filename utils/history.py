@@ -0,0 +1,172 @@
+import os
+import json
+import zlib
+
+import numpy as np
+import torch
+
+
+def history_path(args, dir='checkpoints'):
+    return os.path.join(dir, args.env_name, f"{args.model_id}_{args.algorithm}_history")
+
+
+def _pack(state_dict):
+    """All tensors as one byte string, each byte-shuffled by its itemsize so
+    the slowly changing sign and exponent bytes line up and compress"""
+    layout, chunks = [], []
+    for name, tensor in state_dict.items():
+        array = tensor.detach().cpu().contiguous().numpy()
+        layout.append([name, array.dtype.name, list(array.shape)])
+        chunks.append(array.reshape(-1).view(np.uint8).reshape(-1, array.dtype.itemsize).T.tobytes())
+    return layout, np.frombuffer(b''.join(chunks), dtype=np.uint8)
+
+
+def _unpack(layout, buffer):
+    state_dict, offset = {}, 0
+    for name, dtype, shape in layout:
+        dtype = np.dtype(dtype)
+        nbytes = int(np.prod(shape)) * dtype.itemsize
+        planes = buffer[offset:offset + nbytes].reshape(dtype.itemsize, -1)
+        state_dict[name] = torch.from_numpy(planes.T.copy().view(dtype).reshape(shape))
+        offset += nbytes
+    return state_dict
+
+
+class CheckpointHistory(object):
+    """Step-indexed history of model weights under one directory.
+
+    Every `keyframe_interval`-th entry is a full keyframe; the rest store
+    the xor of their float bits with the latest keyframe, which is mostly
+    zero bytes between nearby updates and compresses well. Deltas never
+    chain, so restoring any step reads at most two files, located through
+    `index.json`.
+
+    Retention keeps the last `keep_last` entries, every `keep_every`-th
+    entry (0 for none) and the `keep_best` entries with the highest
+    evaluation reward, along with the keyframes those depend on.
+    """
+    def __init__(self, path, keyframe_interval=10, keep_last=5, keep_every=0, keep_best=1, level=6):
+        self.path = path
+        self.keyframe_interval = keyframe_interval
+        self.keep_last = keep_last
+        self.keep_every = keep_every
+        self.keep_best = keep_best
+        self.level = level
+        self._keyframe = None
+
+    def _index_file(self):
+        return os.path.join(self.path, 'index.json')
+
+    def index(self):
+        if not os.path.isfile(self._index_file()):
+            return dict(count=0, entries=[])
+        with open(self._index_file()) as f:
+            return json.load(f)
+
+    def _write_index(self, index):
+        tmp = f"{self._index_file()}.{os.getpid()}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(index, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self._index_file())
+
+    def _read(self, file):
+        with open(os.path.join(self.path, file), 'rb') as f:
+            return np.frombuffer(zlib.decompress(f.read()), dtype=np.uint8)
+
+    def _write(self, file, buffer):
+        data = zlib.compress(buffer.tobytes(), self.level)
+        with open(os.path.join(self.path, file), 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        return len(data)
+
+    def add(self, step, version, state_dict):
+        """Append the weights at `step`; returns the entry written, or None
+        if the step is already recorded"""
+        os.makedirs(self.path, exist_ok=True)
+        index = self.index()
+        if any(e['step'] == step for e in index['entries']):
+            return None
+        layout, buffer = _pack(state_dict)
+
+        keyframes = [e for e in index['entries'] if e['kind'] == 'key']
+        key = index['count'] % self.keyframe_interval == 0 or not keyframes or layout != keyframes[-1]['layout']
+        if key:
+            entry = dict(kind='key', file=f'{step}.key.z', base=None, layout=layout)
+            entry['bytes'] = self._write(entry['file'], buffer)
+            self._keyframe = (entry['file'], buffer)
+        else:
+            base = keyframes[-1]['file']
+            if self._keyframe is None or self._keyframe[0] != base:
+                self._keyframe = (base, self._read(base))
+            entry = dict(kind='delta', file=f'{step}.delta.z', base=base)
+            entry['bytes'] = self._write(entry['file'], np.bitwise_xor(buffer, self._keyframe[1]))
+
+        entry.update(step=step, version=version, n=index['count'], reward=None)
+        index['entries'].append(entry)
+        index['count'] += 1
+        self._retain(index)
+        return entry
+
+    def report(self, version, reward):
+        """Score the newest entry at or before shared model `version`"""
+        index = self.index()
+        entries = [e for e in index['entries'] if e['version'] <= version]
+        if not entries:
+            return
+        entry = max(entries, key=lambda e: e['version'])
+        entry['reward'] = reward if entry['reward'] is None else max(entry['reward'], reward)
+        self._retain(index)
+
+    def _retain(self, index):
+        entries = index['entries']
+        keep = {e['file'] for e in entries[-self.keep_last:]} if self.keep_last else set()
+        if self.keep_every:
+            keep |= {e['file'] for e in entries if e['n'] % self.keep_every == 0}
+        scored = sorted((e for e in entries if e['reward'] is not None), key=lambda e: e['reward'])
+        if self.keep_best:
+            keep |= {e['file'] for e in scored[-self.keep_best:]}
+        keep |= {e['base'] for e in entries if e['file'] in keep and e['base'] is not None}
+        if entries:  # the current keyframe serves the next deltas
+            keep |= {[e for e in entries if e['kind'] == 'key'][-1]['file']}
+
+        index['entries'] = [e for e in entries if e['file'] in keep]
+        self._write_index(index)
+        for e in entries:
+            if e['file'] not in keep:
+                os.remove(os.path.join(self.path, e['file']))
+
+    def steps(self):
+        return [e['step'] for e in self.index()['entries']]
+
+    def load(self, step=None):
+        """Checkpoint dict with the weights at `step`, the latest if None,
+        or the best scored entry for 'best'"""
+        index = self.index()
+        entries = index['entries']
+        assert entries, f"no history in {self.path}"
+        if step is None:
+            entry = entries[-1]
+        elif step == 'best':
+            scored = [e for e in entries if e['reward'] is not None]
+            assert scored, f"no evaluated entries in {self.path}"
+            entry = max(scored, key=lambda e: e['reward'])
+        else:
+            matches = [e for e in entries if e['step'] == step]
+            assert matches, f"step {step} is not kept, available: {[e['step'] for e in entries]}"
+            entry = matches[0]
+
+        buffer = self._read(entry['file'])
+        layout = entry.get('layout')
+        if entry['kind'] == 'delta':
+            buffer = np.bitwise_xor(buffer, self._read(entry['base']))
+            layout = [e for e in entries if e['file'] == entry['base']][0]['layout']
+        return dict(
+            step=entry['step'],
+            version=entry['version'],
+            reward=entry['reward'],
+            model_state_dict=_unpack(layout, buffer),
+        )
@@ -8,12 +8,15 @@ FORMAT = logging.Formatter('%(asctime)s, %(message)s')
 def setup_logger(name, log_dir, log_file, level=logging.INFO):
     """Function to setup as many loggers as you want"""
     os.makedirs(log_dir, exist_ok=True)
-
-    handler = logging.FileHandler(os.path.join(log_dir, log_file))
-    handler.setFormatter(FORMAT)
+    path = os.path.abspath(os.path.join(log_dir, log_file))
 
     logger = logging.getLogger(name)
     logger.setLevel(level)
-    logger.addHandler(handler)
+
+    # repeated calls would add a handler and write every line again
+    if not any(getattr(h, 'baseFilename', None) == path for h in logger.handlers):
+        handler = logging.FileHandler(path)
+        handler.setFormatter(FORMAT)
+        logger.addHandler(handler)
 
     return logger
@@ -0,0 +1,106 @@
+import os
+import json
+import uuid
+
+import numpy as np
+import torch
+
+
+ALIGN = 64
+
+
+def _encode(obj, tensors, prefix):
+    """JSON-able copy of `obj` with tensors moved into `tensors`"""
+    if isinstance(obj, torch.Tensor):
+        tensors[prefix] = obj
+        return {'__tensor__': prefix}
+    if isinstance(obj, dict):
+        return {'__dict__': [[k, _encode(v, tensors, f'{prefix}.{k}')] for k, v in obj.items()]}
+    if isinstance(obj, (list, tuple)):
+        return [_encode(v, tensors, f'{prefix}.{i}') for i, v in enumerate(obj)]
+    return obj
+
+
+def _decode(obj, tensors):
+    if isinstance(obj, dict):
+        if '__tensor__' in obj:
+            return tensors[obj['__tensor__']]
+        return {k: _decode(v, tensors) for k, v in obj['__dict__']}
+    if isinstance(obj, list):
+        return [_decode(v, tensors) for v in obj]
+    return obj
+
+
+def _write_blob(tensors, path):
+    """Raw tensor bytes at aligned offsets; returns their index"""
+    index, offset = {}, 0
+    with open(path, 'wb') as f:
+        for name, tensor in tensors.items():
+            array = tensor.detach().cpu().contiguous().numpy()
+            offset = -(-offset // ALIGN) * ALIGN
+            f.seek(offset)
+            f.write(array.tobytes())
+            index[name] = dict(dtype=array.dtype.name, shape=list(array.shape), offset=offset)
+            offset += array.nbytes
+        f.flush()
+        os.fsync(f.fileno())
+    return index
+
+
+def _map_blob(path, index):
+    """Tensors over a copy-on-write memory map of a blob, without reading it"""
+    if not index:
+        return {}
+    mapping = np.memmap(path, dtype=np.uint8, mode='c')
+    tensors = {}
+    for name, entry in index.items():
+        dtype = np.dtype(entry['dtype'])
+        start = entry['offset']
+        end = start + int(np.prod(entry['shape'])) * dtype.itemsize
+        tensors[name] = torch.from_numpy(mapping[start:end].view(dtype).reshape(entry['shape']))
+    return tensors
+
+
+def save_mmap_checkpoint(state, path):
+    """Write a checkpoint dict as a directory: `header.json` plus raw
+    `weights` and `optimizer` blobs. Blobs get fresh names and the header
+    is renamed into place last, so readers see either checkpoint whole."""
+    os.makedirs(path, exist_ok=True)
+    token = uuid.uuid4().hex[:8]
+
+    weights, optimizer = {}, {}
+    header = {k: v for k, v in state.items() if k not in ('model_state_dict', 'optimizer_state_dict')}
+    header['model'] = _encode(state['model_state_dict'], weights, 'model')
+    header['optimizer'] = _encode(state.get('optimizer_state_dict'), optimizer, 'optimizer')
+
+    header['weights_file'] = f'weights.{token}.bin'
+    header['optimizer_file'] = f'optimizer.{token}.bin'
+    header['weights'] = _write_blob(weights, os.path.join(path, header['weights_file']))
+    header['optimizer_index'] = _write_blob(optimizer, os.path.join(path, header['optimizer_file']))
+
+    tmp = os.path.join(path, f'header.{token}.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(header, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, os.path.join(path, 'header.json'))
+
+    for name in os.listdir(path):
+        if name.endswith('.bin') and token not in name:
+            os.remove(os.path.join(path, name))
+
+
+def load_mmap_checkpoint(path, optimizer=True):
+    """Checkpoint dict with weights mapped from disk; inference-only callers
+    pass `optimizer=False` to leave the optimizer blob unread"""
+    with open(os.path.join(path, 'header.json')) as f:
+        header = json.load(f)
+
+    checkpoint = {k: v for k, v in header.items() if k not in (
+        'model', 'optimizer', 'weights', 'optimizer_index', 'weights_file', 'optimizer_file')}
+    weights = _map_blob(os.path.join(path, header['weights_file']), header['weights'])
+    checkpoint['model_state_dict'] = _decode(header['model'], weights)
+    if optimizer:
+        tensors = _map_blob(os.path.join(path, header['optimizer_file']), header['optimizer_index'])
+        checkpoint['optimizer_state_dict'] = _decode(header['optimizer'], tensors)
+    return checkpoint
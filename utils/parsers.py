@@ -29,8 +29,10 @@ def _parse_logs(log_type, model_id, env, log_dir):
     for session in os.listdir(env_logs):
         session_dir = os.path.join(env_logs, session)
         if os.path.isdir(session_dir):
-            log = fnmatch.filter(os.listdir(session_dir), f'{log_type}.log')[0]
-            log_file = os.path.join(session_dir, log)
+            logs = fnmatch.filter(os.listdir(session_dir), f'{log_type}.log')
+            if not logs:  # e.g. a session stopped before its first row
+                continue
+            log_file = os.path.join(session_dir, logs[0])
 
             data[session] = _parse_log(log_file)
 
@@ -61,6 +63,12 @@ def parse_action_logs(model_id, env, log_dir='logs/'):
     return data
 
 
+def parse_profile_logs(model_id, env, log_dir='logs/'):
+    data = _parse_logs('profile', model_id, env, log_dir)
+
+    return data
+
+
 if __name__ == "__main__":
     data = parse_result_logs('danger_noodle', 'SuperMarioBrosNoFrameskip-1-1-v0')
     pprint(data)
@@ -0,0 +1,153 @@
+import os
+import math
+import time
+import cProfile
+import argparse
+from collections import defaultdict
+
+import torch
+
+from utils.logger import setup_logger
+from utils.parsers import parse_profile_logs
+
+
+BUCKETS = 32  # powers of two of microseconds
+
+
+def _percentile(histogram, count, q):
+    """Upper bound in seconds of the bucket holding the q-th percentile"""
+    target, seen = q * count, 0
+    for bucket, n in enumerate(histogram):
+        seen += n
+        if seen >= target:
+            return 2 ** bucket / 1e6
+    return 2 ** (BUCKETS - 1) / 1e6
+
+
+class PhaseTimer(object):
+    """Per-phase wall time of a worker's loop.
+
+    `lap(phase)` charges the time since the previous lap to `phase`, so
+    instrumenting the loop is one call after each phase. Laps go into a
+    count, a total and a histogram over power-of-two microsecond buckets
+    per phase; every `interval` seconds `step` writes one row per phase to
+    profile.log and starts over. Disabled timers return at once.
+
+    With `capture` > 0 the ranks in `ranks` also run cProfile, or the
+    autograd profiler with tool='torch', over `capture` iterations from
+    iteration `start`, and write the result next to the log.
+    """
+    def __init__(self, rank, log_dir, enabled=False, interval=30., capture=0, start=10, ranks=(0,), tool='cprofile'):
+        self.rank = rank
+        self.log_dir = log_dir
+        self.enabled = enabled
+        self.interval = interval
+        self.capture = capture if rank in ranks else 0
+        self.capture_start = start
+        self.tool = tool
+        self.logger = setup_logger('profile', log_dir, f'profile.log') if enabled else None
+
+        self.profiler = None
+        self.iteration = 0
+        self._reset()
+
+    def _reset(self):
+        self.counts = defaultdict(int)
+        self.totals = defaultdict(float)
+        self.histograms = defaultdict(lambda: [0] * BUCKETS)
+        self.iterations = 0
+        self.flushed = self.last = time.perf_counter()
+
+    def lap(self, phase):
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        elapsed = now - self.last
+        self.last = now
+
+        self.counts[phase] += 1
+        self.totals[phase] += elapsed
+        bucket = math.frexp(elapsed * 1e6)[1] if elapsed > 1e-6 else 0
+        self.histograms[phase][min(bucket, BUCKETS - 1)] += 1
+
+    def skip(self):
+        """Leave the time since the last lap unaccounted"""
+        self.last = time.perf_counter()
+
+    def step(self):
+        """End of an iteration: starts or stops a capture, flushes when due"""
+        self.iteration += 1
+        self.iterations += 1
+        if self.capture:
+            if self.iteration == self.capture_start:
+                self._start_capture()
+            elif self.iteration == self.capture_start + self.capture:
+                self._stop_capture()
+
+        if self.enabled and self.last - self.flushed >= self.interval:
+            self.flush()
+
+    def flush(self):
+        wall = self.last - self.flushed
+        for phase, total in sorted(self.totals.items(), key=lambda p: -p[1]):
+            count, histogram = self.counts[phase], self.histograms[phase]
+            self.logger.info({
+                'rank': self.rank,
+                'phase': phase,
+                'iterations': self.iterations,
+                'count': count,
+                'total': total,
+                'share': total / wall,
+                'mean': total / count,
+                'p50': _percentile(histogram, count, 0.5),
+                'p90': _percentile(histogram, count, 0.9),
+                'p99': _percentile(histogram, count, 0.99),
+                'histogram': {2 ** b: n for b, n in enumerate(histogram) if n},
+                })
+        self._reset()
+
+    def _start_capture(self):
+        if self.tool == 'torch':
+            self.profiler = torch.autograd.profiler.profile()
+            self.profiler.__enter__()
+        else:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+
+    def _stop_capture(self):
+        path = os.path.join(self.log_dir, f'profile.rank{self.rank}')
+        if self.tool == 'torch':
+            self.profiler.__exit__(None, None, None)
+            self.profiler.export_chrome_trace(f'{path}.trace.json')
+        else:
+            self.profiler.disable()
+            self.profiler.dump_stats(f'{path}.prof')
+        print(f"Process: {self.rank: 3d} | Profile of {self.capture} iterations written to {path}")
+        self.profiler = None
+
+
+def phase_breakdown(data):
+    """Share of wall time per phase and rank, over every flush of a session"""
+    totals = defaultdict(float)
+    walls = defaultdict(float)
+    for rank, phase, total, share in zip(data['rank'], data['phase'], data['total'], data['share']):
+        totals[(rank, phase)] += total
+        walls[(rank, phase)] += total / share if share else 0.
+    return {key: totals[key] / walls[key] for key in totals if walls[key]}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser('Per-phase breakdown of profile.log')
+    parser.add_argument('--model-id', default='mario')
+    parser.add_argument('--env-name', default='SuperMarioBrosNoFrameskip-v0')
+    parser.add_argument('--log-dir', default='logs/')
+    args = parser.parse_args()
+
+    for session, data in parse_profile_logs(args.model_id, args.env_name, args.log_dir).items():
+        print(f"Session {session}")
+        shares = phase_breakdown(data)
+        phases = defaultdict(list)
+        for (rank, phase), share in shares.items():
+            phases[phase].append(share)
+        for phase, values in sorted(phases.items(), key=lambda p: -sum(p[1]) / len(p[1])):
+            print(f"{phase:>14s}: {100 * sum(values) / len(values): 6.2f}% mean over {len(values)} ranks | max {100 * max(values): 6.2f}%")
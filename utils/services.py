@@ -0,0 +1,20 @@
+class Services(object):
+    """What the trainer shares with its processes besides the model.
+
+    `flat` holds the shared model's parameters and version, `checkpoints`
+    takes save requests and evaluation rewards, `telemetry` batches log
+    records and `grads` hands A3C worker gradients to the optimizer.
+    Processes `require` the services they use when they start, so a
+    missing one fails there instead of deep inside the loop.
+    """
+    def __init__(self, flat, checkpoints=None, telemetry=None, grads=None):
+        self.flat = flat
+        self.checkpoints = checkpoints
+        self.telemetry = telemetry
+        self.grads = grads
+
+    def require(self, *names):
+        missing = [name for name in names if getattr(self, name) is None]
+        if missing:
+            raise ValueError(f"missing services: {', '.join(missing)}")
+        return self
@@ -0,0 +1,133 @@
+import os
+import time
+import queue
+import random
+
+import numpy as np
+
+
+def _asctime(timestamp):
+    """Timestamps as written by utils.logger.FORMAT, for the log parsers"""
+    return time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(timestamp)) + f',{int(timestamp % 1 * 1000):03d}'
+
+
+def _write(batches, log_dir, dropped, interval):
+    """Writer process: appends each batch to the logs it names"""
+    os.makedirs(log_dir, exist_ok=True)
+    files, written, last = {}, 0, time.time()
+    try:
+        while True:
+            try:
+                batch = batches.get(timeout=interval)
+            except queue.Empty:
+                batch = []
+            if batch is None:
+                break
+
+            lines = {}
+            for name, timestamp, entry in batch:
+                lines.setdefault(name, []).append(f"{_asctime(timestamp)}, {entry}\n")
+            for name, rows in lines.items():
+                if name not in files:
+                    files[name] = open(os.path.join(log_dir, f'{name}.log'), 'a')
+                files[name].writelines(rows)
+                files[name].flush()
+            written += len(batch)
+
+            if time.time() - last >= interval:
+                last = time.time()
+                if 'telemetry' not in files:
+                    files['telemetry'] = open(os.path.join(log_dir, 'telemetry.log'), 'a')
+                files['telemetry'].write(f"{_asctime(last)}, {{'written': {written}, 'dropped': {dropped.value}}}\n")
+                files['telemetry'].flush()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for f in files.values():
+            f.close()
+
+
+class Telemetry(object):
+    """Batched log records, written by one process off the training path.
+
+    `log(name, entry)` appends the record to a buffer in the calling
+    process; a full buffer, or one older than `flush_interval` seconds,
+    goes to the writer as a single queue item. The writer appends it to
+    `{name}.log` in the usual `setup_logger` line format. When the writer
+    falls `capacity` batches behind, new batches are dropped and counted
+    instead of stalling the caller. `sample(name, entry)` keeps only a
+    `sample_rate` share of the records sent through it.
+    """
+    def __init__(self, ctx, log_dir, batch_size=256, flush_interval=1., sample_rate=1., capacity=256):
+        self.log_dir = log_dir
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.sample_rate = sample_rate
+        self.batches = ctx.Queue(capacity)
+        self.dropped = ctx.Value('q', 0)
+        self._buffer = []
+        self._flushed = time.time()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_buffer'] = []  # every process fills its own
+        return state
+
+    def start(self, ctx):
+        p = ctx.Process(target=_write, args=(self.batches, self.log_dir, self.dropped, self.flush_interval), daemon=True)
+        p.start()
+        return p
+
+    def log(self, name, entry):
+        now = time.time()
+        self._buffer.append((name, now, entry))
+        if len(self._buffer) >= self.batch_size or now - self._flushed >= self.flush_interval:
+            self.flush()
+
+    def sample(self, name, entry):
+        if self.sample_rate >= 1. or random.random() < self.sample_rate:
+            self.log(name, entry)
+
+    def flush(self):
+        self._flushed = time.time()
+        if not self._buffer:
+            return
+        try:
+            self.batches.put_nowait(self._buffer)
+        except queue.Full:
+            with self.dropped.get_lock():
+                self.dropped.value += len(self._buffer)
+        self._buffer = []
+
+    def close(self):
+        self.flush()
+        self.batches.put(None)
+
+
+class ActionHistogram(object):
+    """Counts actions per selection reason over `interval` steps, for one
+    telemetry record in place of a record per action"""
+    def __init__(self, num_actions, interval=100):
+        self.num_actions = num_actions
+        self.interval = interval
+        self._reset()
+
+    def _reset(self):
+        self.counts = {}
+        self.steps = 0
+
+    def add(self, actions, reason):
+        """Count a step's actions; True once `interval` steps are in"""
+        if reason not in self.counts:
+            self.counts[reason] = np.zeros(self.num_actions, dtype=np.int64)
+        np.add.at(self.counts[reason], actions, 1)
+        self.steps += 1
+        return self.steps >= self.interval
+
+    def pop(self):
+        entry = {
+            'steps': self.steps,
+            'counts': {reason: counts.tolist() for reason, counts in self.counts.items()},
+        }
+        self._reset()
+        return entry
@@ -2,24 +2,58 @@ import os
 
 import torch
 
+from utils.mmap_checkpoint import save_mmap_checkpoint, load_mmap_checkpoint
 
-def save_checkpoint(model, optimizer, args, n, dir='checkpoints'):
-    save_dir = os.path.join(dir, args.env_name)
-    os.makedirs(save_dir, exist_ok=True)
-
-    torch.save(
-        dict(
-            env=args.env_name,
-            id=args.model_id,
-            step=n,
-            model_state_dict=model.state_dict(),
-            optimizer_state_dict=optimizer.state_dict(),
-        ),
-        os.path.join(save_dir, f"{args.model_id}_{args.algorithm}_params.tar"),
+
+def checkpoint_path(args, dir='checkpoints'):
+    """A `.tar` file, or a directory for the memory-mapped format"""
+    path = os.path.join(dir, args.env_name, f"{args.model_id}_{args.algorithm}_params")
+    return path if args.checkpoint_format == 'mmap' else f"{path}.tar"
+
+
+def checkpoint_state(model, optimizer, args, n):
+    return dict(
+        env=args.env_name,
+        id=args.model_id,
+        step=n,
+        model_state_dict=model.state_dict(),
+        optimizer_state_dict=optimizer.state_dict(),
     )
+
+
+def write_checkpoint(state, path):
+    """torch.save to a temp file, fsync and rename it over `path`, so
+    readers never see a partly written checkpoint"""
+    if not path.endswith('.tar'):
+        return save_mmap_checkpoint(state, path)
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'wb') as f:
+        torch.save(state, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+    fd = os.open(os.path.dirname(path), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def save_checkpoint(model, optimizer, args, n, dir='checkpoints'):
+    write_checkpoint(checkpoint_state(model, optimizer, args, n), checkpoint_path(args, dir))
     return True
 
-def restore_checkpoint(file, dir='checkpoints'):
-    checkpoint = torch.load(os.path.join(dir, file))
+def restore_checkpoint(file, dir='checkpoints', optimizer=True):
+    """Load a `.tar` checkpoint, or its memory-mapped counterpart when only
+    that exists; `optimizer=False` skips the optimizer state of the latter"""
+    path = os.path.join(dir, file)
+    mapped = path[:-len('.tar')] if path.endswith('.tar') else path
+    if os.path.isdir(mapped) and not os.path.isfile(path):
+        return load_mmap_checkpoint(mapped, optimizer)
+
+    checkpoint = torch.load(path)
     
     return checkpoint